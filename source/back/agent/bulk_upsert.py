@@ -0,0 +1,159 @@
+"""
+Envio em lote de vetores para o índice.
+Agrupa vetores em lotes limitados por quantidade e tamanho e os envia
+através de um pool limitado de workers concorrentes, com novas tentativas.
+"""
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from back.config import (
+    UPSERT_BATCH_SIZE,
+    UPSERT_MAX_BATCH_BYTES,
+    UPSERT_MAX_RETRIES,
+    UPSERT_MAX_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_vector_size(vector):
+    """
+    Estima o tamanho, em bytes, de um vetor serializado na requisição.
+
+    Args:
+        vector (dict): Vetor com 'id', 'values' e 'metadata'.
+
+    Returns:
+        int: Tamanho aproximado em bytes.
+    """
+    metadata = json.dumps(vector.get('metadata', {}), ensure_ascii=False)
+    # Cada float ocupa cerca de 12 bytes quando serializado em JSON.
+    return len(vector['id']) + 12 * len(vector['values']) + len(metadata)
+
+
+def make_batches(vectors, batch_size, max_batch_bytes):
+    """
+    Agrupa vetores em lotes limitados por quantidade e tamanho.
+
+    Args:
+        vectors (list[dict]): Vetores a serem agrupados.
+        batch_size (int): Quantidade máxima de vetores por lote.
+        max_batch_bytes (int): Tamanho máximo aproximado de cada lote.
+
+    Returns:
+        list[list[dict]]: Lotes de vetores.
+    """
+    batches = []
+    current, current_bytes = [], 0
+    for vector in vectors:
+        size = estimate_vector_size(vector)
+        if current and (
+            len(current) >= batch_size
+            or current_bytes + size > max_batch_bytes
+        ):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(vector)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BulkUpserter:
+    """
+    Envia vetores ao índice em lotes paralelos e reporta a vazão obtida.
+    """
+
+    def __init__(
+        self,
+        index,
+        batch_size=UPSERT_BATCH_SIZE,
+        max_workers=UPSERT_MAX_WORKERS,
+        max_retries=UPSERT_MAX_RETRIES,
+        max_batch_bytes=UPSERT_MAX_BATCH_BYTES,
+    ):
+        """
+        Inicializa o enviador em lote.
+
+        Args:
+            index: Índice com método upsert(vectors=...).
+            batch_size (int): Quantidade máxima de vetores por lote.
+            max_workers (int): Quantidade máxima de lotes enviados em paralelo.
+            max_retries (int): Novas tentativas por lote antes de desistir.
+            max_batch_bytes (int): Tamanho máximo aproximado de cada lote.
+        """
+        self.index = index
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.max_batch_bytes = max_batch_bytes
+
+    def _upsert_batch(self, batch):
+        """
+        Envia um lote, repetindo com espera exponencial em caso de falha.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.index.upsert(vectors=batch)
+                return len(batch)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                delay = 0.5 * 2**attempt
+                logger.warning(
+                    'Falha ao enviar lote de %d vetores; nova tentativa em %.1fs.',
+                    len(batch),
+                    delay,
+                )
+                time.sleep(delay)
+
+    def upsert(self, vectors):
+        """
+        Envia todos os vetores ao índice.
+
+        Args:
+            vectors (list[dict]): Vetores com 'id', 'values' e 'metadata'.
+
+        Returns:
+            dict: Estatísticas com vetores enviados, lotes com falha,
+            duração em segundos e vetores por segundo.
+        """
+        batches = make_batches(vectors, self.batch_size, self.max_batch_bytes)
+        started = time.perf_counter()
+        upserted, failed = 0, 0
+
+        if batches:
+            workers = max(1, min(self.max_workers, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._upsert_batch, batch)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    try:
+                        upserted += future.result()
+                    except Exception:
+                        logger.exception(
+                            'Lote descartado após novas tentativas.'
+                        )
+                        failed += 1
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            'vectors': upserted,
+            'batches': len(batches),
+            'failed_batches': failed,
+            'seconds': elapsed,
+            'vectors_per_second': upserted / elapsed if elapsed else 0.0,
+        }
+        logger.info(
+            '%d vetores enviados em %d lotes (%.1f vetores/s).',
+            upserted,
+            len(batches),
+            stats['vectors_per_second'],
+        )
+        return stats
@@ -0,0 +1,307 @@
+"""
+Divisão de conteúdo em segmentos para indexação.
+Percorre o texto uma única vez, respeitando parágrafos e frases, agrupa as
+unidades até um orçamento de tokens com sobreposição configurável e descarta
+segmentos quase duplicados (SimHash) e parágrafos repetidos entre páginas,
+como cabeçalhos e rodapés.
+"""
+
+import hashlib
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+from back.config import (
+    CHUNK_DEDUP_DISTANCE,
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+)
+from back.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?…])\s+')
+_WORD = re.compile(r'\w+')
+
+SIMHASH_BITS = 64
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SHIFT = np.uint64(33)
+
+
+def _split_iter(pattern, text):
+    """
+    Divide o texto pelo padrão sem copiar o restante a cada passo.
+    """
+    start = 0
+    for match in pattern.finditer(text):
+        yield text[start : match.start()]
+        start = match.end()
+    yield text[start:]
+
+
+def iter_paragraphs(text):
+    """
+    Gera os parágrafos não vazios do texto, com espaços normalizados.
+    """
+    for paragraph in _split_iter(_PARAGRAPH_BREAK, text):
+        paragraph = ' '.join(paragraph.split())
+        if paragraph:
+            yield paragraph
+
+
+def _split_long(sentence, max_tokens):
+    """
+    Divide uma frase acima do orçamento em grupos de palavras.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    words, length = [], 0
+    for word in sentence.split(' '):
+        while len(word) > max_chars:
+            if words:
+                yield ' '.join(words)
+                words, length = [], 0
+            yield word[:max_chars]
+            word = word[max_chars:]
+        if words and length + len(word) + 1 > max_chars:
+            yield ' '.join(words)
+            words, length = [], 0
+        words.append(word)
+        length += len(word) + 1
+    if words:
+        yield ' '.join(words)
+
+
+def iter_units(paragraphs, max_tokens):
+    """
+    Gera as unidades de texto (frases ou partes de frases) de cada parágrafo.
+
+    Yields:
+        tuple[str, int, bool]: Texto, tokens estimados e se a unidade
+        inicia um parágrafo.
+    """
+    for paragraph in paragraphs:
+        first = True
+        if estimate_tokens(paragraph) <= max_tokens:
+            sentences = (paragraph,)
+        else:
+            sentences = _split_iter(_SENTENCE_BREAK, paragraph)
+        for sentence in sentences:
+            tokens = estimate_tokens(sentence)
+            pieces = (
+                (sentence,)
+                if tokens <= max_tokens
+                else _split_long(sentence, max_tokens)
+            )
+            for piece in pieces:
+                yield piece, estimate_tokens(piece), first
+                first = False
+
+
+def _join(units):
+    parts = []
+    for text, _, starts_paragraph in units:
+        if parts:
+            parts.append('\n\n' if starts_paragraph else ' ')
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _tail(text, max_tokens):
+    """
+    Retorna as últimas palavras do texto que cabem em max_tokens.
+    """
+    tail = ''
+    for word in reversed(text.split(' ')):
+        candidate = f'{word} {tail}' if tail else word
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        tail = candidate
+    return tail
+
+
+def pack_units(units, max_tokens, overlap_tokens):
+    """
+    Agrupa unidades em segmentos de até max_tokens, repetindo no início de
+    cada segmento as últimas unidades do anterior, até overlap_tokens.
+    Quando a última unidade sozinha passa da sobreposição, repete apenas as
+    últimas palavras dela.
+
+    Yields:
+        str: Segmentos de texto.
+    """
+    window = deque()
+    tokens = 0
+    for unit in units:
+        if window and tokens + unit[1] > max_tokens:
+            yield _join(window)
+            last = window[-1]
+            while window and (
+                tokens > overlap_tokens or tokens + unit[1] > max_tokens
+            ):
+                tokens -= window.popleft()[1]
+            if not window and overlap_tokens > 0:
+                tail = _tail(
+                    last[0], min(overlap_tokens, max_tokens - unit[1])
+                )
+                if tail:
+                    window.append((tail, estimate_tokens(tail), False))
+                    tokens = window[0][1]
+        window.append(unit)
+        tokens += unit[1]
+    if window:
+        yield _join(window)
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_hash(word):
+    return int.from_bytes(
+        hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(),
+        'little',
+    )
+
+
+def _mix(hashes):
+    """
+    Finalizador do MurmurHash3 aplicado a um vetor uint64.
+    """
+    hashes = hashes ^ (hashes >> _SHIFT)
+    hashes = hashes * _MIX_1
+    hashes = hashes ^ (hashes >> _SHIFT)
+    hashes = hashes * _MIX_2
+    return hashes ^ (hashes >> _SHIFT)
+
+
+def simhash(text):
+    """
+    Calcula o SimHash de 64 bits do texto a partir de trigramas de palavras.
+    O hash de cada palavra é memoizado e os trigramas são combinados de
+    forma vetorizada.
+
+    Args:
+        text (str): Texto de entrada.
+
+    Returns:
+        int: Impressão digital do texto.
+    """
+    words = _WORD.findall(text.casefold())
+    if not words:
+        return 0
+    hashes = np.fromiter(
+        map(_word_hash, words), dtype=np.uint64, count=len(words)
+    )
+    if len(hashes) >= 3:
+        hashes = hashes[:-2] * _MIX_1 ^ hashes[1:-1] * _MIX_2 ^ hashes[2:]
+    hashes = _mix(hashes)
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(hashes)
+    return int(np.packbits(votes, bitorder='little').view('<u8')[0])
+
+
+class SimHashIndex:
+    """
+    Conjunto de impressões SimHash com busca por distância de Hamming.
+    A impressão é dividida em bandas: duas impressões a até `distance` bits
+    de distância coincidem em ao menos uma banda se houver distance + 1
+    bandas.
+    """
+
+    def __init__(self, distance=CHUNK_DEDUP_DISTANCE):
+        self.distance = distance
+        self.bands = distance + 1
+        self.band_bits = SIMHASH_BITS // self.bands
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [
+            (fingerprint >> (band * self.band_bits)) & mask
+            for band in range(self.bands)
+        ]
+
+    def add(self, fingerprint):
+        """
+        Adiciona a impressão se não houver outra próxima a ela.
+
+        Returns:
+            bool: True se a impressão foi adicionada, False se é quase
+            duplicada de uma já existente.
+        """
+        keys = self._band_keys(fingerprint)
+        for bucket, key in zip(self._buckets, keys):
+            for other in bucket.get(key, ()):
+                if bin(fingerprint ^ other).count('1') <= self.distance:
+                    return False
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(fingerprint)
+        return True
+
+
+class Chunker:
+    """
+    Divisor de conteúdo compartilhado por uma execução de ingestão, para que
+    parágrafos repetidos e segmentos quase duplicados entre páginas sejam
+    indexados apenas uma vez.
+    """
+
+    def __init__(
+        self,
+        max_tokens=CHUNK_MAX_TOKENS,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        dedup_distance=CHUNK_DEDUP_DISTANCE,
+    ):
+        """
+        Inicializa o divisor.
+
+        Args:
+            max_tokens (int): Tokens máximos por segmento.
+            overlap_tokens (int): Tokens repetidos entre segmentos vizinhos.
+            dedup_distance (int): Distância de Hamming máxima entre SimHashes
+                para considerar dois segmentos quase duplicados. Negativo
+                desativa a remoção.
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.dedup = dedup_distance >= 0
+        self._fingerprints = SimHashIndex(max(dedup_distance, 0))
+        self._paragraphs = set()
+        self._lock = threading.Lock()
+
+    def _is_new_paragraph(self, paragraph):
+        digest = hashlib.blake2b(
+            paragraph.casefold().encode('utf-8'), digest_size=16
+        ).digest()
+        with self._lock:
+            if digest in self._paragraphs:
+                return False
+            self._paragraphs.add(digest)
+            return True
+
+    def _is_new_chunk(self, chunk):
+        fingerprint = simhash(chunk)
+        with self._lock:
+            return self._fingerprints.add(fingerprint)
+
+    def split(self, text):
+        """
+        Gera os segmentos do texto.
+
+        Args:
+            text (str): Conteúdo bruto.
+
+        Yields:
+            str: Segmentos a serem indexados.
+        """
+        paragraphs = iter_paragraphs(text)
+        if self.dedup:
+            paragraphs = filter(self._is_new_paragraph, paragraphs)
+        chunks = pack_units(
+            iter_units(paragraphs, self.max_tokens),
+            self.max_tokens,
+            self.overlap_tokens,
+        )
+        for chunk in chunks:
+            if not self.dedup or self._is_new_chunk(chunk):
+                yield chunk
@@ -0,0 +1,214 @@
+"""
+Montagem do contexto enviado ao Groq no fluxo RAG.
+Os candidatos recuperados do índice são reordenados por relevância marginal
+máxima (MMR), trechos repetidos são descartados e o contexto é preenchido de
+forma gulosa até o orçamento de tokens do modelo. A relevância de cada
+trecho é a pontuação da recuperação (a fusão BM25 + vetorial, quando
+ativa); os embeddings servem apenas para medir a redundância entre trechos.
+"""
+
+import numpy as np
+from back.config import (
+    RAG_CONTEXT_TOKENS,
+    RAG_DUPLICATE_SIMILARITY,
+    RAG_MMR_LAMBDA,
+    RAG_RESPONSE_TOKENS,
+    RAG_TOKEN_ESTIMATE_MARGIN,
+)
+from back.model_router import router
+from back.tokens import estimate_tokens
+
+from .embeddings import get_embedder
+
+
+def match_contents(matches):
+    """
+    Extrai o conteúdo dos resultados da consulta, sem repetições exatas e
+    na ordem de pontuação do índice.
+
+    Args:
+        matches (list[dict]): Resultados retornados pelo índice.
+
+    Returns:
+        tuple[list[str], list[float]]: Conteúdos distintos e não vazios e a
+        pontuação de recuperação de cada um (None se ausente).
+    """
+    seen = set()
+    contents, scores = [], []
+    for match in matches:
+        content = match.get('metadata', {}).get('content', '').strip()
+        key = ' '.join(content.casefold().split())
+        if key and key not in seen:
+            seen.add(key)
+            contents.append(content)
+            scores.append(match.get('score'))
+    return contents, scores
+
+
+def retrieval_relevance(scores):
+    """
+    Converte as pontuações de recuperação em relevância entre 0 e 1.
+    Pontuações RRF e de similaridade têm escalas diferentes, então são
+    normalizadas pelo mínimo e máximo; sem pontuações, usa a posição.
+
+    Args:
+        scores (list[float]): Pontuações na ordem da recuperação.
+
+    Returns:
+        np.ndarray: Relevância de cada candidato.
+    """
+    count = len(scores)
+    if any(score is None for score in scores):
+        return 1.0 - np.arange(count, dtype=np.float32) / count
+    scores = np.asarray(scores, dtype=np.float32)
+    spread = scores.max() - scores.min()
+    if spread <= 0:
+        return np.ones(count, dtype=np.float32)
+    return (scores - scores.min()) / spread
+
+
+def mmr(
+    relevance,
+    vectors,
+    mmr_lambda=RAG_MMR_LAMBDA,
+    duplicate_similarity=RAG_DUPLICATE_SIMILARITY,
+):
+    """
+    Ordena os candidatos por relevância marginal máxima.
+    A cada passo escolhe o candidato que maximiza
+    lambda * relevância(d) - (1 - lambda) * max sim(d, selecionados).
+    Candidatos com similaridade a um já escolhido igual ou acima de
+    duplicate_similarity são descartados.
+
+    Args:
+        relevance (np.ndarray): Relevância de cada candidato.
+        vectors (np.ndarray): Embeddings normalizados dos candidatos.
+        mmr_lambda (float): Peso da relevância frente à diversidade.
+        duplicate_similarity (float): Similaridade de corte para repetidos.
+
+    Returns:
+        list[int]: Índices dos candidatos mantidos, na ordem escolhida.
+    """
+    similarity = vectors @ vectors.T
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32)
+    remaining = np.ones(len(vectors), dtype=bool)
+    order = []
+    while remaining.any():
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * penalty
+        scores[~remaining] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        remaining &= redundancy < duplicate_similarity
+    return order
+
+
+def pack(contents, budget):
+    """
+    Preenche o orçamento de forma gulosa, na ordem dada. Um trecho que não
+    cabe é ignorado, mas os seguintes ainda são considerados.
+
+    Args:
+        contents (list[str]): Trechos em ordem de preferência.
+        budget (int): Tokens disponíveis.
+
+    Returns:
+        tuple[list[str], int]: Trechos escolhidos e tokens usados.
+    """
+    selected = []
+    used = 0
+    for content in contents:
+        tokens = estimate_tokens(content)
+        if used + tokens <= budget:
+            selected.append(content)
+            used += tokens
+    return selected, used
+
+
+class ContextAssembler:
+    """
+    Seleciona os trechos de contexto de uma pergunta a partir dos candidatos
+    recuperados do índice.
+    """
+
+    def __init__(
+        self,
+        token_budget=RAG_CONTEXT_TOKENS,
+        mmr_lambda=RAG_MMR_LAMBDA,
+        duplicate_similarity=RAG_DUPLICATE_SIMILARITY,
+        response_tokens=RAG_RESPONSE_TOKENS,
+        estimate_margin=RAG_TOKEN_ESTIMATE_MARGIN,
+    ):
+        """
+        Inicializa o montador.
+
+        Args:
+            token_budget (int): Tokens máximos do contexto.
+            mmr_lambda (float): Peso da relevância no MMR.
+            duplicate_similarity (float): Similaridade a partir da qual um
+                trecho é considerado repetido.
+            response_tokens (int): Tokens reservados para a resposta na
+                janela do modelo.
+            estimate_margin (float): Fração de folga sobre os tokens
+                estimados do prompt, que podem ficar abaixo dos reais.
+        """
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_similarity = duplicate_similarity
+        self.response_tokens = response_tokens
+        self.estimate_margin = estimate_margin
+
+    def budget(self, prompt, template_tokens=0):
+        """
+        Calcula os tokens disponíveis para o contexto, limitados pela menor
+        janela dos modelos da rota 'rag', descontados a resposta, a pergunta
+        e o modelo do prompt. A pergunta, o modelo e o contexto são medidos
+        por estimate_tokens, que é aproximado; por isso a parte da janela
+        que lhes cabe é dividida por 1 + estimate_margin.
+        """
+        window = router.context_window('rag') - self.response_tokens
+        available = (
+            int(window / (1 + self.estimate_margin))
+            - estimate_tokens(prompt)
+            - template_tokens
+        )
+        return max(0, min(self.token_budget, available))
+
+    def assemble(self, prompt, matches, template_tokens=0):
+        """
+        Seleciona os trechos enviados ao Groq.
+
+        Args:
+            prompt (str): Pergunta do usuário.
+            matches (list[dict]): Candidatos retornados pelo índice.
+            template_tokens (int): Tokens do restante do prompt.
+
+        Returns:
+            tuple[list[str], dict]: Trechos escolhidos, em ordem de
+            relevância, e estatísticas da seleção.
+        """
+        contents, scores = match_contents(matches)
+        budget = self.budget(prompt, template_tokens)
+        stats = {
+            'candidates': len(matches),
+            'distinct': len(contents),
+            'budget': budget,
+        }
+        if len(contents) > 1:
+            vectors = get_embedder().embed_batch(contents)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+            order = mmr(
+                retrieval_relevance(scores),
+                vectors,
+                self.mmr_lambda,
+                self.duplicate_similarity,
+            )
+            contents = [contents[i] for i in order]
+        selected, used = pack(contents, budget)
+        stats.update(
+            unique=len(contents), selected=len(selected), context_tokens=used
+        )
+        return selected, stats
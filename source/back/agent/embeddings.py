@@ -0,0 +1,171 @@
+"""
+Geração de embeddings.
+Define a interface de embedders e um embedder local, offline e vetorizado,
+baseado em hashing de n-gramas de caracteres.
+"""
+
+import unicodedata
+
+import numpy as np
+from back.config import EMBEDDER, EMBEDDING_DIMENSION
+
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_PRIME = np.uint64(0x100000001B3)
+_SHIFT = np.uint64(33)
+_SIGN_BIT = np.uint64(63)
+
+
+class Embedder:
+    """
+    Interface base para geradores de embeddings.
+    Subclasses devem implementar embed_batch.
+    """
+
+    dimension = EMBEDDING_DIMENSION
+    # Se a similaridade entre embeddings reflete o significado do texto.
+    semantic = True
+
+    def embed_batch(self, texts):
+        """
+        Gera embeddings para uma lista de textos.
+
+        Args:
+            texts (list[str]): Textos de entrada.
+
+        Returns:
+            np.ndarray: Matriz float32 contígua com formato (len(texts), dimension).
+        """
+        raise NotImplementedError
+
+    def embed(self, text):
+        """
+        Gera o embedding de um único texto.
+
+        Args:
+            text (str): Texto de entrada.
+
+        Returns:
+            np.ndarray: Vetor float32 com tamanho dimension.
+        """
+        return self.embed_batch([text])[0]
+
+
+class HashingEmbedder(Embedder):
+    """
+    Embedder local que projeta n-gramas de caracteres em um vetor de tamanho
+    fixo usando o hashing trick com sinal, seguido de normalização L2.
+    A similaridade é lexical, não semântica.
+    """
+
+    semantic = False
+
+    def __init__(self, dimension=EMBEDDING_DIMENSION, ngram_range=(3, 5)):
+        """
+        Inicializa o embedder.
+
+        Args:
+            dimension (int): Dimensão dos embeddings. Padrão: EMBEDDING_DIMENSION.
+            ngram_range (tuple[int, int]): Tamanhos mínimo e máximo dos n-gramas.
+        """
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normaliza o texto para a extração de n-gramas: minúsculas, sem acentos
+        e com espaços colapsados.
+        """
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = ''.join(
+            char for char in text if not unicodedata.combining(char)
+        )
+        return f' {" ".join(text.split())} '
+
+    def _hash_ngrams(self, codes):
+        """
+        Calcula os hashes de todos os n-gramas de um texto de forma vetorizada.
+
+        Args:
+            codes (np.ndarray): Codepoints do texto como uint64.
+
+        Returns:
+            np.ndarray: Hashes uint64 de todos os n-gramas.
+        """
+        hashes = []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+            h = np.full(count, n, dtype=np.uint64)
+            for k in range(n):
+                h = h * _PRIME + codes[k : k + count]
+            hashes.append(h)
+        if not hashes:
+            return np.empty(0, dtype=np.uint64)
+        h = np.concatenate(hashes)
+        # Finalizador do MurmurHash3 para espalhar os bits.
+        h ^= h >> _SHIFT
+        h *= _MIX_1
+        h ^= h >> _SHIFT
+        h *= _MIX_2
+        h ^= h >> _SHIFT
+        return h
+
+    def embed_batch(self, texts):
+        rows, buckets, signs = [], [], []
+        dimension = np.uint64(self.dimension)
+        for row, text in enumerate(texts):
+            normalized = self.normalize(text)
+            codes = np.frombuffer(
+                normalized.encode('utf-32-le'), dtype=np.uint32
+            ).astype(np.uint64)
+            h = self._hash_ngrams(codes)
+            rows.append(np.full(len(h), row, dtype=np.int64))
+            buckets.append((h % dimension).astype(np.int64))
+            signs.append(1.0 - 2.0 * (h >> _SIGN_BIT).astype(np.float64))
+
+        size = len(texts) * self.dimension
+        if rows:
+            flat = np.concatenate(rows) * self.dimension + np.concatenate(
+                buckets
+            )
+            matrix = np.bincount(
+                flat, weights=np.concatenate(signs), minlength=size
+            )
+        else:
+            matrix = np.zeros(size)
+        matrix = matrix.reshape(len(texts), self.dimension).astype(np.float32)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return np.ascontiguousarray(matrix)
+
+
+EMBEDDERS = {'hashing': HashingEmbedder}
+
+_embedder = None
+
+
+def register_embedder(name, factory):
+    """
+    Registra uma nova implementação de embedder selecionável por EMBEDDER.
+
+    Args:
+        name (str): Nome usado na configuração.
+        factory (callable): Função ou classe que retorna um Embedder.
+    """
+    EMBEDDERS[name] = factory
+
+
+def get_embedder():
+    """
+    Obtém a instância única do embedder configurado em EMBEDDER.
+    """
+    global _embedder
+    if _embedder is None:
+        if EMBEDDER not in EMBEDDERS:
+            raise ValueError(f'Embedder desconhecido: {EMBEDDER}')
+        _embedder = EMBEDDERS[EMBEDDER]()
+    return _embedder
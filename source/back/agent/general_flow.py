@@ -4,23 +4,220 @@ Gerenciamento do fluxo geral do agente.
 Implementa interações genéricas com o modelo.
 """
 
-from back.config import MODEL_ID
-from back.groq_client import get_groq_client
+import time
 
+from back.groq_client import get_async_groq_client, get_groq_client
+from back.groq_gateway import gateway
+from back.model_router import router
+from back.tokens import estimate_tokens
+from back.tracing import start_span
 
-def general_flow(prompt):
+
+class RouteCall:
+    """
+    Chamada ao Groq por uma rota do roteador de modelos: escolhe o modelo,
+    abre o span da etapa e registra latência e tokens ao final.
+    """
+
+    def __init__(self, route, prompt):
+        self.route = route
+        self.model, self.params, self.escalated = router.select(route, prompt)
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.started = time.perf_counter()
+        self.first_token_ms = None
+        self.stage = start_span(
+            'groq_completion',
+            route=route,
+            model=self.model,
+            escalated=self.escalated,
+            bytes=len(prompt.encode('utf-8')),
+        )
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def observe_first_token(self):
+        self.first_token_ms = self.elapsed_ms()
+        self.stage.set(first_token_ms=self.first_token_ms)
+
+    def finish(self, prompt_tokens, completion_tokens):
+        self.stage.set(
+            tokens=prompt_tokens + completion_tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        self.stage.end()
+        router.record(
+            self.route,
+            self.model,
+            self.escalated,
+            self.elapsed_ms(),
+            prompt_tokens,
+            completion_tokens,
+            self.first_token_ms,
+        )
+
+    def finish_response(self, chat_completion):
+        """
+        Finaliza a chamada com os tokens informados pelo Groq, ou estimados
+        a partir da resposta se o uso não vier na resposta.
+        """
+        usage = getattr(chat_completion, 'usage', None)
+        if usage is not None:
+            self.finish(usage.prompt_tokens, usage.completion_tokens)
+        else:
+            self.finish(
+                self.prompt_tokens,
+                estimate_tokens(chat_completion.choices[0].message.content),
+            )
+
+    def fail(self):
+        self.stage.end()
+
+
+class StreamRecorder:
+    """
+    Acompanha um stream do Groq e finaliza a chamada quando ele termina,
+    registrando o tempo até o primeiro trecho e os tokens estimados.
+    """
+
+    def __init__(self, call):
+        self.call = call
+        self.parts = []
+
+    def observe(self, delta):
+        if not self.parts:
+            self.call.observe_first_token()
+        self.parts.append(delta)
+
+    def close(self):
+        self.call.finish(
+            self.call.prompt_tokens, estimate_tokens(''.join(self.parts))
+        )
+
+
+def stream_deltas(chat_completion, call=None):
+    """
+    Converte um stream de chunks do Groq em um gerador de trechos de texto.
+
+    Args:
+        chat_completion: Stream retornado por chat.completions.create(stream=True).
+        call (RouteCall): Chamada de origem, finalizada ao fim do stream.
+
+    Yields:
+        str: Trechos de texto da resposta, na ordem em que são gerados.
+    """
+    recorder = StreamRecorder(call) if call is not None else None
+    try:
+        for chunk in chat_completion:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if recorder is not None:
+                    recorder.observe(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+async def astream_deltas(chat_completion, call=None):
+    """
+    Versão assíncrona de stream_deltas.
+    """
+    recorder = StreamRecorder(call) if call is not None else None
+    try:
+        async for chunk in chat_completion:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if recorder is not None:
+                    recorder.observe(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+def iter_text(text):
+    """
+    Expõe um texto já pronto como um stream de um único trecho.
+    """
+    yield text
+
+
+async def aiter_text(text):
+    """
+    Versão assíncrona de iter_text.
+    """
+    yield text
+
+
+def general_flow(prompt, stream=False, route='general'):
     """
     Gera uma resposta baseada no prompt fornecido.
-    Utiliza o modelo definido no ambiente para completar as interações.
+    O modelo e os limites da resposta são escolhidos pelo roteador de
+    modelos conforme a rota.
+
+    Args:
+        prompt (str): Prompt enviado ao modelo.
+        stream (bool): Se True, retorna um gerador de trechos de texto.
+        route (str): Rota do roteador ('intent', 'general' ou 'rag').
+
+    Returns:
+        str | Iterator[str]: Resposta completa ou gerador de trechos.
     """
     client_instance = get_groq_client()
-    chat_completion = client_instance.chat.completions.create(
-        messages=[
-            {
-                'role': 'user',
-                'content': prompt,
-            }
-        ],
-        model=MODEL_ID,
-    )
+    call = RouteCall(route, prompt)
+    try:
+        chat_completion = gateway.create(
+            client_instance,
+            messages=[
+                {
+                    'role': 'user',
+                    'content': prompt,
+                }
+            ],
+            model=call.model,
+            stream=stream,
+            **call.params,
+        )
+    except Exception:
+        call.fail()
+        raise
+    if stream:
+        return stream_deltas(chat_completion, call)
+    call.finish_response(chat_completion)
+    return chat_completion.choices[0].message.content
+
+
+async def ageneral_flow(prompt, stream=False, route='general'):
+    """
+    Versão assíncrona de general_flow, usando o cliente AsyncGroq.
+
+    Args:
+        prompt (str): Prompt enviado ao modelo.
+        stream (bool): Se True, retorna um gerador assíncrono de trechos.
+        route (str): Rota do roteador ('intent', 'general' ou 'rag').
+
+    Returns:
+        str | AsyncIterator[str]: Resposta completa ou gerador de trechos.
+    """
+    client_instance = get_async_groq_client()
+    call = RouteCall(route, prompt)
+    try:
+        chat_completion = await gateway.acreate(
+            client_instance,
+            messages=[
+                {
+                    'role': 'user',
+                    'content': prompt,
+                }
+            ],
+            model=call.model,
+            stream=stream,
+            **call.params,
+        )
+    except Exception:
+        call.fail()
+        raise
+    if stream:
+        return astream_deltas(chat_completion, call)
+    call.finish_response(chat_completion)
     return chat_completion.choices[0].message.content
@@ -3,7 +3,8 @@ Gerenciamento de indexação de conteúdo e consulta com integração ao fluxo d
 """
 
 from back.config import INDEX_NAME
-from back.pinecone_client import get_index
+from back.extraction import Extractor
+from back.vector_store import get_vector_index
 from back.tavily_client import get_tavily_client
 
 from .rag_flow import rag_flow
@@ -41,11 +42,11 @@ def index_site_content(prompt, urls_to_search):
     """
     tavily_client = get_tavily_client()
 
-    search_data = tavily_client.extract(urls=urls_to_search)
+    search_data = Extractor(tavily_client).extract(urls_to_search)
     if not search_data['results']:
         return 'Não foi possível extrair informações das URLs fornecidas.'
 
-    index = get_index(INDEX_NAME)
+    index = get_vector_index(INDEX_NAME)
     for result in search_data['results']:
         raw_content = result.get('raw_content', '')
         vector_id = clean_id(result.get('url', 'unknown'))
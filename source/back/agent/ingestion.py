@@ -0,0 +1,269 @@
+"""
+Subsistema de ingestão de conteúdo.
+Indexa as URLs configuradas fora do caminho das perguntas, registra quando
+cada fonte foi indexada e permite atualizações periódicas.
+
+Uso:
+    python -m back.agent.ingestion            # executa uma vez
+    python -m back.agent.ingestion --loop     # executa periodicamente
+    python -m back.agent.ingestion --force    # ignora o intervalo mínimo
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+from back.config import (
+    INDEX_NAME,
+    INGESTION_INTERVAL,
+    INGESTION_STATE_PATH,
+    RAG_URLS,
+)
+from back.extraction import Extractor
+from back.tavily_client import get_tavily_client
+
+from .chunking import Chunker
+from .rag_flow import PineconeIndexer
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionState:
+    """
+    Registro persistente do último horário de indexação de cada fonte.
+    """
+
+    def __init__(self, path=INGESTION_STATE_PATH):
+        """
+        Inicializa o registro carregando o arquivo de estado, se existir.
+
+        Args:
+            path (str): Caminho do arquivo JSON de estado.
+        """
+        self.path = path
+        self.sources = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.sources = json.load(file)
+
+    def last_indexed(self, url):
+        """
+        Retorna o timestamp da última indexação da URL ou None.
+        """
+        return self.sources.get(url, {}).get('last_indexed')
+
+    def is_stale(self, url, interval):
+        """
+        Indica se a URL precisa ser reindexada com base no intervalo.
+        """
+        last = self.last_indexed(url)
+        return last is None or time.time() - last >= interval
+
+    def content_hash(self, url):
+        """
+        Retorna o hash do conteúdo indexado da URL ou None.
+        """
+        return self.sources.get(url, {}).get('content_hash')
+
+    def segments(self, url):
+        """
+        Retorna a quantidade de segmentos registrada para a URL (0 se não
+        houver).
+        """
+        return self.sources.get(url, {}).get('segments') or 0
+
+    def mark_indexed(self, url, segments, content_hash=None):
+        """
+        Registra a indexação de uma URL e persiste o estado.
+
+        Args:
+            url (str): URL indexada.
+            segments (int): Quantidade de segmentos enviados ao índice.
+            content_hash (str): Hash do conteúdo indexado.
+        """
+        self.sources[url] = {
+            'last_indexed': time.time(),
+            'segments': segments,
+            'content_hash': content_hash,
+        }
+        self.save()
+
+    def mark_unchanged(self, url):
+        """
+        Registra que a URL foi verificada sem alterações no conteúdo.
+        """
+        self.sources.setdefault(url, {})['last_indexed'] = time.time()
+        self.save()
+
+    def mark_failed(self, url, segments):
+        """
+        Registra uma indexação incompleta. A URL fica sem hash e pendente,
+        para ser reindexada na próxima execução.
+
+        Args:
+            url (str): URL indexada parcialmente.
+            segments (int): Quantidade de ids de segmento que podem estar no
+                índice, para que os excedentes sejam removidos depois.
+        """
+        self.sources[url] = {
+            'last_indexed': None,
+            'segments': segments,
+            'content_hash': None,
+        }
+        self.save()
+
+    def save(self):
+        """
+        Grava o estado em disco de forma atômica.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.sources, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionJob:
+    """
+    Job que extrai e indexa o conjunto de URLs configurado.
+    """
+
+    def __init__(
+        self,
+        urls=None,
+        index_name=INDEX_NAME,
+        interval=INGESTION_INTERVAL,
+        state=None,
+    ):
+        """
+        Inicializa o job de ingestão.
+
+        Args:
+            urls (list[str]): URLs a serem indexadas. Padrão: RAG_URLS.
+            index_name (str): Nome do índice de destino.
+            interval (int): Intervalo mínimo, em segundos, entre indexações.
+            state (IngestionState): Registro de estado a ser utilizado.
+        """
+        self.urls = list(urls or RAG_URLS)
+        self.index_name = index_name
+        self.interval = interval
+        self.state = state or IngestionState()
+
+    def pending_urls(self, force=False):
+        """
+        Retorna as URLs que precisam ser indexadas.
+        """
+        if force:
+            return list(self.urls)
+        return [
+            url for url in self.urls if self.state.is_stale(url, self.interval)
+        ]
+
+    def run_once(self, force=False):
+        """
+        Extrai e indexa as URLs pendentes. Páginas cujo conteúdo não mudou
+        desde a última indexação não são reenviadas ao índice.
+
+        Args:
+            force (bool): Se True, extrai e reindexa todas as URLs.
+
+        Returns:
+            dict: Quantidade de segmentos indexados por URL.
+        """
+        urls = self.pending_urls(force)
+        if not urls:
+            logger.info('Nenhuma fonte pendente de indexação.')
+            return {}
+
+        search_data = Extractor(get_tavily_client()).extract(urls, force)
+        indexer = PineconeIndexer(self.index_name)
+        # Compartilhado entre as páginas para indexar cabeçalhos, rodapés e
+        # trechos repetidos apenas uma vez.
+        chunker = Chunker()
+        indexed = {}
+        for result in search_data.get('results', []):
+            url = result.get('url', 'unknown')
+            if result.get('stale'):
+                # Extração falhou e o conteúdo veio do cache; a falha é
+                # registrada abaixo e a URL continua pendente.
+                continue
+            raw_content = result.get('raw_content', '')
+            if not raw_content:
+                logger.warning('Conteúdo bruto vazio para a URL: %s', url)
+                continue
+            content_hash = result.get('content_hash')
+            # Sem hash, a página é tratada como alterada.
+            if (
+                not force
+                and content_hash is not None
+                and content_hash == self.state.content_hash(url)
+            ):
+                self.state.mark_unchanged(url)
+                logger.info('%s sem alterações.', url)
+                continue
+            previous = self.state.segments(url)
+            stats = indexer.index_segments(raw_content, url, chunker)
+            segments = stats['segments']
+            indexed[url] = stats['vectors']
+            if stats['failed_batches']:
+                self.state.mark_failed(url, max(segments, previous))
+                logger.warning(
+                    '%s indexada parcialmente (%d lotes com falha); será '
+                    'reindexada na próxima execução.',
+                    url,
+                    stats['failed_batches'],
+                )
+                continue
+            # Segmentos da versão anterior além dos atuais ficariam órfãos.
+            indexer.delete_segments(url, segments, previous)
+            self.state.mark_indexed(url, segments, content_hash)
+            logger.info('%s indexada (%d segmentos).', url, segments)
+        indexer.persist()
+
+        for failed in search_data.get('failed_results', []):
+            logger.warning('Falha ao extrair %s', failed.get('url', failed))
+        return indexed
+
+    def run_forever(self):
+        """
+        Executa a ingestão periodicamente conforme o intervalo configurado.
+        """
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Erro durante a ingestão.')
+            time.sleep(self.interval)
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description='Indexa as fontes do RAG.')
+    parser.add_argument(
+        '--loop', action='store_true', help='Executa periodicamente.'
+    )
+    parser.add_argument(
+        '--force', action='store_true', help='Reindexa todas as fontes.'
+    )
+    parser.add_argument(
+        '--interval',
+        type=int,
+        default=INGESTION_INTERVAL,
+        help='Intervalo entre execuções, em segundos.',
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    job = IngestionJob(interval=args.interval)
+    if args.loop:
+        job.run_forever()
+    else:
+        job.run_once(force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Classificador local de intenções.
+Modelo de centroide mais próximo sobre o embedder local, treinado com
+exemplos rotulados, usado antes de recorrer ao LLM. O limiar de confiança
+é medido sobre EVALUATION_EXAMPLES com `python -m back.agent.intent_classifier`.
+"""
+
+import argparse
+
+import numpy as np
+
+from .embeddings import get_embedder
+
+LABELED_EXAMPLES = {
+    'history_flow': [
+        'Qual foi minha primeira mensagem?',
+        'Qual foi a última mensagem que eu enviei?',
+        'Mostrar histórico da conversa',
+        'Ver histórico',
+        'O que eu perguntei antes?',
+        'What was my first message?',
+        'Show me the chat history',
+        'What did I ask you earlier?',
+    ],
+    'rag_flow': [
+        'Você conhece a WaProject?',
+        'O que a WaProject faz?',
+        'Quais serviços a WaProject oferece?',
+        'Onde fica a WaProject?',
+        'Como entro em contato com a WaProject?',
+        'A WaProject desenvolve aplicativos?',
+        'Quem são os clientes da Wa Project?',
+        'What does WaProject do?',
+        'Tell me about WaProject software services',
+        'How can I contact WaProject?',
+    ],
+    'general_flow': [
+        'Quem foi Alberto Santos-Dumont?',
+        'Me conte uma piada',
+        'Qual é a capital da França?',
+        'Como faço um bolo de chocolate?',
+        'Explique o que é inteligência artificial',
+        'Oi, tudo bem?',
+        'Bom dia!',
+        'Me responda de forma mais formal',
+        'Who painted the Mona Lisa?',
+        'How does photosynthesis work?',
+        'Hello, how are you?',
+    ],
+}
+
+# Conjunto de avaliação, separado dos exemplos de treino. Inclui mensagens
+# gerais que lembram os outros fluxos (empresas, "última", "história"), que
+# são as que o classificador confunde.
+EVALUATION_EXAMPLES = {
+    'history_flow': [
+        'Qual foi a primeira coisa que eu te perguntei?',
+        'Me mostra o histórico',
+        'Mostrar histórico página 2',
+        'Qual foi minha mensagem anterior?',
+        'O que eu te disse antes?',
+        'Repita minha última pergunta',
+        'Quais perguntas eu fiz até agora?',
+        'Ver meu histórico de mensagens',
+        'What was my last message?',
+        'Show my previous messages',
+        'What did I say before?',
+        'List the questions I asked',
+        'O que eu perguntei sobre preços?',
+        'Qual foi minha pergunta anterior?',
+        'Me lembra o que eu perguntei',
+    ],
+    'rag_flow': [
+        'O que é a WaProject?',
+        'A WaProject trabalha com inteligência artificial?',
+        'Qual o endereço da Wa Project?',
+        'A WaProject faz sites?',
+        'Quanto custa um projeto na WaProject?',
+        'Quais tecnologias a WaProject usa?',
+        'A WaProject tem vagas de emprego?',
+        'Quem fundou a WaProject?',
+        'Is WaProject hiring?',
+        'What technologies does WaProject use?',
+        'Where is WaProject located?',
+        'Qual o telefone da WaProject?',
+        'A empresa WaProject desenvolve software sob medida?',
+        'Me fale sobre a Wa Project',
+        'Quais os serviços da empresa?',
+    ],
+    'general_flow': [
+        'Qual a distância da Terra até a Lua?',
+        'Quem escreveu Dom Casmurro?',
+        'Como funciona um motor a combustão?',
+        'Me dê uma receita de lasanha',
+        'O que é um buraco negro?',
+        'Boa noite!',
+        'Obrigado pela ajuda',
+        'Traduza "bom dia" para o inglês',
+        'Quanto é 15 vezes 23?',
+        'What is the capital of Japan?',
+        'Write a haiku about rain',
+        'Who won the 2002 World Cup?',
+        'O que disse Einstein sobre a relatividade?',
+        'Explique a teoria da evolução',
+        'Qual a melhor linguagem de programação para iniciantes?',
+        'Quem é você?',
+        'Me ajuda a escrever um email para meu chefe',
+        'Qual empresa fabrica o iPhone?',
+        'O que é um projeto de software?',
+        'Qual foi o primeiro homem a pisar na Lua?',
+        'Mostre um exemplo de código Python',
+        'Qual a última versão do Python?',
+        'Resuma a conversa',
+        'Me recomende um filme',
+        'Como está o tempo hoje?',
+        'Qual a história do Brasil?',
+        'What is machine learning?',
+        'Tell me a joke',
+        'How do I cook rice?',
+        'O que significa a palavra saudade?',
+        'Quais são os planetas do sistema solar?',
+        'Me explique o que é uma API',
+        'Quanto custa um iPhone?',
+        'Onde fica a Torre Eiffel?',
+        'Como entro em contato com a Receita Federal?',
+    ],
+}
+
+
+class CentroidIntentClassifier:
+    """
+    Classificador de centroide mais próximo sobre embeddings normalizados.
+    """
+
+    def __init__(self, examples=None, embedder=None):
+        """
+        Treina o classificador calculando o centroide de cada intenção.
+
+        Args:
+            examples (dict[str, list[str]]): Exemplos rotulados por fluxo.
+            embedder (Embedder): Embedder utilizado. Padrão: get_embedder().
+        """
+        examples = examples or LABELED_EXAMPLES
+        self.embedder = embedder or get_embedder()
+        self.labels = list(examples)
+        centroids = np.stack(
+            [
+                self.embedder.embed_batch(examples[label]).mean(axis=0)
+                for label in self.labels
+            ]
+        )
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.where(norms > 0, norms, 1)
+
+    def predict(self, message):
+        """
+        Prediz a intenção de uma mensagem.
+
+        Args:
+            message (str): Mensagem do usuário.
+
+        Returns:
+            tuple[str, float]: Fluxo previsto e confiança, dada pela margem
+            de similaridade entre as duas intenções mais próximas.
+        """
+        scores = self.centroids @ self.embedder.embed(message)
+        order = np.argsort(-scores)
+        margin = float(scores[order[0]] - scores[order[1]])
+        return self.labels[order[0]], margin
+
+
+def evaluate(classifier, threshold, examples=None):
+    """
+    Mede o classificador em um conjunto rotulado para um limiar de confiança.
+
+    Args:
+        classifier (CentroidIntentClassifier): Classificador avaliado.
+        threshold (float): Confiança mínima para decidir sem o LLM.
+        examples (dict[str, list[str]]): Mensagens rotuladas por fluxo.
+            Padrão: EVALUATION_EXAMPLES.
+
+    Returns:
+        dict: Cobertura (fração decidida localmente), acurácia das decisões
+        locais e mensagens decididas localmente com o fluxo errado.
+    """
+    examples = examples or EVALUATION_EXAMPLES
+    total = 0
+    local = 0
+    errors = []
+    for label, messages in examples.items():
+        for message in messages:
+            total += 1
+            flow, confidence = classifier.predict(
+                ' '.join(message.casefold().split())
+            )
+            if confidence < threshold:
+                continue
+            local += 1
+            if flow != label:
+                errors.append((message, label, flow))
+    return {
+        'coverage': local / total if total else 0.0,
+        'accuracy': (local - len(errors)) / local if local else 1.0,
+        'errors': errors,
+    }
+
+
+def main(argv=None):
+    """
+    Imprime a cobertura e a acurácia locais para uma faixa de limiares.
+    """
+    parser = argparse.ArgumentParser(
+        description='Avalia o classificador local de intenções.'
+    )
+    parser.add_argument(
+        '--thresholds',
+        type=float,
+        nargs='+',
+        default=[0.05, 0.1, 0.15, 0.2, 0.25, 0.3],
+    )
+    args = parser.parse_args(argv)
+
+    classifier = CentroidIntentClassifier()
+    for threshold in args.thresholds:
+        result = evaluate(classifier, threshold)
+        print(
+            f'limiar {threshold:.2f}: cobertura {result["coverage"]:.0%}, '
+            f'acurácia {result["accuracy"]:.1%}'
+        )
+        for message, label, flow in result['errors']:
+            print(f'  {message!r}: {label} -> {flow}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,54 +3,113 @@ Camada de engenharia de prompts.
 Configura templates e processa intenções do usuário.
 """
 
+import logging
 import re
+import threading
+from collections import OrderedDict
 
-import streamlit as st
 from back import config
-from back.groq_client import get_groq_client
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from langchain.schema import AIMessage, HumanMessage
-from langchain_core.runnables import RunnableLambda, RunnableSequence
-
-client = get_groq_client()
-
-log_process_data = dict({})
-
-intention_prompt = PromptTemplate(
-    input_variables=['user_message'],
-    template=(
-        'Classifique a intenção do usuário com base na seguinte mensagem: '
-        '"{user_message}". Determine qual das intenções abaixo melhor representa a mensagem e forneça apenas o número correspondente:\n\n'
-        '(1) Pergunta sobre o chat: O usuário está perguntando sobre histórico, resumo ou informações passadas da conversa.\n'
-        '(2) Pergunta sobre a WaProject: O usuário está perguntando sobre contexto ou detalhes do empresa WaProject.\n'
-        '(3) Conversa geral: A mensagem é uma conversa comum, sem relação específica com os dois tópicos anteriores.'
-    ),
+from back.groq_gateway import RateLimitExceeded
+from back.tracing import annotate, span
+
+from .general_flow import ageneral_flow, general_flow
+from .intent_classifier import CentroidIntentClassifier
+from .session_memory import DEFAULT_SESSION, session_memory
+
+logger = logging.getLogger(__name__)
+
+INTENTION_TEMPLATE = (
+    'Classifique a intenção do usuário com base na seguinte mensagem: '
+    '"{user_message}". Determine qual das intenções abaixo melhor representa a mensagem e forneça apenas o número correspondente:\n\n'
+    '(1) Pergunta sobre o chat: O usuário está perguntando sobre histórico, resumo ou informações passadas da conversa.\n'
+    '(2) Pergunta sobre a WaProject: O usuário está perguntando sobre contexto ou detalhes do empresa WaProject.\n'
+    '(3) Conversa geral: A mensagem é uma conversa comum, sem relação específica com os dois tópicos anteriores.'
+)
+
+# Frases tratadas diretamente por handle_history_question. Os mesmos
+# padrões decidem o roteamento para history_flow e a resposta.
+first_message = re.compile(r'primeira mensagem')
+last_message = re.compile(r'[uú]ltima mensagem')
+show_history = re.compile(r'(?:mostrar|ver) hist[oó]rico')
+history_keywords = re.compile(
+    '|'.join(
+        pattern.pattern
+        for pattern in (first_message, last_message, show_history)
+    )
 )
 
+# Perguntas sobre o que o próprio usuário disse a respeito de um assunto.
+# O sujeito precisa estar na primeira pessoa ('perguntei', 'eu disse'), para
+# que 'o que disse Einstein sobre...' não seja tratada como histórico.
+history_question = re.compile(
+    r'que (?:eu )?(?:perguntei|falei|mencionei|pedi)'
+    r'|que eu disse'
+    r'|what did i (?:ask|say|mention)'
+)
+history_topic = re.compile(
+    rf'(?:e )?(?:o )?(?:{history_question.pattern})'
+    r'(?: (?:a você|para você|you))?'
+    r' (?:sobre|a respeito d[eoa]s?|de|about) (?P<topic>.+)'
+)
+history_page = re.compile(r'p[aá]gina (\d+)|page (\d+)')
+
+
+def groq_chat_completion(prompt_text):
+    """
+    Envia o prompt de intenção ao Groq pela rota 'intent' e retorna o texto
+    da resposta.
+    """
+    return general_flow(prompt_text, route='intent')
+
+
+async def agroq_chat_completion(prompt_text):
+    """
+    Versão assíncrona de groq_chat_completion.
+    """
+    return await ageneral_flow(prompt_text, route='intent')
+
+
+def build_intention_chain():
+    """
+    Monta a cadeia de intenção do LangChain. O LangChain é importado apenas
+    aqui, pois só é necessário quando o classificador local não decide.
+    """
+    from langchain.prompts import PromptTemplate
+    from langchain_core.runnables import RunnableLambda, RunnableSequence
+
+    intention_prompt = PromptTemplate(
+        input_variables=['user_message'], template=INTENTION_TEMPLATE
+    )
+    return RunnableSequence(
+        RunnableLambda(lambda inputs: intention_prompt.format(**inputs)),
+        RunnableLambda(groq_chat_completion, afunc=agroq_chat_completion),
+    )
+
 
 class PromptEngineeringLayer:
     """
     Classe para gerenciar prompts e intenções do usuário.
-    Armazena o histórico de conversas e processa mensagens.
+    Registra o histórico de conversas de cada sessão e processa mensagens.
     """
 
     intention_label = {1: 'history_flow', 2: 'rag_flow', 3: 'general_flow'}
+    intent_cache_size = 1024
 
-    def __init__(self):
-        self.memory = ConversationBufferMemory(return_messages=True)
-
-        def groq_chat_completion(prompt_text):
-            response = client.chat.completions.create(
-                messages=[{'role': 'user', 'content': prompt_text}],
-                model=config.MODEL_ID,
-            )
-            return response.choices[0].message.content
+    def __init__(self, memory=session_memory):
+        self.memory = memory
+        self.intent_classifier = CentroidIntentClassifier()
+        self.intent_cache = OrderedDict()
+        self._intent_cache_lock = threading.Lock()
+        self._intention_chain = None
 
-        self.intention_chain = RunnableSequence(
-            RunnableLambda(lambda inputs: intention_prompt.format(**inputs)),
-            RunnableLambda(groq_chat_completion),
-        )
+    @property
+    def intention_chain(self):
+        """
+        Cadeia de classificação de intenção, construída no primeiro uso.
+        """
+        if self._intention_chain is None:
+            self._intention_chain = build_intention_chain()
+        return self._intention_chain
 
     @staticmethod
     def is_nonsense_message(user_message):
@@ -92,67 +151,223 @@ class PromptEngineeringLayer:
             return 3
         return None
 
+    @staticmethod
+    def normalize_message(user_message):
+        """
+        Normaliza a mensagem para memoização: minúsculas e espaços colapsados.
+        """
+        return ' '.join(user_message.casefold().split())
+
+    def classify_locally(self, user_message):
+        """
+        Classifica a mensagem com verificações locais, sem chamar o LLM.
+        Aplica, em ordem, as regras de mensagem sem sentido, as frases de
+        histórico (apenas quando a mensagem inteira é uma delas, no caso das
+        perguntas por assunto) e o classificador de centroides.
+
+        Args:
+            user_message (str): Mensagem do usuário já normalizada.
+
+        Returns:
+            str: Fluxo detectado ou None se a confiança for baixa.
+        """
+        if self.is_nonsense_message(user_message):
+            return 'nonsense'
+        if history_keywords.search(user_message) or history_topic.fullmatch(
+            user_message
+        ):
+            return self.intention_label[1]
+        flow, confidence = self.intent_classifier.predict(user_message)
+        if confidence >= config.INTENT_CONFIDENCE_THRESHOLD:
+            return flow
+        return None
+
+    def parse_llm_intent(self, detected_intent):
+        """
+        Converte a resposta da cadeia de intenção no fluxo correspondente.
+        """
+        detected_intent = detected_intent.strip()
+        annotate(raw_intent=detected_intent)
+        return self.intention_label.get(
+            self.get_intent_id(detected_intent), 'nonsense'
+        )
+
+    def classify_with_llm(self, user_message):
+        """
+        Classifica a mensagem usando a cadeia de intenção do Groq.
+
+        Args:
+            user_message (str): Mensagem do usuário.
+
+        Returns:
+            str: Fluxo detectado ou 'nonsense'.
+        """
+        return self.parse_llm_intent(
+            self.intention_chain.invoke({'user_message': user_message})
+        )
+
+    async def aclassify_with_llm(self, user_message):
+        """
+        Versão assíncrona de classify_with_llm.
+        """
+        return self.parse_llm_intent(
+            await self.intention_chain.ainvoke({'user_message': user_message})
+        )
+
+    def remember_intent(self, normalized, flow):
+        """
+        Memoiza o fluxo de uma mensagem normalizada, limitando o tamanho.
+        O cache é compartilhado entre as threads do Streamlit, do lote e do
+        loop assíncrono, por isso é acessado sob um lock.
+        """
+        with self._intent_cache_lock:
+            self.intent_cache[normalized] = flow
+            if len(self.intent_cache) > self.intent_cache_size:
+                self.intent_cache.popitem(last=False)
+
+    def lookup_intent(self, user_message, session_id=DEFAULT_SESSION):
+        """
+        Registra a mensagem no histórico e tenta classificá-la sem o LLM.
+
+        Returns:
+            tuple[str, str]: Mensagem normalizada e fluxo detectado, ou None
+            quando o LLM precisa ser consultado.
+        """
+        self.memory.add_turn(session_id, 'user', user_message)
+        normalized = self.normalize_message(user_message)
+        with self._intent_cache_lock:
+            cached_flow = self.intent_cache.get(normalized)
+            if cached_flow is not None:
+                self.intent_cache.move_to_end(normalized)
+        if cached_flow is not None:
+            return normalized, cached_flow
+        current_flow = self.classify_locally(normalized)
+        if current_flow is not None:
+            self.remember_intent(normalized, current_flow)
+        return normalized, current_flow
 
-    def get_user_intent(self, user_message):
-            """
-            Processa a mensagem do usuário para determinar sua intenção e o fluxo associado.
+    def get_user_intent(self, user_message, session_id=DEFAULT_SESSION):
+        """
+        Processa a mensagem do usuário para determinar sua intenção e o fluxo associado.
 
-            Este método salva o contexto da mensagem do usuário,
-            invoca a cadeia de intenção para detectar a intenção associada à mensagem e mapeia
-            a intenção detectada para um fluxo correspondente. Caso ocorra um erro durante o
-            processamento, um fluxo padrão ('nonsense') é retornado.
+        Este método salva o contexto da mensagem do usuário e classifica a
+        intenção em camadas: primeiro a decisão memoizada, depois as
+        verificações locais e, apenas quando a confiança é baixa, a cadeia de
+        intenção do Groq. Caso ocorra um erro durante o processamento, um
+        fluxo padrão ('nonsense') é retornado; o limite de requisições do
+        Groq (RateLimitExceeded) é propagado.
+
+        Args:
+            user_message (str): A mensagem do usuário para análise de intenção.
+            session_id (str): Identificador da sessão do usuário.
 
-            Args:
-                user_message (str): A mensagem do usuário para análise de intenção.
+        """
+        try:
+            with span('intent_classification', tier='local') as stage:
+                normalized, current_flow = self.lookup_intent(
+                    user_message, session_id
+                )
+                if current_flow is None:
+                    stage.set(tier='llm')
+                    current_flow = self.classify_with_llm(user_message)
+                    self.remember_intent(normalized, current_flow)
+                stage.set(flow=current_flow)
+            return current_flow
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            logger.warning('Erro ao processar intenção: %s', e)
+            return 'nonsense'
 
-            """
-            try:
-                self.memory.save_context({'user': user_message}, {'bot': ''})
-                detected_intent = self.intention_chain.invoke(
-                    {'user_message': user_message}
-                ).strip()
-                current_flow = self.intention_label.get(
-                    self.get_intent_id(detected_intent), 'nonsense'
+    async def aget_user_intent(self, user_message, session_id=DEFAULT_SESSION):
+        """
+        Versão assíncrona de get_user_intent.
+        """
+        try:
+            with span('intent_classification', tier='local') as stage:
+                normalized, current_flow = self.lookup_intent(
+                    user_message, session_id
                 )
-                log_process_data.update({'raw_intent': detected_intent})
-                return current_flow
-            except Exception as e:
-                st.warning(f'Erro ao processar intenção: {str(e)}')
-                return 'nonsense'
+                if current_flow is None:
+                    stage.set(tier='llm')
+                    current_flow = await self.aclassify_with_llm(user_message)
+                    self.remember_intent(normalized, current_flow)
+                stage.set(flow=current_flow)
+            return current_flow
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            logger.warning('Erro ao processar intenção: %s', e)
+            return 'nonsense'
 
-    def handle_history_question(self, user_message):
+    def handle_history_question(
+        self, user_message, session_id=DEFAULT_SESSION
+    ):
         """
         Processa perguntas relacionadas ao histórico de conversas.
-        Retorna o histórico formatado ou informações específicas.
+        Retorna o histórico formatado, uma página dele ou as mensagens do
+        usuário sobre um assunto, consultando o índice da sessão.
+
+        Returns:
+            str: Resposta, ou None se a mensagem não for uma das consultas
+            ao histórico; nesse caso o fluxo geral deve responder.
         """
-        history = self.memory.load_memory_variables({}).get('history', [])
+        history = self.memory.get(session_id)
+        message = user_message.lower()
 
-        if 'primeira mensagem' in user_message.lower() and history:
-            return f"Sua primeira mensagem foi: '{history[0].content}'"
-        elif 'última mensagem' in user_message.lower() and history:
-            return f"Sua última mensagem foi: '{history[-1].content}'"
-        elif (
-            'mostrar histórico' in user_message.lower()
-            or 'ver histórico' in user_message.lower()
-        ):
-            formatted_history = 'Aqui está o histórico de mensagens:\n\n'
-            for msg in history:
-                if isinstance(msg, HumanMessage):
-                    formatted_history += f'Usuário: {msg.content}\n'
-                elif isinstance(msg, AIMessage):
-                    formatted_history += f'Bot: {msg.content}\n'
-            return (
-                formatted_history
-                if history
-                else 'Não tenho registro de mensagens anteriores.'
+        topic = history_topic.search(message)
+        if topic:
+            return self.search_history(history, topic.group('topic'))
+        if first_message.search(message) and history.first_user_turn:
+            return f"Sua primeira mensagem foi: '{history.first_user_turn.content}'"
+        # A pergunta atual já foi registrada; a anterior vem antes dela.
+        elif last_message.search(message) and history.previous_user_turn:
+            return f"Sua última mensagem foi: '{history.previous_user_turn.content}'"
+        elif show_history.search(message):
+            if not history.turns:
+                return 'Não tenho registro de mensagens anteriores.'
+            page = history_page.search(message)
+            number = int(page.group(1) or page.group(2)) if page else 1
+            turns, pages = history.page(number)
+            lines = [
+                f"{'Usuário' if turn.role == 'user' else 'Bot'}: {turn.content}"
+                for turn in turns
+            ]
+            header = 'Aqui está o histórico de mensagens'
+            if pages > 1:
+                header += f' (página {min(number, pages)} de {pages})'
+            return f'{header}:\n\n' + '\n'.join(lines)
+
+        return None
+
+    @staticmethod
+    def search_history(history, topic):
+        """
+        Lista as mensagens anteriores do usuário sobre o assunto.
+        """
+        topic = topic.strip(' ?!.')
+        current = history.last_user_turn
+        with span('history_search') as stage:
+            turns = history.search(
+                topic, before=current.seq if current else None
             )
+            stage.set(matches=len(turns))
+        if not turns:
+            return f"Não encontrei mensagens suas sobre '{topic}'."
+        lines = [f"- '{turn.content}'" for turn in turns]
+        return f"Suas mensagens sobre '{topic}':\n\n" + '\n'.join(lines)
 
-            return 'Essa pergunta não está relacionada ao histórico. Posso ajudar com mais alguma coisa?'
+    def store_answer(self, answer, session_id=DEFAULT_SESSION):
+        """
+        Armazena a resposta do bot no histórico da sessão.
+        """
+        self.memory.add_turn(session_id, 'assistant', answer)
 
-    def store_preference(self, preference):
+    def store_preference(self, preference, session_id=DEFAULT_SESSION):
         """
         Armazena as preferências do usuário no histórico de memória.
         """
-        self.memory.save_context(
-            {'user': preference}, {'bot': 'Preferência registrada.'}
+        self.memory.add_turn(session_id, 'user', preference)
+        self.memory.add_turn(
+            session_id, 'assistant', 'Preferência registrada.'
         )
@@ -1,38 +1,84 @@
+import asyncio
+import logging
 import unicodedata
 
-import streamlit as st
-from back.config import INDEX_NAME
-from back.pinecone_client import get_index
-from back.tavily_client import get_tavily_client
+from back import config
+from back.async_utils import AsyncIndex
+from back.config import (
+    HYBRID_RETRIEVAL,
+    RAG_CANDIDATES,
+    RAG_CONTEXT_TOKENS,
+    VECTOR_QUERY_TIMEOUT,
+)
+from back.extraction import Extractor
+from back.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from back.tavily_client import get_async_tavily_client, get_tavily_client
+from back.tokens import CHARS_PER_TOKEN, estimate_tokens
+from back.tracing import annotate, span
+from back.translation import language_instruction
+from back.vector_store import get_vector_index
+
+from .bulk_upsert import BulkUpserter
+from .chunking import Chunker
+from .context_assembly import ContextAssembler
+from .embeddings import get_embedder
+from .general_flow import ageneral_flow, aiter_text, general_flow, iter_text
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_INSTRUCTION = (
+    'Baseado nas informações a seguir, responda de forma clara e objetiva:'
+)
+NO_CONTEXT_MESSAGE = 'Desculpe, não consegui encontrar informações relevantes para sua pergunta.'
+URLS_FAILED_MESSAGE = 'Não foi possível processar as URLs fornecidas.'
+# Respostas de falha, que não devem ir para o cache de respostas.
+FALLBACK_MESSAGES = frozenset({NO_CONTEXT_MESSAGE, URLS_FAILED_MESSAGE})
+# Ids por chamada de delete (limite do Pinecone).
+DELETE_BATCH_SIZE = 1000
+
+
+def cached_results(search_data):
+    """
+    Conta os resultados servidos pelo cache de extrações.
+    """
+    return sum(
+        1 for result in search_data.get('results', []) if result.get('cached')
+    )
+
 
-from .general_flow import general_flow
+def extracted_bytes(search_data):
+    """
+    Soma o tamanho, em bytes, do conteúdo extraído pelo Tavily.
+    """
+    return sum(
+        len(result.get('raw_content', '').encode('utf-8'))
+        for result in search_data.get('results', [])
+        if result.get('raw_content')
+    )
 
 
 class TextProcessor:
     """
     Classe responsável por processar textos. Oferece métodos para:
-    - Criar embeddings a partir de texto.
+    - Criar embeddings a partir de texto (delegando ao embedder configurado).
     - Limpar e normalizar identificadores de texto.
     - Dividir conteúdo em segmentos menores.
     """
 
     @staticmethod
-    def create_embedding(text, dimension=1536):
+    def create_embedding(text, dimension=None):
         """
-        Gera um embedding para um texto fornecido com base em valores numéricos
-        correspondentes aos caracteres.
+        Gera um embedding para um texto fornecido usando o embedder configurado.
 
         Args:
             text (str): Texto de entrada.
-            dimension (int): Dimensão do embedding. Padrão: 1536.
+            dimension (int): Mantido por compatibilidade; a dimensão é definida
+                pelo embedder.
 
         Returns:
             list[float]: Embedding gerado com os valores normalizados.
         """
-        embedding = [float(ord(char) % 256) for char in text[:dimension]]
-        if len(embedding) < dimension:
-            embedding.extend([0.0] * (dimension - len(embedding)))
-        return embedding
+        return get_embedder().embed(text).tolist()
 
     @staticmethod
     def clean_id(text):
@@ -54,79 +100,188 @@ class TextProcessor:
         return ''.join(char if char.isalnum() else '_' for char in text)
 
     @staticmethod
-    def split_content(raw_content, max_segment_length=1000):
+    def split_content(raw_content, chunker=None):
         """
-        Divide um texto em segmentos menores com base no comprimento máximo especificado.
+        Divide um texto em segmentos respeitando parágrafos e frases, até o
+        orçamento de tokens configurado, sem segmentos quase duplicados.
 
         Args:
             raw_content (str): Texto bruto a ser dividido.
-            max_segment_length (int): Comprimento máximo de cada segmento. Padrão: 1000.
+            chunker (Chunker): Divisor compartilhado entre páginas. Se None,
+                a remoção de duplicados vale apenas para este texto.
 
         Returns:
             list[str]: Lista de segmentos de texto.
         """
-        segments = []
-        while len(raw_content) > max_segment_length:
-            segments.append(raw_content[:max_segment_length])
-            raw_content = raw_content[max_segment_length:]
-        if raw_content:
-            segments.append(raw_content)
-        return segments
+        return list((chunker or Chunker()).split(raw_content))
 
 
 class PineconeIndexer:
     """
     Classe responsável pela interação com o Pinecone.
     Oferece métodos para indexação de segmentos e consulta ao índice.
+    Com HYBRID_RETRIEVAL, os segmentos também são indexados no índice
+    lexical (BM25), consultado junto ao vetorial.
     """
 
     def __init__(self, index_name):
         """
-        Inicializa a classe com um índice Pinecone específico.
+        Inicializa a classe com um índice específico do backend configurado
+        em VECTOR_BACKEND (Pinecone ou índice local).
 
         Args:
             index_name (str): Nome do índice Pinecone.
         """
-        self.index = get_index(index_name)
+        self.index = get_vector_index(index_name)
+        self.lexical = (
+            get_lexical_index(index_name) if HYBRID_RETRIEVAL else None
+        )
 
-    def index_segments(self, raw_content, url):
+    def index_segments(self, raw_content, url, chunker=None):
         """
         Indexa segmentos de texto no Pinecone, gerando IDs únicos e metadados.
+        Os vetores são enviados em lotes paralelos pelo BulkUpserter.
 
         Args:
             raw_content (str): Conteúdo bruto a ser indexado.
             url (str): URL associada ao conteúdo.
+            chunker (Chunker): Divisor compartilhado pela execução de
+                ingestão, para descartar conteúdo repetido entre páginas.
+
+        Returns:
+            dict: Estatísticas do envio ('segments' gerados, 'vectors'
+            indexados e 'failed_batches' descartados após as novas
+            tentativas). Os segmentos usam os ids <url>_0 a
+            <url>_<segments - 1>.
         """
-        segments = TextProcessor.split_content(raw_content)
-        for i, segment in enumerate(segments):
-            vector_id = f'{TextProcessor.clean_id(url)}_{i}'
-            embedding = TextProcessor.create_embedding(segment)
-            metadata = {'url': url, 'content': segment}
-            self.index.upsert(
-                vectors=[
-                    {
-                        'id': vector_id,
-                        'values': embedding,
-                        'metadata': metadata,
-                    }
+        segments = TextProcessor.split_content(raw_content, chunker)
+        if not segments:
+            return {'segments': 0, 'vectors': 0, 'failed_batches': 0}
+        with span('embedding', bytes=len(raw_content.encode('utf-8'))):
+            embeddings = get_embedder().embed_batch(segments)
+        vectors = [
+            {
+                'id': f'{TextProcessor.clean_id(url)}_{i}',
+                'values': embeddings[i].tolist(),
+                'metadata': {'url': url, 'content': segment},
+            }
+            for i, segment in enumerate(segments)
+        ]
+        stats = BulkUpserter(self.index).upsert(vectors)
+        stats['segments'] = len(segments)
+        if self.lexical is not None:
+            self.lexical.add(
+                [
+                    (vector['id'], segment, vector['metadata'])
+                    for vector, segment in zip(vectors, segments)
                 ]
             )
+        return stats
+
+    def delete_segments(self, url, start, stop):
+        """
+        Remove os segmentos start a stop - 1 da URL, deixados por uma
+        indexação anterior que gerou mais segmentos que a atual.
+
+        Args:
+            url (str): URL dos segmentos.
+            start (int): Primeiro segmento a remover.
+            stop (int): Quantidade de segmentos da indexação anterior.
+        """
+        prefix = TextProcessor.clean_id(url)
+        ids = [f'{prefix}_{i}' for i in range(start, stop)]
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[i : i + DELETE_BATCH_SIZE])
+        if ids and self.lexical is not None:
+            self.lexical.delete(ids)
+
+    def persist(self):
+        """
+        Persiste o índice em disco quando o backend suporta (índice local),
+        assim como o índice lexical.
+        """
+        if hasattr(self.index, 'save'):
+            self.index.save()
+        if self.lexical is not None:
+            self.lexical.save()
+
+    def _lexical_query(self, prompt, top_k):
+        if self.lexical is None:
+            return None
+        with span('lexical_query', top_k=top_k) as stage:
+            result = self.lexical.query(prompt, top_k=top_k)
+            stage.set(matches=len(result['matches']))
+        return result
+
+    def _merge(self, vector_result, lexical_result, top_k):
+        """
+        Combina os resultados vetorial e lexical por RRF.
+        """
+        if not lexical_result or not lexical_result['matches']:
+            return vector_result
+        return reciprocal_rank_fusion([vector_result, lexical_result], top_k)
 
-    def query_index(self, prompt, top_k=3):
+    def _fallback(self, error, lexical_result):
+        """
+        Usa o resultado lexical quando a consulta vetorial falha; sem ele,
+        propaga o erro.
+        """
+        if not lexical_result or not lexical_result['matches']:
+            raise error
+        logger.warning(
+            'Consulta vetorial indisponível, usando o índice lexical: %r',
+            error,
+        )
+        annotate(retrieval_fallback='lexical')
+        return lexical_result
+
+    def query_index(self, prompt, top_k=RAG_CANDIDATES):
         """
         Realiza uma consulta no índice Pinecone com base em um prompt.
+        Com a busca híbrida, os resultados são combinados aos do índice
+        lexical, que também responde sozinho se a consulta vetorial falhar.
 
         Args:
             prompt (str): Prompt usado para gerar o embedding da consulta.
-            top_k (int): Número de resultados relevantes a serem retornados.
+            top_k (int): Número de candidatos a serem retornados; a seleção
+                do contexto é feita depois, pelo ContextAssembler.
 
         Returns:
             dict: Resultados da consulta, incluindo metadados relevantes.
         """
-        embedding = TextProcessor.create_embedding(prompt)
-        return self.index.query(
+        lexical_result = self._lexical_query(prompt, top_k)
+        with span('embedding', bytes=len(prompt.encode('utf-8'))):
+            embedding = get_embedder().embed(prompt).tolist()
+        try:
+            with span('vector_query', top_k=top_k) as stage:
+                result = self.index.query(
+                    vector=embedding, top_k=top_k, include_metadata=True
+                )
+                stage.set(matches=len(result['matches']))
+        except Exception as e:
+            return self._fallback(e, lexical_result)
+        return self._merge(result, lexical_result, top_k)
+
+    async def aquery_index(self, prompt, top_k=RAG_CANDIDATES):
+        """
+        Versão assíncrona de query_index. A consulta vetorial que exceder
+        VECTOR_QUERY_TIMEOUT segundos é substituída pelo resultado lexical.
+        """
+        lexical_result = self._lexical_query(prompt, top_k)
+        with span('embedding', bytes=len(prompt.encode('utf-8'))):
+            embedding = get_embedder().embed(prompt).tolist()
+        query = AsyncIndex(self.index).query(
             vector=embedding, top_k=top_k, include_metadata=True
         )
+        try:
+            with span('vector_query', top_k=top_k) as stage:
+                result = await asyncio.wait_for(
+                    query, VECTOR_QUERY_TIMEOUT or None
+                )
+                stage.set(matches=len(result['matches']))
+        except Exception as e:
+            return self._fallback(e, lexical_result)
+        return self._merge(result, lexical_result, top_k)
 
 
 class RagFlow:
@@ -135,22 +290,35 @@ class RagFlow:
     Combina extração de informações, indexação e geração de respostas.
     """
 
-    def __init__(self, tavily_client, indexer, max_response_length=5000):
+    def __init__(
+        self, tavily_client, indexer, max_response_length=5000, language=None
+    ):
         """
         Inicializa o fluxo RAG com um cliente Tavily e um indexador Pinecone.
 
         Args:
-            tavily_client: Instância do cliente Tavily.
+            tavily_client: Instância do cliente Tavily, ou None quando
+                não há extração (index_data=False).
             indexer (PineconeIndexer): Instância do indexador Pinecone.
-            max_response_length (int): Comprimento máximo permitido para a resposta.
+            max_response_length (int): Comprimento máximo, em caracteres, do
+                contexto enviado ao Groq; convertido em orçamento de tokens.
+            language (str): Idioma em que o Groq deve responder, se informado.
         """
         self.tavily_client = tavily_client
         self.indexer = indexer
         self.max_response_length = max_response_length
+        self.language = language
+        self.assembler = ContextAssembler(
+            token_budget=min(
+                RAG_CONTEXT_TOKENS, max_response_length // CHARS_PER_TOKEN
+            )
+        )
 
     def process_urls(self, urls_to_search, index_data=True):
         """
         Extrai conteúdo das URLs fornecidas e, opcionalmente, as indexa.
+        Páginas servidas pelo cache ou com conteúdo inalterado desde a última
+        extração não são reindexadas.
 
         Args:
             urls_to_search (list[str]): URLs para extração de dados.
@@ -159,82 +327,214 @@ class RagFlow:
         Returns:
             dict: Dados extraídos das URLs ou None se a extração falhar.
         """
-        search_data = self.tavily_client.extract(urls=urls_to_search)
+        with span('tavily_extract', urls=len(urls_to_search)) as stage:
+            search_data = Extractor(self.tavily_client).extract(urls_to_search)
+            stage.set(
+                bytes=extracted_bytes(search_data),
+                cached=cached_results(search_data),
+            )
         if not search_data['results']:
-            st.write(
+            logger.warning(
                 'Não foi possível extrair informações das URLs fornecidas.'
             )
             return None
 
         if index_data:
+            chunker = Chunker()
             for result in search_data['results']:
                 raw_content = result.get('raw_content', '')
                 if not raw_content:
-                    st.write(
-                        'Aviso: Conteúdo bruto está vazio para a URL:',
+                    logger.warning(
+                        'Conteúdo bruto vazio para a URL: %s',
                         result.get('url', 'unknown'),
                     )
                     continue
+                if not result.get('changed', True):
+                    continue
                 self.indexer.index_segments(
-                    raw_content, result.get('url', 'unknown')
+                    raw_content, result.get('url', 'unknown'), chunker
                 )
         return search_data
 
-    def generate_response(self, prompt):
+    def build_prompt(self, prompt, response):
         """
-        Gera uma resposta com base no prompt e nos dados extraídos.
+        Monta o prompt enviado ao Groq a partir dos resultados da consulta.
+        Os candidatos são reordenados por MMR, sem repetições, e incluídos
+        até o orçamento de tokens do contexto.
 
         Args:
             prompt (str): Pergunta do usuário.
-            search_data (dict): Dados extraídos e processados.
+            response (dict): Resultados da consulta ao índice.
 
         Returns:
-            str: Resposta gerada ou mensagem de erro.
+            str: Prompt com o contexto recuperado ou None se não houver
+            conteúdo relevante.
         """
-        response = self.indexer.query_index(prompt)
-        relevant_contents = [
-            match.get('metadata', {}).get('content', '').strip()
-            for match in response['matches']
-            if match.get('metadata', {}).get('content', '')
-        ]
+        with span('context_assembly') as stage:
+            instruction = language_instruction(self.language)
+            contents, stats = self.assembler.assemble(
+                prompt,
+                response['matches'],
+                estimate_tokens(CONTEXT_INSTRUCTION + instruction),
+            )
+            stage.set(**stats)
+            if not contents:
+                return None
+            context = '\n\n'.join(contents)
+            groq_prompt = (
+                f'{prompt}\n\n{CONTEXT_INSTRUCTION}\n\n{context}{instruction}'
+            )
+            stage.set(
+                bytes=len(groq_prompt.encode('utf-8')),
+                tokens=estimate_tokens(groq_prompt),
+            )
+        return groq_prompt
+
+    def generate_response(self, prompt, stream=False):
+        """
+        Gera uma resposta com base no prompt e nos dados extraídos.
 
-        total_length = 0
-        truncated_contents = []
-        for content in relevant_contents:
-            if (
-                total_length + len(content) + len(prompt)
-                > self.max_response_length
-            ):
-                break
-            truncated_contents.append(content)
-            total_length += len(content)
+        Args:
+            prompt (str): Pergunta do usuário.
+            stream (bool): Se True, retorna um gerador de trechos de texto.
 
-        if not truncated_contents:
-            return 'Desculpe, não consegui encontrar informações relevantes para sua pergunta.'
+        Returns:
+            str | Iterator[str]: Resposta gerada ou mensagem de erro.
+        """
+        groq_prompt = self.build_prompt(
+            prompt, self.indexer.query_index(prompt)
+        )
+        if groq_prompt is None:
+            return (
+                iter_text(NO_CONTEXT_MESSAGE) if stream else NO_CONTEXT_MESSAGE
+            )
+        return general_flow(prompt=groq_prompt, stream=stream, route='rag')
 
-        truncated_text = ' '.join(truncated_contents)
-        groq_prompt = f'{prompt}\n\nBaseado nas informações a seguir, responda de forma clara e objetiva:\n\n{truncated_text}'
-        return general_flow(prompt=groq_prompt)
+    async def agenerate_response(
+        self, prompt, stream=False, query_results=None
+    ):
+        """
+        Versão assíncrona de generate_response.
 
-    def execute(self, prompt, urls_to_search, index_data=True):
+        Args:
+            prompt (str): Pergunta do usuário.
+            stream (bool): Se True, retorna um gerador assíncrono de trechos.
+            query_results (dict): Resultados já obtidos do índice (por
+                exemplo, pela recuperação especulativa). Se None, o índice
+                é consultado.
+        """
+        if query_results is None:
+            query_results = await self.indexer.aquery_index(prompt)
+        groq_prompt = self.build_prompt(prompt, query_results)
+        if groq_prompt is None:
+            return (
+                aiter_text(NO_CONTEXT_MESSAGE)
+                if stream
+                else NO_CONTEXT_MESSAGE
+            )
+        return await ageneral_flow(
+            prompt=groq_prompt, stream=stream, route='rag'
+        )
+
+    def execute(self, prompt, urls_to_search, index_data=True, stream=False):
         """
         Executa o fluxo RAG completo: extração, indexação e geração de resposta.
+        Quando index_data é False, a extração é ignorada e apenas o índice
+        já populado pelo job de ingestão é consultado.
 
         Args:
             prompt (str): Pergunta do usuário.
             urls_to_search (list[str]): URLs a serem processadas.
             index_data (bool): Se True, os dados extraídos serão indexados.
+            stream (bool): Se True, retorna um gerador de trechos de texto.
 
         Returns:
-            str: Resposta gerada.
+            str | Iterator[str]: Resposta gerada.
         """
+        if not index_data:
+            return self.generate_response(prompt, stream)
         search_data = self.process_urls(urls_to_search, index_data)
         if not search_data:
-            return 'Não foi possível processar as URLs fornecidas.'
-        return self.generate_response(prompt)
+            return (
+                iter_text(URLS_FAILED_MESSAGE)
+                if stream
+                else URLS_FAILED_MESSAGE
+            )
+        return self.generate_response(prompt, stream)
+
+    async def aprocess_urls(self, urls_to_search, index_data=True):
+        """
+        Versão assíncrona de process_urls. Requer um cliente Tavily
+        assíncrono; a indexação é executada em threads.
+        """
+        with span('tavily_extract', urls=len(urls_to_search)) as stage:
+            search_data = await Extractor(self.tavily_client).aextract(
+                urls_to_search
+            )
+            stage.set(
+                bytes=extracted_bytes(search_data),
+                cached=cached_results(search_data),
+            )
+        if not search_data['results']:
+            logger.warning(
+                'Não foi possível extrair informações das URLs fornecidas.'
+            )
+            return None
+
+        if index_data:
+            chunker = Chunker()
+            for result in search_data['results']:
+                if not result.get('raw_content'):
+                    logger.warning(
+                        'Conteúdo bruto vazio para a URL: %s',
+                        result.get('url', 'unknown'),
+                    )
+            await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        self.indexer.index_segments,
+                        result['raw_content'],
+                        result.get('url', 'unknown'),
+                        chunker,
+                    )
+                    for result in search_data['results']
+                    if result.get('raw_content')
+                    and result.get('changed', True)
+                )
+            )
+        return search_data
+
+    async def aexecute(
+        self,
+        prompt,
+        urls_to_search,
+        index_data=True,
+        stream=False,
+        query_results=None,
+    ):
+        """
+        Versão assíncrona de execute.
+        """
+        if not index_data:
+            return await self.agenerate_response(prompt, stream, query_results)
+        search_data = await self.aprocess_urls(urls_to_search, index_data)
+        if not search_data:
+            return (
+                aiter_text(URLS_FAILED_MESSAGE)
+                if stream
+                else URLS_FAILED_MESSAGE
+            )
+        return await self.agenerate_response(prompt, stream)
 
 
-def rag_flow(prompt, urls_to_search, index_data=True, max_length=5000):
+def rag_flow(
+    prompt,
+    urls_to_search,
+    index_data=True,
+    max_length=5000,
+    stream=False,
+    language=None,
+):
     """
     Função para simplificar o uso do fluxo RAG.
 
@@ -243,11 +543,50 @@ def rag_flow(prompt, urls_to_search, index_data=True, max_length=5000):
         urls_to_search (list[str]): URLs a serem processadas.
         index_data (bool): Se True, os dados extraídos serão indexados.
         max_length (int): Comprimento máximo permitido para a resposta.
+        stream (bool): Se True, retorna um gerador de trechos de texto.
+        language (str): Idioma em que o Groq deve responder, se informado.
 
     Returns:
-        str: Resposta gerada.
+        str | Iterator[str]: Resposta gerada.
+    """
+    tavily_client = get_tavily_client() if index_data else None
+    indexer = PineconeIndexer(config.INDEX_NAME)
+    rag = RagFlow(
+        tavily_client,
+        indexer,
+        max_response_length=max_length,
+        language=language,
+    )
+    return rag.execute(
+        prompt, urls_to_search, index_data=index_data, stream=stream
+    )
+
+
+async def arag_flow(
+    prompt,
+    urls_to_search,
+    index_data=True,
+    max_length=5000,
+    stream=False,
+    query_results=None,
+    language=None,
+):
+    """
+    Versão assíncrona de rag_flow, usando os clientes assíncronos.
+    query_results permite reutilizar uma consulta ao índice já realizada.
     """
-    tavily_client = get_tavily_client()
-    indexer = PineconeIndexer(INDEX_NAME)
-    rag = RagFlow(tavily_client, indexer, max_response_length=max_length)
-    return rag.execute(prompt, urls_to_search, index_data=index_data)
+    tavily_client = get_async_tavily_client() if index_data else None
+    indexer = PineconeIndexer(config.INDEX_NAME)
+    rag = RagFlow(
+        tavily_client,
+        indexer,
+        max_response_length=max_length,
+        language=language,
+    )
+    return await rag.aexecute(
+        prompt,
+        urls_to_search,
+        index_data=index_data,
+        stream=stream,
+        query_results=query_results,
+    )
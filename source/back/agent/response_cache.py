@@ -0,0 +1,304 @@
+"""
+Cache de respostas dos fluxos do agente.
+Evita novas chamadas ao LLM para perguntas repetidas, com um nível exato
+(fluxo + prompt normalizado) e um nível opcional por similaridade semântica.
+O nível semântico só é usado com um embedder semântico: o embedder de
+hashing compara caracteres, e 'completando 60 anos' e 'completando 70
+anos' teriam a mesma resposta.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from back.config import (
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+    RESPONSE_CACHE_TTL,
+)
+
+from .embeddings import get_embedder
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt):
+    """
+    Normaliza o prompt para uso como chave: minúsculas, espaços colapsados e
+    sem pontuação final.
+    """
+    prompt = ' '.join(prompt.casefold().split())
+    return re.sub(r'[\s?!.]+$', '', prompt)
+
+
+class _CacheEntry:
+    __slots__ = ('response', 'created_at', 'size')
+
+    def __init__(self, response, created_at):
+        self.response = response
+        self.created_at = created_at
+        self.size = len(response.encode('utf-8'))
+
+
+class _SemanticIndex:
+    """
+    Matriz de embeddings das respostas de um fluxo, atualizada a cada
+    inserção e remoção para que a busca seja um único produto matricial.
+    """
+
+    def __init__(self, dimension, capacity=16):
+        self.matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self.keys = []
+        self.positions = {}
+
+    def add(self, key, embedding):
+        row = self.positions.get(key)
+        if row is None:
+            if len(self.keys) == len(self.matrix):
+                self.matrix = np.concatenate(
+                    [self.matrix, np.zeros_like(self.matrix)]
+                )
+            row = len(self.keys)
+            self.keys.append(key)
+            self.positions[key] = row
+        self.matrix[row] = embedding
+
+    def remove(self, key):
+        """
+        Remove a chave, movendo a última linha para a posição liberada.
+        """
+        row = self.positions.pop(key, None)
+        if row is None:
+            return
+        last_key = self.keys.pop()
+        if last_key != key:
+            self.matrix[row] = self.matrix[len(self.keys)]
+            self.keys[row] = last_key
+            self.positions[last_key] = row
+
+    def scores(self, embedding):
+        return self.matrix[: len(self.keys)] @ embedding
+
+
+class ResponseCache:
+    """
+    Cache LRU com expiração por TTL, limite de memória e persistência
+    opcional em SQLite.
+    """
+
+    def __init__(
+        self,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+        ttl=RESPONSE_CACHE_TTL,
+        semantic_threshold=RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+        path=RESPONSE_CACHE_PATH,
+    ):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_entries (int): Quantidade máxima de respostas armazenadas.
+            max_bytes (int): Tamanho máximo total das respostas, em bytes.
+            ttl (int): Tempo de vida de cada resposta, em segundos.
+            semantic_threshold (float): Similaridade mínima para o nível
+                semântico. Valores <= 0 desativam esse nível, que também
+                fica desativado se o embedder configurado não for
+                semântico.
+            path (str): Arquivo SQLite para persistência. Vazio desativa.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        if semantic_threshold > 0 and not get_embedder().semantic:
+            logger.warning(
+                'Cache semântico desativado: o embedder configurado não é '
+                'semântico.'
+            )
+            semantic_threshold = 0
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()
+        self._semantic = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._counters = {'hits': 0, 'semantic_hits': 0, 'misses': 0}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'flow TEXT, prompt TEXT, response TEXT, created_at REAL, '
+                'PRIMARY KEY (flow, prompt))'
+            )
+            self._load()
+
+    @property
+    def semantic_enabled(self):
+        return self.semantic_threshold > 0
+
+    def _load(self):
+        """
+        Carrega as respostas ainda válidas do SQLite.
+        """
+        rows = self._db.execute(
+            'SELECT flow, prompt, response, created_at FROM response_cache '
+            'WHERE created_at >= ? ORDER BY created_at',
+            (time.time() - self.ttl,),
+        ).fetchall()
+        embeddings = (
+            get_embedder().embed_batch([row[1] for row in rows])
+            if self.semantic_enabled and rows
+            else [None] * len(rows)
+        )
+        for (flow, prompt, response, created_at), embedding in zip(
+            rows, embeddings
+        ):
+            self._store((flow, prompt), response, embedding, created_at)
+
+    def _store(self, key, response, embedding, created_at):
+        if key in self._entries:
+            self._forget(key)
+        entry = _CacheEntry(response, created_at)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        if embedding is not None:
+            index = self._semantic.get(key[0])
+            if index is None:
+                index = self._semantic[key[0]] = _SemanticIndex(len(embedding))
+            index.add(key, embedding)
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            self._evict(next(iter(self._entries)))
+
+    def _forget(self, key):
+        self._bytes -= self._entries.pop(key).size
+        index = self._semantic.get(key[0])
+        if index is not None:
+            index.remove(key)
+
+    def _evict(self, key):
+        self._forget(key)
+        if self._db is not None:
+            self._db.execute(
+                'DELETE FROM response_cache WHERE flow = ? AND prompt = ?', key
+            )
+            self._db.commit()
+
+    def _is_expired(self, entry):
+        return time.time() - entry.created_at > self.ttl
+
+    def _semantic_lookup(self, flow, embedding):
+        """
+        Procura a resposta mais similar do mesmo fluxo acima do limiar,
+        descartando as expiradas encontradas no caminho.
+        """
+        index = self._semantic.get(flow)
+        if index is None or not index.keys:
+            return None
+        scores = index.scores(embedding)
+        for row in np.argsort(-scores):
+            if scores[row] < self.semantic_threshold:
+                return None
+            key = index.keys[row]
+            if not self._is_expired(self._entries[key]):
+                return key
+        return None
+
+    def embed(self, prompt):
+        """
+        Calcula o embedding do prompt usado pelo nível semântico, para ser
+        repassado a get e set. Retorna None se o nível estiver desativado.
+        """
+        if not self.semantic_enabled:
+            return None
+        return get_embedder().embed(normalize_prompt(prompt))
+
+    def get(self, flow, prompt, embedding=None):
+        """
+        Busca uma resposta em cache.
+
+        Args:
+            flow (str): Fluxo que gerou a resposta.
+            prompt (str): Prompt do usuário.
+            embedding (np.ndarray): Embedding do prompt, se já calculado.
+
+        Returns:
+            str: Resposta em cache ou None.
+        """
+        key = (flow, normalize_prompt(prompt))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry.response
+
+            if self.semantic_enabled:
+                if embedding is None:
+                    embedding = self.embed(prompt)
+                similar = self._semantic_lookup(flow, embedding)
+                if similar is not None:
+                    self._entries.move_to_end(similar)
+                    self._counters['semantic_hits'] += 1
+                    return self._entries[similar].response
+
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, flow, prompt, response, embedding=None):
+        """
+        Armazena uma resposta em cache.
+
+        Args:
+            flow (str): Fluxo que gerou a resposta.
+            prompt (str): Prompt do usuário.
+            response (str): Resposta gerada. Respostas vazias não são
+                armazenadas.
+            embedding (np.ndarray): Embedding do prompt, se já calculado.
+        """
+        if not response or not response.strip():
+            return
+        key = (flow, normalize_prompt(prompt))
+        if self.semantic_enabled and embedding is None:
+            embedding = self.embed(prompt)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, response, embedding, created_at)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)',
+                    (*key, response, created_at),
+                )
+                self._db.commit()
+
+    def stats(self):
+        """
+        Retorna as estatísticas de uso do cache.
+
+        Returns:
+            dict: Acertos, acertos semânticos, falhas, taxa de acerto,
+            quantidade de entradas e bytes ocupados.
+        """
+        with self._lock:
+            hits = self._counters['hits'] + self._counters['semantic_hits']
+            total = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_rate': hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+response_cache = ResponseCache()
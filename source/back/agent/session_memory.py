@@ -0,0 +1,360 @@
+"""
+Memória de conversas por sessão.
+Mantém o histórico de cada sessão limitado em turnos e tokens, descarta
+sessões ociosas (LRU) e, opcionalmente, persiste os turnos em SQLite, com o
+mesmo limite de turnos por sessão e um prazo de retenção.
+As mensagens do usuário ficam em um índice invertido por sessão, de modo que
+perguntas sobre o histórico são respondidas sem percorrer todos os turnos.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+
+from back.config import (
+    HISTORY_PAGE_SIZE,
+    SESSION_IDLE_TTL,
+    SESSION_MAX_SESSIONS,
+    SESSION_MAX_TOKENS,
+    SESSION_MAX_TURNS,
+    SESSION_MEMORY_PATH,
+    SESSION_RETENTION,
+)
+from back.lexical_index import tokenize
+from back.tokens import estimate_tokens
+
+DEFAULT_SESSION = 'default'
+
+# Palavras ignoradas nas buscas do histórico.
+STOPWORDS = frozenset(
+    'a o as os um uma de da do das dos em na no nas nos e ou que com por '
+    'para pra sobre meu minha eu voce isso esse essa the an of to in on '
+    'and or about for my me i you it is what'.split()
+)
+
+
+def index_terms(text):
+    """
+    Termos de busca do texto: sem acentos, sem palavras vazias e sem o
+    plural simples, para que 'preços' encontre 'preço'.
+    """
+    terms = set()
+    for term in tokenize(text):
+        if term in STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith('s'):
+            term = term[:-1]
+        terms.add(term)
+    return terms
+
+
+class Turn:
+    """
+    Registro compacto de uma mensagem da conversa.
+    """
+
+    __slots__ = ('role', 'content', 'tokens', 'created_at', 'seq')
+
+    def __init__(self, role, content, created_at=None):
+        self.role = role
+        self.content = content
+        self.tokens = estimate_tokens(content)
+        self.created_at = created_at or time.time()
+        self.seq = None
+
+
+class SessionHistory:
+    """
+    Histórico de uma sessão limitado em quantidade de turnos e de tokens.
+    Cada turno recebe um número sequencial; o índice invertido associa cada
+    termo aos números dos turnos do usuário que o contêm, em ordem crescente.
+    """
+
+    __slots__ = (
+        'turns',
+        'max_turns',
+        'max_tokens',
+        'total_tokens',
+        'first_user_turn',
+        'previous_user_turn',
+        'last_user_turn',
+        'next_seq',
+        'index',
+        'last_access',
+    )
+
+    def __init__(
+        self, max_turns=SESSION_MAX_TURNS, max_tokens=SESSION_MAX_TOKENS
+    ):
+        self.turns = deque()
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.total_tokens = 0
+        self.first_user_turn = None
+        self.previous_user_turn = None
+        self.last_user_turn = None
+        self.next_seq = 0
+        self.index = {}
+        self.last_access = time.time()
+
+    def add(self, turn):
+        """
+        Adiciona um turno, descartando os mais antigos acima dos limites.
+        """
+        turn.seq = self.next_seq
+        self.next_seq += 1
+        if turn.role == 'user':
+            if self.first_user_turn is None:
+                self.first_user_turn = turn
+            self.previous_user_turn = self.last_user_turn
+            self.last_user_turn = turn
+            for term in index_terms(turn.content):
+                self.index.setdefault(term, deque()).append(turn.seq)
+        self.turns.append(turn)
+        self.total_tokens += turn.tokens
+        while len(self.turns) > 1 and (
+            len(self.turns) > self.max_turns
+            or self.total_tokens > self.max_tokens
+        ):
+            self._forget(self.turns.popleft())
+
+    def _forget(self, turn):
+        """
+        Remove do índice um turno descartado. Como é o turno mais antigo,
+        ele está no início de cada lista em que aparece.
+        """
+        self.total_tokens -= turn.tokens
+        if turn.role != 'user':
+            return
+        for term in index_terms(turn.content):
+            postings = self.index.get(term)
+            if postings and postings[0] == turn.seq:
+                postings.popleft()
+                if not postings:
+                    del self.index[term]
+
+    def user_turns(self):
+        """
+        Retorna os turnos do usuário, do mais antigo ao mais recente.
+        """
+        return [turn for turn in self.turns if turn.role == 'user']
+
+    def turn_at(self, seq):
+        """
+        Retorna o turno com o número sequencial informado.
+        """
+        return self.turns[seq - self.turns[0].seq]
+
+    def search(self, text, before=None):
+        """
+        Busca as mensagens do usuário sobre um assunto.
+        Os turnos com mais termos do assunto vêm primeiro e, entre eles, a
+        ordem é a da conversa.
+
+        Args:
+            text (str): Assunto buscado.
+            before (int): Considera apenas turnos anteriores a este número.
+
+        Returns:
+            list[Turn]: Mensagens encontradas.
+        """
+        counts = Counter()
+        for term in index_terms(text):
+            for seq in self.index.get(term, ()):
+                if before is None or seq < before:
+                    counts[seq] += 1
+        if not counts:
+            return []
+        best = max(counts.values())
+        return [
+            self.turn_at(seq) for seq in sorted(counts) if counts[seq] == best
+        ]
+
+    def page(self, number=1, size=HISTORY_PAGE_SIZE):
+        """
+        Retorna uma página do histórico. A página 1 contém os turnos mais
+        recentes.
+
+        Args:
+            number (int): Número da página.
+            size (int): Turnos por página.
+
+        Returns:
+            tuple[list[Turn], int]: Turnos da página, do mais antigo ao mais
+            recente, e o total de páginas.
+        """
+        pages = max(1, -(-len(self.turns) // size))
+        number = min(max(1, number), pages)
+        end = len(self.turns) - (number - 1) * size
+        start = max(0, end - size)
+        return list(islice(self.turns, start, end)), pages
+
+
+class SessionMemoryManager:
+    """
+    Gerenciador de históricos indexados por sessão.
+    """
+
+    # Intervalo mínimo, em segundos, entre as limpezas de sessões expiradas.
+    cleanup_interval = 600
+
+    def __init__(
+        self,
+        max_sessions=SESSION_MAX_SESSIONS,
+        idle_ttl=SESSION_IDLE_TTL,
+        max_turns=SESSION_MAX_TURNS,
+        max_tokens=SESSION_MAX_TOKENS,
+        path=SESSION_MEMORY_PATH,
+        retention=SESSION_RETENTION,
+    ):
+        """
+        Inicializa o gerenciador.
+
+        Args:
+            max_sessions (int): Quantidade máxima de sessões em memória.
+            idle_ttl (int): Segundos de inatividade antes de descartar a sessão.
+            max_turns (int): Quantidade máxima de turnos por sessão.
+            max_tokens (int): Quantidade máxima de tokens por sessão.
+            path (str): Arquivo SQLite para persistência. Vazio desativa.
+            retention (int): Segundos sem mensagens até a sessão ser apagada
+                do SQLite. 0 mantém as sessões indefinidamente.
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.retention = retention
+        self._next_cleanup = 0.0
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS session_turns ('
+                'session_id TEXT, seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'role TEXT, content TEXT, created_at REAL)'
+            )
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS session_turns_session '
+                'ON session_turns (session_id, seq)'
+            )
+            self._expire_sessions(time.time())
+            self._db.commit()
+
+    def _trim(self, session_id):
+        """
+        Mantém no SQLite apenas os últimos max_turns turnos da sessão, além
+        da primeira mensagem do usuário, que o histórico sempre carrega.
+        """
+        self._db.execute(
+            'DELETE FROM session_turns WHERE session_id = ? AND seq <= ('
+            'SELECT seq FROM session_turns WHERE session_id = ? '
+            'ORDER BY seq DESC LIMIT 1 OFFSET ?) AND seq != COALESCE(('
+            'SELECT MIN(seq) FROM session_turns '
+            "WHERE session_id = ? AND role = 'user'), -1)",
+            (session_id, session_id, self.max_turns, session_id),
+        )
+
+    def _expire_sessions(self, now):
+        """
+        Apaga do SQLite as sessões sem mensagens há mais de retention
+        segundos.
+        """
+        self._next_cleanup = now + self.cleanup_interval
+        if self.retention <= 0:
+            return
+        self._db.execute(
+            'DELETE FROM session_turns WHERE session_id IN ('
+            'SELECT session_id FROM session_turns GROUP BY session_id '
+            'HAVING MAX(created_at) < ?)',
+            (now - self.retention,),
+        )
+
+    def _evict_idle(self):
+        now = time.time()
+        while self._sessions:
+            session_id, history = next(iter(self._sessions.items()))
+            if (
+                len(self._sessions) <= self.max_sessions
+                and now - history.last_access <= self.idle_ttl
+            ):
+                break
+            del self._sessions[session_id]
+
+    def _load(self, session_id):
+        history = SessionHistory(self.max_turns, self.max_tokens)
+        if self._db is None:
+            return history
+        first = self._db.execute(
+            'SELECT role, content, created_at FROM session_turns '
+            "WHERE session_id = ? AND role = 'user' ORDER BY seq LIMIT 1",
+            (session_id,),
+        ).fetchone()
+        rows = self._db.execute(
+            'SELECT role, content, created_at FROM session_turns '
+            'WHERE session_id = ? ORDER BY seq DESC LIMIT ?',
+            (session_id, self.max_turns),
+        ).fetchall()
+        if first is not None:
+            history.first_user_turn = Turn(*first)
+        for role, content, created_at in reversed(rows):
+            history.add(Turn(role, content, created_at))
+        return history
+
+    def get(self, session_id=DEFAULT_SESSION):
+        """
+        Obtém o histórico da sessão, criando-o ou carregando-o se necessário.
+
+        Args:
+            session_id (str): Identificador da sessão.
+
+        Returns:
+            SessionHistory: Histórico da sessão.
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = self._load(session_id)
+                self._sessions[session_id] = history
+            else:
+                self._sessions.move_to_end(session_id)
+            history.last_access = time.time()
+            self._evict_idle()
+            return history
+
+    def add_turn(self, session_id, role, content):
+        """
+        Registra uma mensagem no histórico da sessão.
+
+        Args:
+            session_id (str): Identificador da sessão.
+            role (str): 'user' ou 'assistant'.
+            content (str): Conteúdo da mensagem.
+        """
+        turn = Turn(role, content)
+        with self._lock:
+            self.get(session_id).add(turn)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT INTO session_turns '
+                    '(session_id, role, content, created_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (session_id, role, content, turn.created_at),
+                )
+                self._trim(session_id)
+                if turn.created_at >= self._next_cleanup:
+                    self._expire_sessions(turn.created_at)
+                self._db.commit()
+
+    def session_count(self):
+        """
+        Retorna a quantidade de sessões mantidas em memória.
+        """
+        with self._lock:
+            return len(self._sessions)
+
+
+session_memory = SessionMemoryManager()
@@ -0,0 +1,134 @@
+"""
+Recuperação especulativa.
+Inicia a consulta ao índice em paralelo à classificação de intenção e mede
+quanto tempo foi economizado e quanto trabalho de recuperação foi
+desperdiçado.
+"""
+
+import asyncio
+import threading
+import time
+
+from back import config
+
+from .rag_flow import PineconeIndexer
+
+
+class SpeculationStats:
+    """
+    Métricas agregadas da recuperação especulativa no processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.used = 0
+        self.discarded = 0
+        self.saved_ms = 0.0
+        self.wasted_ms = 0.0
+
+    def record(self, turn_metrics):
+        with self._lock:
+            self.turns += 1
+            if turn_metrics['used']:
+                self.used += 1
+                self.saved_ms += turn_metrics['saved_ms']
+            else:
+                self.discarded += 1
+                self.wasted_ms += turn_metrics['wasted_ms']
+
+    def snapshot(self):
+        """
+        Retorna as métricas agregadas.
+        """
+        with self._lock:
+            return {
+                'turns': self.turns,
+                'used': self.used,
+                'discarded': self.discarded,
+                'saved_ms': self.saved_ms,
+                'wasted_ms': self.wasted_ms,
+            }
+
+
+speculation_stats = SpeculationStats()
+
+
+class SpeculativeRetrieval:
+    """
+    Consulta ao índice iniciada antes de a intenção ser conhecida.
+    """
+
+    def __init__(self, prompt, index_name=None):
+        """
+        Agenda a consulta ao índice no loop de eventos atual.
+
+        Args:
+            prompt (str): Prompt do usuário.
+            index_name (str): Nome do índice consultado. Se None, usa
+                INDEX_NAME.
+        """
+        self.started = time.perf_counter()
+        self.finished = None
+        self.intent_ms = None
+        self.metrics = None
+        self.task = asyncio.ensure_future(
+            self._query(prompt, index_name or config.INDEX_NAME)
+        )
+
+    async def _query(self, prompt, index_name):
+        try:
+            return await PineconeIndexer(index_name).aquery_index(prompt)
+        finally:
+            self.finished = time.perf_counter()
+
+    def intent_resolved(self):
+        """
+        Registra o instante em que a intenção foi classificada.
+        """
+        self.intent_ms = (time.perf_counter() - self.started) * 1000
+
+    async def consume(self):
+        """
+        Aguarda e retorna o resultado da consulta especulativa.
+
+        Returns:
+            dict: Resultados da consulta ao índice.
+        """
+        result = await self.task
+        retrieval_ms = (self.finished - self.started) * 1000
+        # Em série, o turno pagaria intenção + recuperação; em paralelo,
+        # apenas o maior dos dois.
+        self._finish(
+            used=True,
+            saved_ms=min(retrieval_ms, self.intent_ms or 0.0),
+            wasted_ms=0.0,
+        )
+        return result
+
+    def discard(self):
+        """
+        Cancela a consulta especulativa e contabiliza o trabalho desperdiçado.
+        """
+        if self.metrics is not None:
+            return
+        self.task.cancel()
+        # Evita avisos de exceção não recuperada em consultas descartadas.
+        self.task.add_done_callback(
+            lambda task: task.cancelled() or task.exception()
+        )
+        finished = self.finished or time.perf_counter()
+        self._finish(
+            used=False,
+            saved_ms=0.0,
+            wasted_ms=(finished - self.started) * 1000,
+        )
+
+    def _finish(self, used, saved_ms, wasted_ms):
+        self.metrics = {
+            'used': used,
+            'intent_ms': self.intent_ms,
+            'saved_ms': saved_ms,
+            'wasted_ms': wasted_ms,
+        }
+        speculation_stats.record(self.metrics)
@@ -1,116 +1,580 @@
 """
 Gerenciamento do grafo de ferramentas.
 Seleciona o fluxo apropriado com base na intenção do usuário e processa interações.
+
+Os fluxos são nós de um StateGraph do LangGraph, ligados ao nó de
+classificação por arestas condicionais. O grafo é compilado uma única vez
+por processo (get_tool_graph) e expõe invoke, batch, ainvoke e stream.
+O pipeline é assíncrono (aconfigure_tool_graph); configure_tool_graph é um
+invólucro síncrono que o executa no loop compartilhado do backend.
 """
 
-from langgraph.graph import END, START, StateGraph
+import threading
+
+from back.async_utils import iter_sync, run_sync
+from back.config import (
+    RAG_URLS,
+    RESPONSE_CACHE_ENABLED,
+    SPECULATIVE_RETRIEVAL,
+    TOOL_GRAPH_CHECKPOINTER,
+)
+from back.tracing import Trace, annotate, use_trace
+from back.translation import language_instruction
 from typing_extensions import TypedDict
 
-from .general_flow import general_flow
-from .prompt_engineering import PromptEngineeringLayer, log_process_data
-from .rag_flow import rag_flow
+from .general_flow import ageneral_flow, aiter_text
+from .prompt_engineering import PromptEngineeringLayer
+from .rag_flow import FALLBACK_MESSAGES, arag_flow
+from .response_cache import response_cache
+from .session_memory import DEFAULT_SESSION
+from .speculation import SpeculativeRetrieval
 
 
 class State(TypedDict):
     """
     Representa o estado do grafo contendo mensagens acumuladas.
+    O estado contém apenas valores serializáveis, para que possa ser salvo
+    por um checkpointer; quando stream é True, o gerador de trechos da
+    resposta fica no Turn da execução.
     """
 
+    prompt: str
+    stream: bool
+    language: str
+    session_id: str
+    intent: str
     messages: list
+    response: str
+
+
+class Turn:
+    """
+    Objetos de uma execução do grafo que não fazem parte do estado: a
+    consulta especulativa ao índice e o stream da resposta. É repassado aos
+    nós em config['configurable']['turn'].
+    """
+
+    def __init__(self):
+        self.speculation = None
+        self.stream = None
+
 
+# Mesmos valores de langgraph.graph.START e END; o langgraph é importado
+# apenas quando o StateGraph é montado.
+START = '__start__'
+END = '__end__'
 
-prompt_layer = PromptEngineeringLayer()
+NONSENSE_MESSAGE = 'Desculpe, não consegui entender sua mensagem. Por favor, reformule ou envie outra pergunta.'
 
-tool_graph = StateGraph(state_schema=State)
+intention_label = PromptEngineeringLayer.intention_label
 
+_prompt_layer = None
+_tool_graph = None
+_tool_graph_lock = threading.Lock()
 
-def start(state: State, prompt: str) -> str:
+
+def get_prompt_layer():
     """
-    Inicia o grafo processando o prompt inicial e selecionando o fluxo apropriado.
+    Retorna a camada de engenharia de prompts, criando-a no primeiro uso.
     """
-    intention = prompt_layer.get_user_intent(prompt)
+    global _prompt_layer
+    if _prompt_layer is None:
+        _prompt_layer = PromptEngineeringLayer()
+    return _prompt_layer
 
-    state['messages'].append(f'Intenção detectada: {intention}')
-    state['messages'].append(f'Fluxo selecionado: {intention}')
-    return intention
 
+def cache_key(flow_name, state):
+    """
+    Compõe o nome do fluxo usado no cache com o idioma de resposta, já que
+    o idioma pode ser pedido diretamente ao Groq.
+    """
+    if state['language'] and language_instruction(state['language']):
+        return f'{flow_name}:{state["language"]}'
+    return flow_name
 
-def rag_flow_state(state: State, prompt: str) -> str:
+
+def cacheable(response):
     """
-    Executa o fluxo RAG, indexando conteúdo e retornando respostas relevantes.
+    Indica se a resposta pode ir para o cache: respostas vazias e mensagens
+    de falha seriam repetidas por todo o TTL.
     """
-    response = rag_flow(
-        prompt,
-        [
-            'https://software.waproject.com.br/',
-            'https://www.waproject.com.br/',
+    return bool(response and response.strip()) and (
+        response not in FALLBACK_MESSAGES
+    )
+
+
+async def cache_stream(flow_name, prompt, deltas, embedding=None):
+    """
+    Repassa os trechos de um stream e armazena a resposta completa no cache
+    quando o stream termina.
+    """
+    parts = []
+    async for delta in deltas:
+        parts.append(delta)
+        yield delta
+    response = ''.join(parts)
+    if cacheable(response):
+        response_cache.set(flow_name, prompt, response, embedding)
+
+
+async def cached_flow(flow_name, prompt, flow, stream=False):
+    """
+    Executa o fluxo apenas se não houver resposta em cache para o prompt.
+    O embedding do nível semântico é calculado uma vez e usado na consulta e
+    no armazenamento.
+
+    Args:
+        flow_name (str): Nome do fluxo, usado na chave do cache.
+        prompt (str): Prompt fornecido pelo usuário.
+        flow (callable): Corrotina flow(prompt, stream) que gera a resposta.
+        stream (bool): Se True, retorna um gerador assíncrono de trechos.
+
+    Returns:
+        str | AsyncIterator[str]: Resposta em cache ou gerada pelo fluxo.
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return await flow(prompt, stream)
+    embedding = response_cache.embed(prompt)
+    response = response_cache.get(flow_name, prompt, embedding)
+    annotate(cache_hit=response is not None)
+    if response is not None:
+        return aiter_text(response) if stream else response
+    response = await flow(prompt, stream)
+    if stream:
+        return cache_stream(flow_name, prompt, response, embedding)
+    if cacheable(response):
+        response_cache.set(flow_name, prompt, response, embedding)
+    return response
+
+
+def get_turn(config):
+    """
+    Retorna o Turn da execução, criando um vazio se não houver.
+    """
+    configurable = (config or {}).get('configurable', {})
+    return configurable.get('turn') or Turn()
+
+
+def deliver(state, config, response):
+    """
+    Monta a atualização de estado de um nó de fluxo com a resposta final.
+    Respostas em stream são entregues pelo Turn da execução.
+    """
+    if state['stream']:
+        get_turn(config).stream = response
+        return {'response': None}
+    return {
+        'response': response,
+        'messages': [*state['messages'], response],
+    }
+
+
+async def start(state: State, config) -> dict:
+    """
+    Inicia o grafo processando o prompt inicial e selecionando o fluxo apropriado.
+    Com SPECULATIVE_RETRIEVAL, a consulta ao índice começa junto com a
+    classificação e é descartada se a intenção não for rag_flow.
+    """
+    prompt = state['prompt']
+    turn = get_turn(config)
+    speculation = None
+    if SPECULATIVE_RETRIEVAL:
+        speculation = turn.speculation = SpeculativeRetrieval(prompt)
+
+    intention = await get_prompt_layer().aget_user_intent(
+        prompt, state['session_id']
+    )
+
+    if speculation is not None:
+        speculation.intent_resolved()
+        if intention != intention_label[2]:
+            speculation.discard()
+            annotate(speculation=speculation.metrics)
+
+    annotate(flow=intention)
+    return {
+        'intent': intention,
+        'messages': [
+            *state['messages'],
+            f'Intenção detectada: {intention}',
+            f'Fluxo selecionado: {intention}',
         ],
+    }
+
+
+def select_flow(state: State) -> str:
+    """
+    Aresta condicional: nome do nó do fluxo escolhido por start.
+    """
+    return state['intent']
+
+
+async def rag_flow_state(state: State, config) -> dict:
+    """
+    Executa o fluxo RAG consultando o índice mantido pelo job de ingestão.
+    Reaproveita a consulta especulativa, se houver.
+    """
+    speculation = get_turn(config).speculation
+
+    async def run_rag(text, stream):
+        query_results = None
+        if speculation is not None:
+            query_results = await speculation.consume()
+        return await arag_flow(
+            text,
+            RAG_URLS,
+            index_data=False,
+            stream=stream,
+            query_results=query_results,
+            language=state['language'],
+        )
+
+    response = await cached_flow(
+        cache_key('rag_flow', state),
+        state['prompt'],
+        run_rag,
+        state['stream'],
     )
-    log_process_data.update({'rag_response': response})
-    state['messages'].append(response)
-    return END
+    if speculation is not None:
+        # Resposta vinda do cache: a consulta especulativa não foi usada.
+        speculation.discard()
+        annotate(speculation=speculation.metrics)
+    return deliver(state, config, response)
 
 
-def general_flow_state(state: State, prompt: str) -> str:
+async def general_flow_state(state: State, config) -> dict:
     """
     Executa o fluxo geral e armazena a resposta gerada.
     """
-    response = general_flow(prompt)
-    state['messages'].append(response)
-    return END
+    instruction = language_instruction(state['language'])
+
+    async def run_general(text, stream):
+        return await ageneral_flow(f'{text}{instruction}', stream)
+
+    response = await cached_flow(
+        cache_key('general_flow', state),
+        state['prompt'],
+        run_general,
+        state['stream'],
+    )
+    return deliver(state, config, response)
 
 
-def history_flow_state(state: State, prompt: str) -> str:
+async def history_flow_state(state: State, config) -> dict:
     """
-    Processa perguntas relacionadas ao histórico de conversas.
+    Processa perguntas relacionadas ao histórico de conversas. Mensagens que
+    não são consultas ao histórico seguem para o fluxo geral.
     """
-    responde = prompt_layer.handle_history_question(prompt)
-    state['messages'].append(responde)
-    return END
+    responde = get_prompt_layer().handle_history_question(
+        state['prompt'], state['session_id']
+    )
+    if responde is None:
+        annotate(history_fallback=intention_label[3])
+        return await general_flow_state(state, config)
+    if state['stream']:
+        responde = aiter_text(responde)
+    return deliver(state, config, responde)
 
 
-def nonsense_flow_state(state: State) -> str:
+async def nonsense_flow_state(state: State, config) -> dict:
     """
     Executa o fluxo de mensagens sem sentido.
     Responde ao usuário pedindo para reformular sua mensagem.
     """
-    response = 'Desculpe, não consegui entender sua mensagem. Por favor, reformule ou envie outra pergunta.'
-    state['messages'].append(response)
-    return END
+    response = NONSENSE_MESSAGE
+    if state['stream']:
+        response = aiter_text(response)
+    return deliver(state, config, response)
+
 
+FLOW_NODES = {
+    'nonsense': nonsense_flow_state,
+    intention_label[1]: history_flow_state,
+    intention_label[2]: rag_flow_state,
+    intention_label[3]: general_flow_state,
+}
 
-def end(state: State) -> str:
+
+def build_tool_graph():
     """
-    Finaliza o grafo e retorna a última mensagem acumulada.
+    Monta o StateGraph: o nó start classifica a intenção e uma aresta
+    condicional leva ao nó do fluxo, que termina o grafo.
     """
-    print('Fluxo concluído. Mensagens acumuladas:')
-    for message in state['messages']:
-        print(message)
-    return state['messages'][-1] if state['messages'] else 'Sem resposta'
+    from langgraph.graph import StateGraph
+
+    graph = StateGraph(state_schema=State)
+    graph.add_node('start', start)
+    for name, node in FLOW_NODES.items():
+        graph.add_node(name, node)
+        graph.add_edge(name, END)
+    graph.add_edge(START, 'start')
+    graph.add_conditional_edges(
+        'start', select_flow, {name: name for name in FLOW_NODES}
+    )
+    return graph
+
 
+def create_checkpointer(kind=TOOL_GRAPH_CHECKPOINTER):
+    """
+    Cria o checkpointer do grafo configurado em TOOL_GRAPH_CHECKPOINTER.
 
-def configure_tool_graph(prompt: str) -> str:
+    Args:
+        kind (str): 'memory' ou vazio para não salvar checkpoints.
+    """
+    if not kind:
+        return None
+    if kind == 'memory':
+        from langgraph.checkpoint.memory import MemorySaver
+
+        return MemorySaver()
+    raise ValueError(f'Checkpointer desconhecido: {kind}')
+
+
+class ToolGraph:
+    """
+    Grafo de ferramentas compilado. As execuções síncronas rodam no loop
+    compartilhado do backend, pois os nós são assíncronos.
+    """
+
+    def __init__(self, checkpointer=None):
+        """
+        Compila o grafo.
+
+        Args:
+            checkpointer: Checkpointer do LangGraph. Com ele, o estado de
+                cada sessão é salvo usando o session_id como thread_id.
+        """
+        self.checkpointer = checkpointer
+        self.graph = build_tool_graph().compile(checkpointer=checkpointer)
+
+    @staticmethod
+    def inputs(prompt, stream=False, language=None, session_id=None):
+        """
+        Monta o estado inicial de uma execução.
+        """
+        return {
+            'prompt': prompt,
+            'stream': stream,
+            'language': language,
+            'session_id': session_id or DEFAULT_SESSION,
+            'intent': None,
+            'messages': [],
+            'response': None,
+        }
+
+    @staticmethod
+    def config(session_id=None, turn=None):
+        """
+        Monta a configuração de uma execução.
+        """
+        return {
+            'configurable': {
+                'thread_id': session_id or DEFAULT_SESSION,
+                'turn': turn or Turn(),
+            }
+        }
+
+    @staticmethod
+    def _result(state, config):
+        if state['stream']:
+            state = {
+                **state,
+                'response': config['configurable']['turn'].stream,
+            }
+        return state
+
+    async def ainvoke(
+        self, prompt, stream=False, language=None, session_id=None, turn=None
+    ):
+        """
+        Executa o grafo para um prompt.
+
+        Returns:
+            dict: Estado final; 'response' contém a resposta (um gerador
+            assíncrono de trechos quando stream é True).
+        """
+        config = self.config(session_id, turn)
+        state = await self.graph.ainvoke(
+            self.inputs(prompt, stream, language, session_id), config
+        )
+        return self._result(state, config)
+
+    def invoke(self, prompt, language=None, session_id=None):
+        """
+        Versão síncrona de ainvoke, sem stream.
+        """
+        return run_sync(self.ainvoke(prompt, False, language, session_id))
+
+    async def abatch(
+        self, prompts, language=None, session_ids=None, max_concurrency=None
+    ):
+        """
+        Executa o grafo para vários prompts em paralelo.
+
+        Args:
+            prompts (list[str]): Prompts a processar.
+            language (str): Idioma de resposta de todos os prompts.
+            session_ids (list[str]): Sessão de cada prompt. Se None, usa a
+                sessão padrão.
+            max_concurrency (int): Execuções simultâneas.
+
+        Returns:
+            list[dict]: Estado final de cada prompt, na ordem de entrada.
+        """
+        session_ids = session_ids or [None] * len(prompts)
+        inputs = [
+            self.inputs(prompt, False, language, session_id)
+            for prompt, session_id in zip(prompts, session_ids)
+        ]
+        configs = [self.config(session_id) for session_id in session_ids]
+        for config in configs:
+            config['max_concurrency'] = max_concurrency
+        return await self.graph.abatch(inputs, configs)
+
+    def batch(
+        self, prompts, language=None, session_ids=None, max_concurrency=None
+    ):
+        """
+        Versão síncrona de abatch.
+        """
+        return run_sync(
+            self.abatch(prompts, language, session_ids, max_concurrency)
+        )
+
+    async def astream(
+        self, prompt, language=None, session_id=None, stream_mode='updates'
+    ):
+        """
+        Executa o grafo emitindo a saída de cada nó assim que ele termina.
+
+        Yields:
+            dict: Atualização de estado de cada nó, por nome do nó.
+        """
+        async for update in self.graph.astream(
+            self.inputs(prompt, False, language, session_id),
+            self.config(session_id),
+            stream_mode=stream_mode,
+        ):
+            yield update
+
+    def stream(
+        self, prompt, language=None, session_id=None, stream_mode='updates'
+    ):
+        """
+        Versão síncrona de astream.
+        """
+        return iter_sync(
+            self.astream(prompt, language, session_id, stream_mode)
+        )
+
+
+def get_tool_graph():
+    """
+    Retorna o grafo de ferramentas, compilando-o na primeira chamada.
+    """
+    global _tool_graph
+    if _tool_graph is None:
+        with _tool_graph_lock:
+            if _tool_graph is None:
+                _tool_graph = ToolGraph(create_checkpointer())
+    return _tool_graph
+
+
+def prewarm_tool_graph():
+    """
+    Compila o grafo em segundo plano, para que a primeira pergunta não pague
+    a importação do LangGraph.
+
+    Returns:
+        threading.Thread: Thread da compilação.
+    """
+    thread = threading.Thread(
+        target=get_tool_graph, name='tool-graph-prewarm', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+async def record_stream(deltas, session_id, trace=None):
+    """
+    Repassa os trechos de um stream e registra a resposta completa no
+    histórico da sessão quando o stream termina. Se informado, o trace do
+    turno é finalizado junto com o stream.
+    """
+    parts = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+        get_prompt_layer().store_answer(''.join(parts), session_id)
+    finally:
+        if trace is not None:
+            trace.finish()
+
+
+async def aconfigure_tool_graph(
+    prompt: str,
+    stream: bool = False,
+    language: str = None,
+    session_id: str = DEFAULT_SESSION,
+    trace: Trace = None,
+):
     """
     Configura e executa o grafo de ferramentas com base no prompt inicial.
 
     Args:
         prompt (str): Prompt fornecido pelo usuário.
+        stream (bool): Se True, a resposta é retornada como um gerador
+            assíncrono de trechos de texto.
+        language (str): Idioma de resposta pedido ao Groq, se informado.
+        session_id (str): Identificador da sessão do usuário.
+        trace (Trace): Trace do turno, finalizado por quem o criou. Se None,
+            um trace é criado e finalizado ao fim do turno.
+
+    Returns:
+        str | AsyncIterator[str]: Resposta final gerada pelo grafo.
+    """
+    owns_trace = trace is None
+    if owns_trace:
+        trace = Trace(session_id=session_id)
+    trace.set(language=language, stream=stream)
+    with use_trace(trace):
+        state = await get_tool_graph().ainvoke(
+            prompt, stream, language, session_id
+        )
+    response = state['response']
+    if stream:
+        return record_stream(
+            response, session_id, trace if owns_trace else None
+        )
+    get_prompt_layer().store_answer(response, session_id)
+    if owns_trace:
+        trace.finish()
+    return response
+
+
+def configure_tool_graph(
+    prompt: str,
+    stream: bool = False,
+    language: str = None,
+    session_id: str = DEFAULT_SESSION,
+    trace: Trace = None,
+):
+    """
+    Invólucro síncrono de aconfigure_tool_graph.
+
+    Args:
+        prompt (str): Prompt fornecido pelo usuário.
+        stream (bool): Se True, a resposta é retornada como um gerador de
+            trechos de texto.
+        language (str): Idioma de resposta pedido ao Groq, se informado.
+        session_id (str): Identificador da sessão do usuário.
+        trace (Trace): Trace do turno; veja aconfigure_tool_graph.
 
     Returns:
-        str: Resposta final gerada pelo grafo.
-    """
-    initial_state = {'messages': []}
-    current_state = START
-
-    while current_state != END:
-        if current_state == START:
-            current_state = start(initial_state, prompt)
-        elif current_state == 'nonsense':
-            current_state = nonsense_flow_state(initial_state)
-        elif current_state == prompt_layer.intention_label[1]:
-            current_state = history_flow_state(initial_state, prompt)
-        elif current_state == prompt_layer.intention_label[2]:
-            current_state = rag_flow_state(initial_state, prompt)
-        elif current_state == prompt_layer.intention_label[3]:
-            current_state = general_flow_state(initial_state, prompt)
-    return end(initial_state)
+        str | Iterator[str]: Resposta final gerada pelo grafo.
+    """
+    response = run_sync(
+        aconfigure_tool_graph(prompt, stream, language, session_id, trace)
+    )
+    return iter_sync(response) if stream else response
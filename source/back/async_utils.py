@@ -0,0 +1,90 @@
+# source/back/async_utils.py
+"""
+Utilitários para o pipeline assíncrono.
+Mantém um loop de eventos em uma thread dedicada, de modo que chamadores
+síncronos (como o Streamlit) possam executar corrotinas e consumir geradores
+assíncronos, e os clientes assíncronos reutilizem suas conexões entre turnos.
+"""
+
+import asyncio
+import threading
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """
+    Obtém o loop de eventos compartilhado, iniciando sua thread se necessário.
+    """
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name='async-backend', daemon=True
+            )
+            _loop_thread.start()
+    return _loop
+
+
+def run_sync(coro):
+    """
+    Executa uma corrotina no loop compartilhado e aguarda o resultado.
+
+    Args:
+        coro: Corrotina a ser executada.
+
+    Returns:
+        Resultado da corrotina.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError(
+            'run_sync não pode ser chamado de dentro do loop compartilhado.'
+        )
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iter_sync(async_iterable):
+    """
+    Consome um iterável assíncrono como um gerador síncrono.
+
+    Args:
+        async_iterable: Iterável assíncrono (por exemplo, um gerador async).
+
+    Yields:
+        Itens produzidos pelo iterável assíncrono.
+    """
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield run_sync(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, 'aclose'):
+            run_sync(iterator.aclose())
+
+
+class AsyncIndex:
+    """
+    Adaptador assíncrono para índices vetoriais síncronos.
+    As chamadas são executadas em threads para não bloquear o loop.
+    """
+
+    def __init__(self, index):
+        """
+        Args:
+            index: Índice com os métodos upsert e query.
+        """
+        self.index = index
+
+    async def upsert(self, **kwargs):
+        return await asyncio.to_thread(self.index.upsert, **kwargs)
+
+    async def query(self, **kwargs):
+        return await asyncio.to_thread(self.index.query, **kwargs)
@@ -0,0 +1,235 @@
+"""
+Execução em lote do pipeline, sem o Streamlit.
+Lê prompts de um arquivo JSONL, executa cada um pelo grafo de ferramentas
+com concorrência limitada e grava resposta, intenção e tempos por etapa em
+outro arquivo JSONL. Cada resultado é gravado assim que fica pronto, então
+uma execução interrompida pode ser retomada pulando os prompts concluídos.
+
+Uso:
+    python -m back.batch_runner prompts.jsonl respostas.jsonl --concurrency 8
+
+Cada linha de entrada é um objeto com 'prompt' e, opcionalmente, 'id',
+'session_id' e 'language', ou apenas uma string com o prompt. Prompts com o
+mesmo session_id são executados em ordem, compartilhando o histórico.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+from .agent.tool_graph import aconfigure_tool_graph
+from .async_utils import run_sync
+from .groq_gateway import BATCH, use_priority
+from .language import session_languages
+from .tracing import Trace, span, use_trace
+from .translation import translator
+
+DEFAULT_CONCURRENCY = 4
+
+
+def load_prompts(path):
+    """
+    Lê os prompts do arquivo de entrada.
+
+    Args:
+        path (str): Arquivo JSONL de entrada.
+
+    Returns:
+        list[dict]: Linhas com 'id', 'prompt', 'session_id' e 'language'.
+    """
+    rows = []
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if isinstance(row, str):
+                row = {'prompt': row}
+            row_id = str(row.get('id', number))
+            rows.append(
+                {
+                    'id': row_id,
+                    'prompt': row['prompt'],
+                    'session_id': row.get('session_id') or f'batch-{row_id}',
+                    'language': row.get('language'),
+                }
+            )
+    return rows
+
+
+def completed_ids(path):
+    """
+    Retorna os ids já concluídos com sucesso no arquivo de saída.
+    Resultados com erro e linhas incompletas são executados de novo; a linha
+    incompleta deixada por uma interrupção é terminada para que o próximo
+    resultado comece em uma linha nova.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as file:
+        if file.seek(0, os.SEEK_END):
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                file.write(b'\n')
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if not result.get('error'):
+                done.add(result['id'])
+    return done
+
+
+async def run_prompt(row):
+    """
+    Executa um prompt pelo grafo de ferramentas.
+
+    Returns:
+        dict: Resultado com resposta, intenção, latência e tempos por etapa.
+    """
+    trace = Trace(session_id=row['session_id'])
+    started = time.perf_counter()
+    result = {
+        'id': row['id'],
+        'session_id': row['session_id'],
+        'prompt': row['prompt'],
+    }
+    try:
+        with use_trace(trace):
+            language = row['language']
+            if not language:
+                with span('language_detection'):
+                    language, _ = session_languages.resolve(
+                        row['prompt'], row['session_id']
+                    )
+            response = await aconfigure_tool_graph(
+                row['prompt'],
+                language=language,
+                session_id=row['session_id'],
+                trace=trace,
+            )
+            if language not in (None, 'en'):
+                with span('translation', bytes=len(response.encode('utf-8'))):
+                    response = await asyncio.to_thread(
+                        translator.translate, response, language
+                    )
+        result.update(language=language, answer=response, error=None)
+    except Exception as e:
+        trace.set(error=type(e).__name__)
+        result.update(answer=None, error=f'{type(e).__name__}: {e}')
+    finally:
+        trace.finish()
+    result.update(
+        intent=trace.attributes.get('flow'),
+        latency_ms=(time.perf_counter() - started) * 1000,
+        stages=trace.stage_timings(),
+    )
+    return result
+
+
+async def arun_batch(rows, output_path, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Executa os prompts ainda não concluídos e acrescenta os resultados ao
+    arquivo de saída.
+
+    Args:
+        rows (list[dict]): Prompts retornados por load_prompts.
+        output_path (str): Arquivo JSONL de saída (também o checkpoint).
+        concurrency (int): Sessões executadas ao mesmo tempo.
+
+    Returns:
+        dict: Resumo da execução, com a vazão em prompts por segundo.
+    """
+    done = completed_ids(output_path)
+    pending = [row for row in rows if row['id'] not in done]
+    sessions = {}
+    for row in pending:
+        sessions.setdefault(row['session_id'], []).append(row)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    intents = Counter()
+    errors = 0
+
+    async def run_session(session_rows, file):
+        nonlocal errors
+        async with semaphore:
+            for row in session_rows:
+                result = await run_prompt(row)
+                intents[result['intent'] or 'unknown'] += 1
+                errors += bool(result['error'])
+                file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                file.flush()
+
+    started = time.perf_counter()
+    with use_priority(BATCH):
+        with open(output_path, 'a', encoding='utf-8') as file:
+            await asyncio.gather(
+                *(
+                    run_session(session_rows, file)
+                    for session_rows in sessions.values()
+                )
+            )
+    seconds = time.perf_counter() - started
+    return {
+        'total': len(rows),
+        'skipped': len(rows) - len(pending),
+        'processed': len(pending),
+        'errors': errors,
+        'intents': dict(intents),
+        'seconds': seconds,
+        'prompts_per_second': len(pending) / seconds if seconds else 0.0,
+    }
+
+
+def run_batch(rows, output_path, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Versão síncrona de arun_batch, executada no loop compartilhado.
+    """
+    return run_sync(arun_batch(rows, output_path, concurrency))
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(
+        description='Executa um arquivo de prompts pelo pipeline do chatbot.'
+    )
+    parser.add_argument('input', help='Arquivo JSONL com os prompts.')
+    parser.add_argument('output', help='Arquivo JSONL dos resultados.')
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help='Sessões simultâneas.',
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Descarta os resultados anteriores em vez de retomar.',
+    )
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    summary = run_batch(
+        load_prompts(args.input), args.output, args.concurrency
+    )
+    print(
+        f'{summary["processed"]} prompts em {summary["seconds"]:.2f}s '
+        f'({summary["prompts_per_second"]:.2f} prompts/s, '
+        f'{summary["skipped"]} já concluídos, {summary["errors"]} erros)'
+    )
+    for intent, count in sorted(summary['intents'].items()):
+        print(f'{intent}: {count}')
+
+
+if __name__ == '__main__':
+    main()
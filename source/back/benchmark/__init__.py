@@ -0,0 +1,48 @@
+"""
+Benchmark offline do pipeline do chatbot.
+Executa o grafo de ferramentas com dublês locais do Groq, do Pinecone e do
+Tavily, sem chaves de API nem acesso à rede.
+
+Uso:
+    python -m back.benchmark --sessions 8 --output benchmark.json
+"""
+
+import os
+
+# back.config exige as chaves na importação; o benchmark não as utiliza.
+BENCHMARK_ENVIRONMENT = {
+    'GROQ_API_KEY': 'benchmark',
+    'PINECONE_API_KEY': 'benchmark',
+    'TAVILY_API_KEY': 'benchmark',
+    'PINECONE_ENVIRONMENT': 'us-east-1',
+    'PINECONE_HOST': 'benchmark',
+    'INDEX_NAME': 'benchmark',
+    'MODEL_ID': 'benchmark',
+}
+
+
+def prepare_environment(response_cache=False):
+    """
+    Configura as variáveis de ambiente do benchmark. Deve ser chamada antes
+    de importar back.config (e, portanto, back.benchmark.harness).
+
+    Args:
+        response_cache (bool): Se True, mantém o cache de respostas ativo.
+    """
+    for name, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    # Os dublês substituem o Pinecone; nada é lido ou gravado em disco.
+    os.environ['VECTOR_BACKEND'] = 'pinecone'
+    os.environ['RESPONSE_CACHE_ENABLED'] = str(response_cache).lower()
+    # Os limites de taxa do Groq não se aplicam ao dublê.
+    os.environ['GROQ_REQUESTS_PER_MINUTE'] = '0'
+    os.environ['GROQ_TOKENS_PER_MINUTE'] = '0'
+    for name in (
+        'RESPONSE_CACHE_PATH',
+        'LEXICAL_INDEX_DIRECTORY',
+        'EXTRACTION_CACHE_DIRECTORY',
+        'SESSION_MEMORY_PATH',
+        'TRACE_LOG_PATH',
+        'TRACE_METRICS_PATH',
+    ):
+        os.environ[name] = ''
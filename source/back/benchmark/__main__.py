@@ -0,0 +1,101 @@
+"""
+Linha de comando do benchmark offline.
+"""
+
+import argparse
+import json
+
+from . import prepare_environment
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark offline do pipeline do chatbot.'
+    )
+    parser.add_argument('--corpus', help='Arquivo com um prompt por linha.')
+    parser.add_argument(
+        '--sessions', type=int, default=8, help='Sessões simultâneas.'
+    )
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=3,
+        help='Vezes que cada sessão reproduz o corpus.',
+    )
+    parser.add_argument(
+        '--stream', action='store_true', help='Consome respostas em stream.'
+    )
+    parser.add_argument(
+        '--response-cache',
+        action='store_true',
+        help='Mantém o cache de respostas ativo.',
+    )
+    parser.add_argument(
+        '--extraction-turns',
+        type=int,
+        default=3,
+        help='Turnos do fluxo RAG com extração e indexação.',
+    )
+    parser.add_argument('--groq-latency', type=float, default=300)
+    parser.add_argument('--token-latency', type=float, default=5)
+    parser.add_argument('--response-tokens', type=int, default=120)
+    parser.add_argument('--index-latency', type=float, default=40)
+    parser.add_argument('--content-size', type=int, default=800)
+    parser.add_argument('--tavily-latency', type=float, default=800)
+    parser.add_argument('--page-size', type=int, default=20000)
+    parser.add_argument(
+        '--output', default='benchmark.json', help='Arquivo do relatório.'
+    )
+    parser.add_argument(
+        '--baseline', help='Relatório anterior para comparação.'
+    )
+    args = parser.parse_args(argv)
+
+    prepare_environment(response_cache=args.response_cache)
+    from .harness import compare_reports, load_report, run_benchmark
+
+    prompts = None
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as file:
+            prompts = [line.strip() for line in file if line.strip()]
+
+    report = run_benchmark(
+        prompts,
+        sessions=args.sessions,
+        rounds=args.rounds,
+        stream=args.stream,
+        extraction_turns=args.extraction_turns,
+        groq_latency_ms=args.groq_latency,
+        token_latency_ms=args.token_latency,
+        response_tokens=args.response_tokens,
+        index_latency_ms=args.index_latency,
+        content_size=args.content_size,
+        tavily_latency_ms=args.tavily_latency,
+        page_size=args.page_size,
+    )
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+
+    throughput = report['throughput']
+    print(
+        f'{throughput["turns"]} turnos em {throughput["seconds"]:.2f}s '
+        f'({throughput["turns_per_second"]:.1f} turnos/s, '
+        f'{throughput["sessions"]} sessões)'
+    )
+    for flow, metrics in report['flows'].items():
+        latency = metrics['latency_ms']
+        print(
+            f'{flow}: p50 {latency["p50"]:.1f} ms, '
+            f'p95 {latency["p95"]:.1f} ms, p99 {latency["p99"]:.1f} ms'
+        )
+    if args.baseline:
+        print('Comparação com', args.baseline)
+        for line in compare_reports(load_report(args.baseline), report):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
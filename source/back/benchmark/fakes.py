@@ -0,0 +1,214 @@
+"""
+Dublês locais do Groq, do Pinecone e do Tavily para o benchmark.
+Reproduzem a interface usada pelo backend com latência e tamanho de
+resposta configuráveis, sem acesso à rede.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+# Palavras que levam o dublê do Groq a classificar a mensagem como rag_flow.
+RAG_HINTS = ('waproject', 'wa project', 'empresa', 'serviços', 'servicos')
+
+
+def _sleep_ms(milliseconds):
+    if milliseconds > 0:
+        time.sleep(milliseconds / 1000)
+
+
+async def _asleep_ms(milliseconds):
+    if milliseconds > 0:
+        await asyncio.sleep(milliseconds / 1000)
+
+
+def _completion(content, prompt_tokens, completion_tokens):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=message, delta=message)],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+def _chunk(content):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeGroqCompletions:
+    """
+    Dublê de chat.completions do Groq.
+    """
+
+    def __init__(
+        self, latency_ms=300, token_latency_ms=5, response_tokens=120
+    ):
+        """
+        Args:
+            latency_ms (float): Latência até o primeiro token.
+            token_latency_ms (float): Latência entre tokens do stream.
+            response_tokens (int): Quantidade de tokens de cada resposta.
+        """
+        self.latency_ms = latency_ms
+        self.token_latency_ms = token_latency_ms
+        self.response_tokens = response_tokens
+
+    def _answer(self, messages, max_tokens=None):
+        content = messages[-1]['content']
+        prompt_tokens = len(content.split())
+        if content.startswith('Classifique'):
+            # A mensagem do usuário vem entre aspas no prompt de intenção.
+            message = content.split('"')[1].lower()
+            intent = '2' if any(hint in message for hint in RAG_HINTS) else '3'
+            return [intent], prompt_tokens
+        response_tokens = min(
+            self.response_tokens, max_tokens or self.response_tokens
+        )
+        words = [f'palavra{i % 50}' for i in range(response_tokens)]
+        return words, prompt_tokens
+
+    def create(self, messages, model, stream=False, **kwargs):
+        words, prompt_tokens = self._answer(messages, kwargs.get('max_tokens'))
+        _sleep_ms(self.latency_ms)
+        if stream:
+            return self._stream(words)
+        _sleep_ms(self.token_latency_ms * len(words))
+        return _completion(' '.join(words), prompt_tokens, len(words))
+
+    def _stream(self, words):
+        for i, word in enumerate(words):
+            if i:
+                _sleep_ms(self.token_latency_ms)
+            yield _chunk(f'{word} ')
+
+
+class FakeAsyncGroqCompletions(FakeGroqCompletions):
+    """
+    Dublê assíncrono de chat.completions do Groq.
+    """
+
+    async def create(self, messages, model, stream=False, **kwargs):
+        words, prompt_tokens = self._answer(messages, kwargs.get('max_tokens'))
+        await _asleep_ms(self.latency_ms)
+        if stream:
+            return self._astream(words)
+        await _asleep_ms(self.token_latency_ms * len(words))
+        return _completion(' '.join(words), prompt_tokens, len(words))
+
+    async def _astream(self, words):
+        for i, word in enumerate(words):
+            if i:
+                await _asleep_ms(self.token_latency_ms)
+            yield _chunk(f'{word} ')
+
+
+class FakeGroq:
+    """
+    Dublê do cliente síncrono do Groq.
+    """
+
+    def __init__(self, **options):
+        self.chat = SimpleNamespace(completions=FakeGroqCompletions(**options))
+
+
+class FakeAsyncGroq:
+    """
+    Dublê do cliente assíncrono do Groq.
+    """
+
+    def __init__(self, **options):
+        self.chat = SimpleNamespace(
+            completions=FakeAsyncGroqCompletions(**options)
+        )
+
+
+class FakeIndex:
+    """
+    Dublê de um índice do Pinecone com latência configurável.
+    As consultas retornam top_k trechos sintéticos de content_size caracteres.
+    """
+
+    def __init__(self, latency_ms=40, content_size=800):
+        """
+        Args:
+            latency_ms (float): Latência de cada operação de dados.
+            content_size (int): Tamanho do conteúdo de cada resultado.
+        """
+        self.latency_ms = latency_ms
+        self.content_size = content_size
+        self.vector_count = 0
+
+    def upsert(self, vectors, **kwargs):
+        _sleep_ms(self.latency_ms)
+        self.vector_count += len(vectors)
+        return {'upserted_count': len(vectors)}
+
+    def delete(self, ids, **kwargs):
+        _sleep_ms(self.latency_ms)
+        self.vector_count = max(0, self.vector_count - len(ids))
+        return {}
+
+    def query(self, vector, top_k=3, include_metadata=True, **kwargs):
+        _sleep_ms(self.latency_ms)
+        sentence = 'A WaProject desenvolve software sob medida. '
+        content = (sentence * (self.content_size // len(sentence) + 1))[
+            : self.content_size
+        ]
+        return {
+            'matches': [
+                {
+                    'id': f'fake_{i}',
+                    'score': 1.0 - i * 0.01,
+                    'metadata': {'url': 'https://fake/', 'content': content},
+                }
+                for i in range(top_k)
+            ]
+        }
+
+    def describe_index_stats(self):
+        return {'total_vector_count': self.vector_count}
+
+
+class FakeTavily:
+    """
+    Dublê do cliente síncrono do Tavily.
+    """
+
+    def __init__(self, latency_ms=800, page_size=20000):
+        """
+        Args:
+            latency_ms (float): Latência de cada extração.
+            page_size (int): Tamanho do conteúdo de cada página extraída.
+        """
+        self.latency_ms = latency_ms
+        self.page_size = page_size
+
+    def _results(self, urls):
+        paragraph = 'A WaProject cria produtos digitais para empresas.\n\n'
+        raw_content = (paragraph * (self.page_size // len(paragraph) + 1))[
+            : self.page_size
+        ]
+        return {
+            'results': [
+                {'url': url, 'raw_content': raw_content} for url in urls
+            ],
+            'failed_results': [],
+        }
+
+    def extract(self, urls, **kwargs):
+        _sleep_ms(self.latency_ms)
+        return self._results(urls)
+
+
+class FakeAsyncTavily(FakeTavily):
+    """
+    Dublê do cliente assíncrono do Tavily.
+    """
+
+    async def extract(self, urls, **kwargs):
+        await _asleep_ms(self.latency_ms)
+        return self._results(urls)
@@ -0,0 +1,355 @@
+"""
+Execução e relatório do benchmark offline.
+Reproduz um corpus de prompts em N sessões concorrentes e mede latência
+(p50/p95/p99) por fluxo e por etapa, vazão e alocações de memória por turno.
+
+Requer back.benchmark.prepare_environment() antes da importação.
+"""
+
+import asyncio
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from back.agent.rag_flow import arag_flow
+from back.agent.tool_graph import aconfigure_tool_graph
+from back.config import RAG_URLS
+from back.groq_client import set_groq_client
+from back.model_router import router
+from back.pinecone_client import set_index_factory
+from back.tavily_client import set_tavily_client
+from back.tracing import Trace, use_trace
+
+from .fakes import (
+    FakeAsyncGroq,
+    FakeAsyncTavily,
+    FakeGroq,
+    FakeIndex,
+    FakeTavily,
+)
+
+DEFAULT_PROMPTS = [
+    'Olá, tudo bem com você?',
+    'O que a WaProject faz?',
+    'Me conte uma curiosidade sobre o espaço.',
+    'Quais serviços a WaProject oferece?',
+    'Qual foi minha primeira mensagem?',
+    'Qual é a capital da Austrália?',
+    'A WaProject desenvolve aplicativos para celular?',
+    'Escreva um haicai sobre café.',
+    'Mostrar histórico',
+    '???',
+    'Como entro em contato com a WaProject?',
+    'Explique o que é aprendizado de máquina em poucas palavras.',
+]
+
+
+def install_fakes(
+    groq_latency_ms=300,
+    token_latency_ms=5,
+    response_tokens=120,
+    index_latency_ms=40,
+    content_size=800,
+    tavily_latency_ms=800,
+    page_size=20000,
+):
+    """
+    Substitui os clientes do Groq, do Pinecone e do Tavily pelos dublês.
+
+    Returns:
+        FakeIndex: Índice compartilhado pelos fluxos.
+    """
+    groq_options = {
+        'latency_ms': groq_latency_ms,
+        'token_latency_ms': token_latency_ms,
+        'response_tokens': response_tokens,
+    }
+    set_groq_client(FakeGroq(**groq_options), FakeAsyncGroq(**groq_options))
+    index = FakeIndex(latency_ms=index_latency_ms, content_size=content_size)
+    set_index_factory(lambda index_name, dimension: index)
+    set_tavily_client(
+        FakeTavily(tavily_latency_ms, page_size),
+        FakeAsyncTavily(tavily_latency_ms, page_size),
+    )
+    return index
+
+
+def summarize(samples):
+    """
+    Calcula percentis de uma lista de medidas em milissegundos.
+    """
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(samples),
+        'mean': float(values.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(values.max()),
+    }
+
+
+async def run_turn(prompt, session_id, stream=False):
+    """
+    Executa um turno do grafo de ferramentas e mede sua latência.
+
+    Returns:
+        dict: Fluxo, latência total, tempo até o primeiro trecho e a
+        duração de cada etapa do trace.
+    """
+    trace = Trace(session_id=session_id)
+    started = time.perf_counter()
+    first_chunk_ms = None
+    response = await aconfigure_tool_graph(
+        prompt, stream, 'pt', session_id, trace
+    )
+    if stream:
+        async for _ in response:
+            if first_chunk_ms is None:
+                first_chunk_ms = (time.perf_counter() - started) * 1000
+    latency_ms = (time.perf_counter() - started) * 1000
+    trace.finish()
+    return {
+        'flow': trace.attributes.get('flow', 'unknown'),
+        'latency_ms': latency_ms,
+        'first_chunk_ms': first_chunk_ms,
+        'stages': trace.stage_timings(),
+    }
+
+
+async def replay(prompts, sessions, rounds, stream=False):
+    """
+    Reproduz o corpus em sessões concorrentes.
+
+    Args:
+        prompts (list[str]): Corpus de prompts.
+        sessions (int): Quantidade de sessões simultâneas.
+        rounds (int): Quantas vezes cada sessão reproduz o corpus.
+        stream (bool): Se True, consome as respostas em stream.
+
+    Returns:
+        tuple[list[dict], float]: Resultados dos turnos e duração total em
+        segundos.
+    """
+
+    async def run_session(number):
+        results = []
+        for _ in range(rounds):
+            for prompt in prompts:
+                results.append(
+                    await run_turn(prompt, f'benchmark-{number}', stream)
+                )
+        return results
+
+    started = time.perf_counter()
+    sessions_results = await asyncio.gather(
+        *(run_session(number) for number in range(sessions))
+    )
+    elapsed = time.perf_counter() - started
+    results = [result for results in sessions_results for result in results]
+    return results, elapsed
+
+
+async def measure_allocations(prompts, stream=False):
+    """
+    Mede, turno a turno e sem concorrência, a memória alocada por fluxo.
+
+    Returns:
+        dict: Para cada fluxo, a média do pico de memória do turno, dos
+        bytes retidos e dos blocos novos retidos ao fim do turno.
+    """
+    per_flow = defaultdict(list)
+    tracemalloc.start()
+    try:
+        for prompt in prompts:
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = await run_turn(prompt, 'benchmark-allocations', stream)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            new_blocks = sum(
+                stat.count_diff
+                for stat in after.compare_to(before, 'filename')
+                if stat.count_diff > 0
+            )
+            per_flow[result['flow']].append(
+                (peak - baseline, current - baseline, new_blocks)
+            )
+    finally:
+        tracemalloc.stop()
+    return {
+        flow: {
+            'turns': len(samples),
+            'peak_bytes': float(np.mean([s[0] for s in samples])),
+            'retained_bytes': float(np.mean([s[1] for s in samples])),
+            'retained_blocks': float(np.mean([s[2] for s in samples])),
+        }
+        for flow, samples in per_flow.items()
+    }
+
+
+async def measure_extraction(prompts, turns):
+    """
+    Mede o fluxo RAG completo, com extração do Tavily e indexação.
+    """
+    samples = []
+    for i in range(turns):
+        trace = Trace(session_id='benchmark-extraction')
+        started = time.perf_counter()
+        with use_trace(trace):
+            await arag_flow(prompts[i % len(prompts)], RAG_URLS)
+        samples.append((time.perf_counter() - started) * 1000)
+        trace.finish()
+    return summarize(samples)
+
+
+def git_commit():
+    """
+    Retorna o commit atual do repositório, se disponível.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results, elapsed, sessions, allocations, extraction):
+    """
+    Agrega os resultados dos turnos no relatório do benchmark.
+    """
+    by_flow = defaultdict(list)
+    first_chunks = defaultdict(list)
+    by_stage = defaultdict(list)
+    for result in results:
+        by_flow[result['flow']].append(result['latency_ms'])
+        if result['first_chunk_ms'] is not None:
+            first_chunks[result['flow']].append(result['first_chunk_ms'])
+        for stage, duration in result['stages'].items():
+            by_stage[stage].append(duration)
+
+    flows = {}
+    for flow, samples in sorted(by_flow.items()):
+        flows[flow] = {'latency_ms': summarize(samples)}
+        if first_chunks[flow]:
+            flows[flow]['first_chunk_ms'] = summarize(first_chunks[flow])
+        if flow in allocations:
+            flows[flow]['allocations'] = allocations[flow]
+    if extraction['count']:
+        flows['rag_extraction'] = {'latency_ms': extraction}
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'overall': {
+            'latency_ms': summarize(
+                [result['latency_ms'] for result in results]
+            )
+        },
+        'throughput': {
+            'sessions': sessions,
+            'turns': len(results),
+            'seconds': elapsed,
+            'turns_per_second': len(results) / elapsed if elapsed else 0.0,
+        },
+        'flows': flows,
+        'stages': {
+            stage: summarize(samples)
+            for stage, samples in sorted(by_stage.items())
+        },
+        'routes': router.metrics(),
+    }
+
+
+def run_benchmark(
+    prompts=None,
+    sessions=8,
+    rounds=3,
+    stream=False,
+    extraction_turns=3,
+    **fake_options,
+):
+    """
+    Executa o benchmark completo.
+
+    Args:
+        prompts (list[str]): Corpus de prompts; usa DEFAULT_PROMPTS se None.
+        sessions (int): Quantidade de sessões simultâneas.
+        rounds (int): Quantas vezes cada sessão reproduz o corpus.
+        stream (bool): Se True, consome as respostas em stream.
+        extraction_turns (int): Turnos do fluxo RAG com extração.
+        **fake_options: Latências e tamanhos repassados a install_fakes.
+
+    Returns:
+        dict: Relatório do benchmark.
+    """
+    prompts = prompts or DEFAULT_PROMPTS
+    install_fakes(**fake_options)
+    router.reset_metrics()
+
+    async def run():
+        results, elapsed = await replay(prompts, sessions, rounds, stream)
+        allocations = await measure_allocations(prompts, stream)
+        extraction = await measure_extraction(prompts, extraction_turns)
+        return build_report(
+            results, elapsed, sessions, allocations, extraction
+        )
+
+    report = asyncio.run(run())
+    report['parameters'] = {
+        'prompts': len(prompts),
+        'sessions': sessions,
+        'rounds': rounds,
+        'stream': stream,
+        'extraction_turns': extraction_turns,
+        **fake_options,
+    }
+    return report
+
+
+def compare_reports(baseline, report):
+    """
+    Compara as latências de dois relatórios.
+
+    Returns:
+        list[str]: Linhas com a variação de p50 e p95 de cada fluxo.
+    """
+    lines = []
+    for flow, metrics in report['flows'].items():
+        previous = baseline.get('flows', {}).get(flow)
+        if previous is None:
+            continue
+        changes = []
+        for percentile in ('p50', 'p95'):
+            old = previous['latency_ms'].get(percentile)
+            new = metrics['latency_ms'].get(percentile)
+            if old and new is not None:
+                changes.append(
+                    f'{percentile} {old:.1f} -> {new:.1f} ms '
+                    f'({(new - old) / old:+.1%})'
+                )
+        lines.append(f'{flow}: ' + ', '.join(changes))
+    return lines
+
+
+def load_report(path):
+    """
+    Carrega um relatório salvo em JSON.
+    """
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -21,10 +21,239 @@ def get_env_variable(var_name, default=None):
     return value
 
 
-GROQ_API_KEY = get_env_variable('GROQ_API_KEY')
-PINECONE_API_KEY = get_env_variable('PINECONE_API_KEY')
-TAVILY_API_KEY = get_env_variable('TAVILY_API_KEY')
-PINECONE_ENVIRONMENT = get_env_variable('PINECONE_ENVIRONMENT')
-PINECONE_HOST = get_env_variable('PINECONE_HOST')
-INDEX_NAME = get_env_variable('INDEX_NAME')
-MODEL_ID = get_env_variable('MODEL_ID')
+# Variáveis obrigatórias. São lidas e validadas no primeiro acesso (PEP 562),
+# para que importar o backend não exija chaves que o processo não usa.
+REQUIRED_VARIABLES = (
+    'GROQ_API_KEY',
+    'PINECONE_API_KEY',
+    'TAVILY_API_KEY',
+    'PINECONE_ENVIRONMENT',
+    'PINECONE_HOST',
+    'INDEX_NAME',
+    'MODEL_ID',
+)
+
+
+def __getattr__(name):
+    if name in REQUIRED_VARIABLES:
+        value = get_env_variable(name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# URLs indexadas pelo job de ingestão (separadas por vírgula).
+RAG_URLS = [
+    url.strip()
+    for url in get_env_variable(
+        'RAG_URLS',
+        'https://software.waproject.com.br/,https://www.waproject.com.br/',
+    ).split(',')
+    if url.strip()
+]
+INGESTION_INTERVAL = int(get_env_variable('INGESTION_INTERVAL', '21600'))
+INGESTION_STATE_PATH = get_env_variable(
+    'INGESTION_STATE_PATH',
+    os.path.join(os.path.dirname(__file__), '../data/ingestion_state.json'),
+)
+
+# Extração de páginas: cache em disco do conteúdo por URL (vazio desativa),
+# validade das extrações em segundos, URLs por chamada ao Tavily e chamadas
+# simultâneas.
+EXTRACTION_CACHE_DIRECTORY = get_env_variable(
+    'EXTRACTION_CACHE_DIRECTORY',
+    os.path.join(os.path.dirname(__file__), '../data/extractions'),
+)
+EXTRACTION_CACHE_TTL = int(get_env_variable('EXTRACTION_CACHE_TTL', '3600'))
+EXTRACTION_SHARD_SIZE = int(get_env_variable('EXTRACTION_SHARD_SIZE', '5'))
+EXTRACTION_MAX_WORKERS = int(get_env_variable('EXTRACTION_MAX_WORKERS', '4'))
+
+# Envio em lote de vetores para o índice.
+UPSERT_BATCH_SIZE = int(get_env_variable('UPSERT_BATCH_SIZE', '100'))
+UPSERT_MAX_WORKERS = int(get_env_variable('UPSERT_MAX_WORKERS', '4'))
+UPSERT_MAX_RETRIES = int(get_env_variable('UPSERT_MAX_RETRIES', '3'))
+UPSERT_MAX_BATCH_BYTES = int(
+    get_env_variable('UPSERT_MAX_BATCH_BYTES', str(2 * 1024 * 1024))
+)
+
+# Geração de embeddings.
+EMBEDDER = get_env_variable('EMBEDDER', 'hashing')
+EMBEDDING_DIMENSION = int(get_env_variable('EMBEDDING_DIMENSION', '1536'))
+
+# Backend de índice vetorial: 'pinecone' ou 'local'.
+VECTOR_BACKEND = get_env_variable('VECTOR_BACKEND', 'pinecone')
+LOCAL_INDEX_DIRECTORY = get_env_variable(
+    'LOCAL_INDEX_DIRECTORY',
+    os.path.join(os.path.dirname(__file__), '../data/vectors'),
+)
+
+# Cache de respostas dos fluxos.
+RESPONSE_CACHE_ENABLED = (
+    get_env_variable('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(
+    get_env_variable('RESPONSE_CACHE_MAX_ENTRIES', '1000')
+)
+RESPONSE_CACHE_MAX_BYTES = int(
+    get_env_variable('RESPONSE_CACHE_MAX_BYTES', str(16 * 1024 * 1024))
+)
+RESPONSE_CACHE_TTL = int(get_env_variable('RESPONSE_CACHE_TTL', '3600'))
+# Nível semântico (0 desativa); exige um embedder semântico em EMBEDDER.
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(
+    get_env_variable('RESPONSE_CACHE_SEMANTIC_THRESHOLD', '0')
+)
+RESPONSE_CACHE_PATH = get_env_variable('RESPONSE_CACHE_PATH', '')
+
+# Confiança mínima do classificador local para dispensar o LLM. Em
+# EVALUATION_EXAMPLES, 0.2 decide localmente 31% das mensagens sem erros;
+# 0.1 chega a 45%, com 97% de acerto (python -m back.agent.intent_classifier).
+INTENT_CONFIDENCE_THRESHOLD = float(
+    get_env_variable('INTENT_CONFIDENCE_THRESHOLD', '0.2')
+)
+
+# Consulta o índice em paralelo à classificação de intenção.
+SPECULATIVE_RETRIEVAL = (
+    get_env_variable('SPECULATIVE_RETRIEVAL', 'false').lower() == 'true'
+)
+
+# Tradução: 'prompt' pede o idioma ao Groq; 'translator' traduz a resposta.
+TRANSLATION_MODE = get_env_variable('TRANSLATION_MODE', 'prompt')
+TRANSLATION_CACHE_SIZE = int(get_env_variable('TRANSLATION_CACHE_SIZE', '512'))
+TRANSLATION_CHUNK_SIZE = int(
+    get_env_variable('TRANSLATION_CHUNK_SIZE', '4500')
+)
+TRANSLATION_MAX_WORKERS = int(get_env_variable('TRANSLATION_MAX_WORKERS', '4'))
+
+# Detecção de idioma: semente do langdetect, confiança da heurística que
+# dispensa o langdetect, confiança mínima para traduzir a resposta e
+# carregamento dos perfis em segundo plano na inicialização.
+LANGUAGE_DETECTION_SEED = int(get_env_variable('LANGUAGE_DETECTION_SEED', '0'))
+LANGUAGE_HEURISTIC_CONFIDENCE = float(
+    get_env_variable('LANGUAGE_HEURISTIC_CONFIDENCE', '0.75')
+)
+LANGUAGE_MIN_CONFIDENCE = float(
+    get_env_variable('LANGUAGE_MIN_CONFIDENCE', '0.6')
+)
+LANGUAGE_PREWARM = (
+    get_env_variable('LANGUAGE_PREWARM', 'true').lower() == 'true'
+)
+
+# Memória de conversas por sessão.
+SESSION_MAX_TURNS = int(get_env_variable('SESSION_MAX_TURNS', '50'))
+SESSION_MAX_TOKENS = int(get_env_variable('SESSION_MAX_TOKENS', '8000'))
+SESSION_MAX_SESSIONS = int(get_env_variable('SESSION_MAX_SESSIONS', '1000'))
+SESSION_IDLE_TTL = int(get_env_variable('SESSION_IDLE_TTL', '3600'))
+SESSION_MEMORY_PATH = get_env_variable('SESSION_MEMORY_PATH', '')
+# Segundos sem mensagens até a sessão ser apagada do SQLite (0 mantém).
+SESSION_RETENTION = int(get_env_variable('SESSION_RETENTION', '2592000'))
+# Turnos por página ao mostrar o histórico.
+HISTORY_PAGE_SIZE = int(get_env_variable('HISTORY_PAGE_SIZE', '20'))
+
+# Rastreamento por requisição: arquivo JSONL dos traces e snapshot das
+# métricas no formato do Prometheus. Vazio desativa a exportação em arquivo.
+TRACE_LOG_PATH = get_env_variable('TRACE_LOG_PATH', '')
+TRACE_METRICS_PATH = get_env_variable('TRACE_METRICS_PATH', '')
+
+# Pinecone: conexões HTTP e threads por índice, intervalo (em segundos) da
+# verificação de saúde em segundo plano (0 desativa) e pré-aquecimento do
+# índice na inicialização.
+PINECONE_POOL_SIZE = int(get_env_variable('PINECONE_POOL_SIZE', '16'))
+PINECONE_POOL_THREADS = int(get_env_variable('PINECONE_POOL_THREADS', '4'))
+PINECONE_HEALTH_INTERVAL = int(
+    get_env_variable('PINECONE_HEALTH_INTERVAL', '60')
+)
+VECTOR_PREWARM = get_env_variable('VECTOR_PREWARM', 'true').lower() == 'true'
+
+# Divisão do conteúdo indexado: tokens por segmento, sobreposição entre
+# segmentos vizinhos e distância de Hamming (SimHash) para descartar
+# segmentos quase duplicados (negativa desativa a remoção).
+CHUNK_MAX_TOKENS = int(get_env_variable('CHUNK_MAX_TOKENS', '256'))
+CHUNK_OVERLAP_TOKENS = int(get_env_variable('CHUNK_OVERLAP_TOKENS', '32'))
+CHUNK_DEDUP_DISTANCE = int(get_env_variable('CHUNK_DEDUP_DISTANCE', '6'))
+
+# Montagem do contexto do fluxo RAG: candidatos buscados no índice, peso da
+# relevância no MMR (1 ignora a diversidade), similaridade a partir da qual
+# um trecho é descartado como repetido, orçamento de tokens do contexto e
+# tokens reservados para a resposta dentro da janela do MODEL_ID.
+RAG_CANDIDATES = int(get_env_variable('RAG_CANDIDATES', '12'))
+RAG_MMR_LAMBDA = float(get_env_variable('RAG_MMR_LAMBDA', '0.7'))
+RAG_DUPLICATE_SIMILARITY = float(
+    get_env_variable('RAG_DUPLICATE_SIMILARITY', '0.85')
+)
+RAG_CONTEXT_TOKENS = int(get_env_variable('RAG_CONTEXT_TOKENS', '1200'))
+RAG_RESPONSE_TOKENS = int(get_env_variable('RAG_RESPONSE_TOKENS', '1024'))
+# Folga sobre a estimativa de tokens (caracteres / 4) ao encaixar o contexto
+# na janela do modelo: o português gera mais tokens por caractere que o
+# inglês, e a estimativa pode ficar cerca de 30% abaixo da contagem real.
+RAG_TOKEN_ESTIMATE_MARGIN = float(
+    get_env_variable('RAG_TOKEN_ESTIMATE_MARGIN', '0.35')
+)
+
+# Busca híbrida: índice lexical BM25 consultado junto ao vetorial e combinado
+# por fusão de ranking recíproco (RRF). O índice lexical também responde
+# quando o backend vetorial falha ou excede VECTOR_QUERY_TIMEOUT segundos
+# (0 desativa o limite).
+HYBRID_RETRIEVAL = (
+    get_env_variable('HYBRID_RETRIEVAL', 'true').lower() == 'true'
+)
+LEXICAL_INDEX_DIRECTORY = get_env_variable(
+    'LEXICAL_INDEX_DIRECTORY', LOCAL_INDEX_DIRECTORY
+)
+BM25_K1 = float(get_env_variable('BM25_K1', '1.2'))
+BM25_B = float(get_env_variable('BM25_B', '0.75'))
+RRF_K = int(get_env_variable('RRF_K', '60'))
+VECTOR_QUERY_TIMEOUT = float(get_env_variable('VECTOR_QUERY_TIMEOUT', '2'))
+
+# Gateway do Groq: limites de requisições e tokens por minuto (0 desativa),
+# requisições iniciadas simultaneamente, novas tentativas após limite de
+# taxa ou falha, espera base e máxima (em segundos) do backoff exponencial
+# e tokens de resposta reservados quando a chamada não define max_tokens.
+GROQ_REQUESTS_PER_MINUTE = int(
+    get_env_variable('GROQ_REQUESTS_PER_MINUTE', '30')
+)
+GROQ_TOKENS_PER_MINUTE = int(
+    get_env_variable('GROQ_TOKENS_PER_MINUTE', '15000')
+)
+GROQ_MAX_CONCURRENCY = int(get_env_variable('GROQ_MAX_CONCURRENCY', '8'))
+GROQ_MAX_RETRIES = int(get_env_variable('GROQ_MAX_RETRIES', '3'))
+GROQ_BACKOFF_BASE = float(get_env_variable('GROQ_BACKOFF_BASE', '0.5'))
+GROQ_BACKOFF_MAX = float(get_env_variable('GROQ_BACKOFF_MAX', '20'))
+GROQ_COMPLETION_TOKENS = int(get_env_variable('GROQ_COMPLETION_TOKENS', '512'))
+
+# Roteamento de modelos: modelo rápido e modelo grande do Groq (vazios usam
+# MODEL_ID) e, para cada rota (intenção, conversa geral e RAG), o modelo
+# ('fast', 'large' ou um identificador), os limites da resposta e o tamanho
+# do prompt, em tokens, a partir do qual a chamada é escalada para o modelo
+# grande (0 desativa).
+FAST_MODEL_ID = get_env_variable('FAST_MODEL_ID', '')
+LARGE_MODEL_ID = get_env_variable('LARGE_MODEL_ID', '')
+ROUTE_INTENT_MODEL = get_env_variable('ROUTE_INTENT_MODEL', 'fast')
+ROUTE_INTENT_MAX_TOKENS = int(get_env_variable('ROUTE_INTENT_MAX_TOKENS', '8'))
+ROUTE_INTENT_TEMPERATURE = float(
+    get_env_variable('ROUTE_INTENT_TEMPERATURE', '0')
+)
+ROUTE_GENERAL_MODEL = get_env_variable('ROUTE_GENERAL_MODEL', 'fast')
+ROUTE_GENERAL_MAX_TOKENS = int(
+    get_env_variable('ROUTE_GENERAL_MAX_TOKENS', '512')
+)
+ROUTE_GENERAL_TEMPERATURE = float(
+    get_env_variable('ROUTE_GENERAL_TEMPERATURE', '0.7')
+)
+ROUTE_GENERAL_ESCALATION_TOKENS = int(
+    get_env_variable('ROUTE_GENERAL_ESCALATION_TOKENS', '400')
+)
+ROUTE_RAG_MODEL = get_env_variable('ROUTE_RAG_MODEL', 'fast')
+ROUTE_RAG_MAX_TOKENS = int(
+    get_env_variable('ROUTE_RAG_MAX_TOKENS', str(RAG_RESPONSE_TOKENS))
+)
+ROUTE_RAG_TEMPERATURE = float(get_env_variable('ROUTE_RAG_TEMPERATURE', '0.2'))
+ROUTE_RAG_ESCALATION_TOKENS = int(
+    get_env_variable('ROUTE_RAG_ESCALATION_TOKENS', '600')
+)
+
+# Grafo de ferramentas: checkpointer do LangGraph ('memory' ou vazio para
+# desativar) e compilação do grafo em segundo plano na inicialização.
+TOOL_GRAPH_CHECKPOINTER = get_env_variable('TOOL_GRAPH_CHECKPOINTER', '')
+TOOL_GRAPH_PREWARM = (
+    get_env_variable('TOOL_GRAPH_PREWARM', 'true').lower() == 'true'
+)
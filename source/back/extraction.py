@@ -0,0 +1,284 @@
+"""
+Extração de páginas pelo Tavily com cache em disco.
+O conteúdo de cada URL é guardado com o horário da extração e o hash do
+conteúdo, de modo que páginas recentes não são extraídas de novo e páginas
+inalteradas não precisam ser reindexadas. As URLs restantes são divididas em
+lotes extraídos em paralelo, com um número limitado de chamadas simultâneas.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (
+    EXTRACTION_CACHE_DIRECTORY,
+    EXTRACTION_CACHE_TTL,
+    EXTRACTION_MAX_WORKERS,
+    EXTRACTION_SHARD_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def content_hash(raw_content):
+    """
+    Calcula o hash SHA-256 do conteúdo extraído.
+    """
+    return hashlib.sha256(raw_content.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Cache do conteúdo extraído, com um arquivo JSON por URL nomeado pelo
+    SHA-256 da URL.
+    """
+
+    def __init__(
+        self, directory=EXTRACTION_CACHE_DIRECTORY, ttl=EXTRACTION_CACHE_TTL
+    ):
+        """
+        Inicializa o cache.
+
+        Args:
+            directory (str): Diretório dos arquivos. Vazio desativa o cache.
+            ttl (int): Segundos em que uma extração é considerada recente.
+        """
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def peek(self, url):
+        """
+        Retorna a última extração da URL, mesmo que expirada.
+
+        Returns:
+            dict: Entrada com 'url', 'raw_content', 'content_hash' e
+            'fetched_at', ou None se não houver.
+        """
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(url), encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def is_fresh(self, entry):
+        """
+        Indica se a entrada ainda está dentro do TTL.
+        """
+        return (
+            entry is not None and time.time() - entry['fetched_at'] < self.ttl
+        )
+
+    def put(self, url, raw_content):
+        """
+        Grava a extração da URL.
+
+        Returns:
+            dict: Entrada gravada.
+        """
+        entry = {
+            'url': url,
+            'raw_content': raw_content,
+            'content_hash': content_hash(raw_content),
+            'fetched_at': time.time(),
+        }
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(url)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(entry, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        return entry
+
+
+def get_extraction_cache():
+    """
+    Retorna o cache de extrações compartilhado pelo processo.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+    return _cache
+
+
+def _result(entry, cached, changed, stale=False):
+    return {
+        'url': entry['url'],
+        'raw_content': entry['raw_content'],
+        'content_hash': entry['content_hash'],
+        'fetched_at': entry['fetched_at'],
+        'cached': cached,
+        'changed': changed,
+        'stale': stale,
+    }
+
+
+class Extractor:
+    """
+    Extrai URLs pelo Tavily consultando antes o cache em disco.
+    Os resultados seguem o formato do Tavily ('results' e
+    'failed_results'), com os campos extras 'content_hash', 'fetched_at',
+    'cached', 'changed' e 'stale' em cada resultado. Resultados 'stale' são
+    extrações anteriores usadas porque a extração atual falhou; essas URLs
+    também aparecem em 'failed_results'.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache=None,
+        shard_size=EXTRACTION_SHARD_SIZE,
+        max_workers=EXTRACTION_MAX_WORKERS,
+    ):
+        """
+        Inicializa o extrator.
+
+        Args:
+            client: Cliente do Tavily (síncrono para extract, assíncrono
+                para aextract).
+            cache (ExtractionCache): Cache de extrações. Se None, usa o
+                cache compartilhado do processo.
+            shard_size (int): URLs por chamada ao Tavily.
+            max_workers (int): Chamadas simultâneas ao Tavily.
+        """
+        self.client = client
+        self.cache = cache or get_extraction_cache()
+        self.shard_size = max(1, shard_size)
+        self.max_workers = max(1, max_workers)
+
+    def _shards(self, urls):
+        return [
+            urls[i : i + self.shard_size]
+            for i in range(0, len(urls), self.shard_size)
+        ]
+
+    def _lookup(self, urls, force):
+        """
+        Separa as URLs servidas pelo cache das que precisam ser extraídas.
+
+        Returns:
+            tuple[dict, dict, list[str]]: Resultados do cache por URL,
+            entradas anteriores por URL e URLs a extrair.
+        """
+        results, previous, missing = {}, {}, []
+        for url in dict.fromkeys(urls):
+            entry = self.cache.peek(url)
+            if not force and self.cache.is_fresh(entry):
+                results[url] = _result(entry, cached=True, changed=False)
+            else:
+                previous[url] = entry
+                missing.append(url)
+        return results, previous, missing
+
+    def _store(self, shard, response, error, previous, results, failed):
+        """
+        Grava no cache o resultado de um lote. Em caso de falha, usa a
+        extração anterior da URL, se houver, mesmo que expirada, marcada
+        como 'stale', e registra a falha.
+        """
+        if error is not None:
+            logger.warning('Falha ao extrair %s: %s', shard, error)
+            response = {
+                'results': [],
+                'failed_results': [
+                    {'url': url, 'error': str(error)} for url in shard
+                ],
+            }
+        for item in response.get('results', []):
+            url = item.get('url')
+            raw_content = item.get('raw_content') or ''
+            if not url or not raw_content:
+                continue
+            entry = self.cache.put(url, raw_content)
+            old = previous.get(url)
+            changed = (
+                old is None or old['content_hash'] != entry['content_hash']
+            )
+            results[url] = _result(entry, cached=False, changed=changed)
+        for item in response.get('failed_results', []):
+            url = item.get('url') if isinstance(item, dict) else item
+            if url in results:
+                continue
+            if previous.get(url) is not None:
+                results[url] = _result(
+                    previous[url], cached=True, changed=False, stale=True
+                )
+            failed.append(item)
+
+    @staticmethod
+    def _response(results, failed):
+        return {'results': list(results.values()), 'failed_results': failed}
+
+    def extract(self, urls, force=False):
+        """
+        Extrai as URLs, usando o cache para as extrações recentes.
+
+        Args:
+            urls (list[str]): URLs a extrair.
+            force (bool): Se True, ignora o TTL e extrai todas as URLs.
+
+        Returns:
+            dict: Resultados no formato do Tavily.
+        """
+        results, previous, missing = self._lookup(urls, force)
+        failed = []
+        shards = self._shards(missing)
+        if shards:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(shards))
+            ) as executor:
+                futures = [
+                    (shard, executor.submit(self.client.extract, urls=shard))
+                    for shard in shards
+                ]
+                for shard, future in futures:
+                    try:
+                        response, error = future.result(), None
+                    except Exception as e:
+                        response, error = None, e
+                    self._store(
+                        shard, response, error, previous, results, failed
+                    )
+        return self._response(results, failed)
+
+    async def aextract(self, urls, force=False):
+        """
+        Versão assíncrona de extract. Requer um cliente Tavily assíncrono;
+        o acesso ao cache é executado em threads.
+        """
+        results, previous, missing = await asyncio.to_thread(
+            self._lookup, urls, force
+        )
+        failed = []
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def fetch(shard):
+            async with semaphore:
+                try:
+                    return shard, await self.client.extract(urls=shard), None
+                except Exception as e:
+                    return shard, None, e
+
+        for shard, response, error in await asyncio.gather(
+            *(fetch(shard) for shard in self._shards(missing))
+        ):
+            await asyncio.to_thread(
+                self._store, shard, response, error, previous, results, failed
+            )
+        return self._response(results, failed)
@@ -1,20 +1,60 @@
-from back.config import GROQ_API_KEY
-from groq import Groq
+from back import config
+
+# Os clientes (e o pacote groq) são criados apenas no primeiro uso.
+_client = None
+_async_client = None
 
 
 def create_general_chain():
     """
     Cria uma instância do cliente Groq com a chave de API configurada.
+    As novas tentativas ficam a cargo do gateway (back.groq_gateway).
     """
-    client = Groq(api_key=GROQ_API_KEY)
-    return client
-
+    from groq import Groq
 
-client = create_general_chain()
+    client = Groq(api_key=config.GROQ_API_KEY, max_retries=0)
+    return client
 
 
 def get_groq_client():
     """
     Retorna a instância do cliente Groq.
     """
-    return client
+    global _client
+    if _client is None:
+        _client = create_general_chain()
+    return _client
+
+
+def set_groq_client(sync_client=None, async_client=None):
+    """
+    Substitui os clientes do Groq, por exemplo por dublês no benchmark.
+    Chamar sem argumentos restaura os clientes padrão no próximo uso.
+
+    Args:
+        sync_client: Cliente síncrono a ser usado.
+        async_client: Cliente assíncrono a ser usado.
+    """
+    global _client, _async_client
+    _client = sync_client
+    _async_client = async_client
+
+
+def create_async_client():
+    """
+    Cria uma instância do cliente assíncrono do Groq.
+    """
+    from groq import AsyncGroq
+
+    return AsyncGroq(api_key=config.GROQ_API_KEY, max_retries=0)
+
+
+def get_async_groq_client():
+    """
+    Retorna a instância única do cliente assíncrono do Groq.
+    Deve ser usada sempre a partir do mesmo loop de eventos.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
@@ -0,0 +1,542 @@
+"""
+Gateway das chamadas ao Groq.
+Todas as chamadas a chat.completions passam por aqui para:
+- unir requisições idênticas em andamento em uma única chamada;
+- respeitar os limites de requisições e tokens por minuto (token buckets);
+- aguardar o retry-after informado pelo Groq antes de tentar de novo;
+- atender primeiro os turnos interativos e depois os jobs em lote.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .config import (
+    GROQ_BACKOFF_BASE,
+    GROQ_BACKOFF_MAX,
+    GROQ_COMPLETION_TOKENS,
+    GROQ_MAX_CONCURRENCY,
+    GROQ_MAX_RETRIES,
+    GROQ_REQUESTS_PER_MINUTE,
+    GROQ_TOKENS_PER_MINUTE,
+)
+from .tokens import estimate_tokens
+from .tracing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+# Prioridades: valores menores são atendidos primeiro.
+INTERACTIVE = 0
+BATCH = 10
+
+_priority = ContextVar('groq_priority', default=INTERACTIVE)
+
+RETRYABLE_ERRORS = ('APIConnectionError', 'APITimeoutError')
+
+
+class RateLimitExceeded(RuntimeError):
+    """
+    Limite de requisições do Groq excedido mesmo após as novas tentativas.
+    """
+
+    def __init__(self, retry_after=None):
+        super().__init__('Limite de requisições do Groq excedido.')
+        self.retry_after = retry_after
+
+
+class _LeaderCancelled(Exception):
+    """
+    A chamada compartilhada foi cancelada por quem a fazia; os aguardantes
+    devem refazê-la.
+    """
+
+
+@contextmanager
+def use_priority(priority):
+    """
+    Define a prioridade das chamadas ao Groq feitas dentro do bloco,
+    inclusive em tarefas e threads iniciadas a partir dele.
+
+    Args:
+        priority (int): INTERACTIVE, BATCH ou outro valor (menor é mais
+            prioritário).
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket com reposição contínua a partir de um limite por minuto.
+    As reservas são debitadas imediatamente e o saldo pode ficar negativo;
+    o chamador aguarda o tempo necessário para quitá-lo.
+    """
+
+    def __init__(self, per_minute):
+        """
+        Args:
+            per_minute (int): Capacidade reposta a cada minuto. 0 desativa.
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Debita a quantidade informada.
+
+        Returns:
+            float: Segundos a aguardar antes de usar a reserva.
+        """
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount):
+        """
+        Corrige uma reserva com o consumo real (positivo debita, negativo
+        devolve).
+        """
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+class PriorityGate:
+    """
+    Semáforo com fila de prioridade, compartilhado por threads e pelo loop
+    de eventos. Quando não há vagas, a próxima liberada vai para o
+    aguardante de menor prioridade (e, no empate, o mais antigo).
+    """
+
+    def __init__(self, slots):
+        self.available = slots
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _enter(self, priority, wake):
+        with self._lock:
+            if self.available > 0 and not self._waiters:
+                self.available -= 1
+                return None
+            waiter = {'wake': wake, 'granted': False, 'cancelled': False}
+            heapq.heappush(
+                self._waiters, (priority, next(self._sequence), waiter)
+            )
+            return waiter
+
+    def acquire(self, priority=INTERACTIVE):
+        """
+        Obtém uma vaga, bloqueando a thread até que esteja disponível.
+        """
+        event = threading.Event()
+        if self._enter(priority, event.set) is not None:
+            event.wait()
+
+    async def aacquire(self, priority=INTERACTIVE):
+        """
+        Versão assíncrona de acquire.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(None)
+            )
+
+        waiter = self._enter(priority, wake)
+        if waiter is None:
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter['granted']
+                waiter['cancelled'] = True
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Libera uma vaga, entregando-a ao próximo aguardante, se houver.
+        """
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if not waiter['cancelled']:
+                    waiter['granted'] = True
+                    waiter['wake']()
+                    return
+            self.available += 1
+
+
+class StreamFanout:
+    """
+    Repassa um stream do Groq a vários consumidores. O stream original é
+    lido por uma única tarefa e cada consumidor recebe todos os trechos
+    desde o início.
+    """
+
+    def __init__(self, stream):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._condition = asyncio.Condition()
+        self.task = asyncio.ensure_future(self._pump(stream))
+
+    async def _pump(self, stream):
+        try:
+            async for chunk in stream:
+                async with self._condition:
+                    self.chunks.append(chunk)
+                    self._condition.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._condition:
+                self.done = True
+                self._condition.notify_all()
+
+    async def consume(self):
+        """
+        Gera os trechos do stream para um consumidor.
+        """
+        position = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: position < len(self.chunks) or self.done
+                )
+                if position < len(self.chunks):
+                    chunk = self.chunks[position]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            position += 1
+            yield chunk
+
+
+def request_key(messages, model, stream, params):
+    """
+    Calcula a chave que identifica requisições idênticas.
+    """
+    payload = json.dumps(
+        [messages, model, stream, params], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def retry_after(error):
+    """
+    Lê o tempo de espera, em segundos, dos cabeçalhos da resposta de erro.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for name, scale in (('retry-after-ms', 1000), ('retry-after', 1)):
+        try:
+            return float(headers[name]) / scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class GroqGateway:
+    """
+    Ponto único das chamadas a chat.completions.create do Groq.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=GROQ_TOKENS_PER_MINUTE,
+        max_concurrency=GROQ_MAX_CONCURRENCY,
+        max_retries=GROQ_MAX_RETRIES,
+        completion_tokens=GROQ_COMPLETION_TOKENS,
+    ):
+        """
+        Inicializa o gateway.
+
+        Args:
+            requests_per_minute (int): Limite de requisições por minuto.
+                0 desativa.
+            tokens_per_minute (int): Limite de tokens por minuto. 0 desativa.
+            max_concurrency (int): Requisições iniciadas simultaneamente.
+            max_retries (int): Novas tentativas após limite de taxa, falha
+                de conexão ou erro 5xx.
+            completion_tokens (int): Tokens de resposta reservados quando a
+                chamada não informa max_tokens.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.gate = PriorityGate(max(1, max_concurrency))
+        self.max_retries = max_retries
+        self.completion_tokens = completion_tokens
+        self.stats = {
+            'calls': 0,
+            'coalesced': 0,
+            'retries': 0,
+            'rate_limited': 0,
+        }
+        self._resume_at = 0.0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _reserve(self, messages, params):
+        """
+        Reserva a requisição e os tokens estimados nos buckets.
+
+        Returns:
+            tuple[int, float]: Tokens reservados e segundos de espera.
+        """
+        reserved = sum(
+            estimate_tokens(message.get('content') or '')
+            for message in messages
+        ) + (params.get('max_tokens') or self.completion_tokens)
+        wait = max(
+            self.requests.reserve(1),
+            self.tokens.reserve(reserved),
+            self._resume_at - time.monotonic(),
+        )
+        return reserved, wait
+
+    def _refund(self, reserved):
+        """
+        Devolve os tokens reservados para uma tentativa que falhou ou foi
+        cancelada, sem consumo a ser cobrado.
+        """
+        self.tokens.adjust(-reserved)
+
+    def _settle(self, reserved, response):
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.tokens.adjust(usage.total_tokens - reserved)
+
+    def _retry_delay(self, error, attempt):
+        """
+        Calcula a espera antes da próxima tentativa ou None se o erro não
+        deve ser repetido. Um limite de taxa pausa todas as chamadas até o
+        retry-after.
+        """
+        status = getattr(error, 'status_code', None)
+        rate_limited = status == 429
+        if not (
+            rate_limited
+            or (status is not None and status >= 500)
+            or type(error).__name__ in RETRYABLE_ERRORS
+        ):
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * 2**attempt)
+            delay *= 0.5 + random.random() / 2
+        if rate_limited:
+            self._count('rate_limited')
+            with self._lock:
+                self._resume_at = max(
+                    self._resume_at, time.monotonic() + delay
+                )
+        return delay
+
+    def _give_up(self, error):
+        if getattr(error, 'status_code', None) == 429:
+            raise RateLimitExceeded(retry_after(error)) from error
+        raise error
+
+    def _call(self, client, messages, model, stream, params):
+        with span('groq_queue', priority=_priority.get()):
+            self.gate.acquire(_priority.get())
+        try:
+            for attempt in range(self.max_retries + 1):
+                reserved, wait = self._reserve(messages, params)
+                try:
+                    if wait > 0:
+                        with span('groq_throttle', wait_ms=wait * 1000):
+                            time.sleep(wait)
+                    self._count('calls')
+                    response = client.chat.completions.create(
+                        messages=messages, model=model, stream=stream, **params
+                    )
+                except BaseException as e:
+                    self._refund(reserved)
+                    if not isinstance(e, Exception):
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    if attempt == self.max_retries:
+                        self._give_up(e)
+                    self._count('retries')
+                    logger.warning(
+                        'Groq indisponível (%s); nova tentativa em %.1f s.',
+                        type(e).__name__,
+                        delay,
+                    )
+                    time.sleep(delay)
+                    continue
+                self._settle(reserved, response)
+                return response
+        finally:
+            self.gate.release()
+
+    async def _acall(self, client, messages, model, stream, params):
+        with span('groq_queue', priority=_priority.get()):
+            await self.gate.aacquire(_priority.get())
+        try:
+            for attempt in range(self.max_retries + 1):
+                reserved, wait = self._reserve(messages, params)
+                try:
+                    if wait > 0:
+                        with span('groq_throttle', wait_ms=wait * 1000):
+                            await asyncio.sleep(wait)
+                    self._count('calls')
+                    response = await client.chat.completions.create(
+                        messages=messages, model=model, stream=stream, **params
+                    )
+                except BaseException as e:
+                    self._refund(reserved)
+                    if not isinstance(e, Exception):
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    if attempt == self.max_retries:
+                        self._give_up(e)
+                    self._count('retries')
+                    logger.warning(
+                        'Groq indisponível (%s); nova tentativa em %.1f s.',
+                        type(e).__name__,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self._settle(reserved, response)
+                return response
+        finally:
+            self.gate.release()
+
+    def create(self, client, messages, model, stream=False, **params):
+        """
+        Executa chat.completions.create pelo gateway. Chamadas sem stream
+        idênticas a uma em andamento aguardam o resultado dela.
+
+        Args:
+            client: Cliente síncrono do Groq.
+            messages (list[dict]): Mensagens da conversa.
+            model (str): Modelo do Groq.
+            stream (bool): Se True, retorna o stream de chunks.
+            **params: Demais parâmetros de create (max_tokens, temperature).
+
+        Returns:
+            Resposta ou stream retornado pelo Groq.
+        """
+        if stream:
+            return self._call(client, messages, model, stream, params)
+        key = ('sync', request_key(messages, model, stream, params))
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            annotate(groq_coalesced=True)
+            return future.result()
+        try:
+            response = self._call(client, messages, model, stream, params)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def acreate(self, client, messages, model, stream=False, **params):
+        """
+        Versão assíncrona de create. Streams idênticos em andamento também
+        são compartilhados: cada chamador recebe todos os trechos.
+
+        Args:
+            client: Cliente assíncrono do Groq.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), request_key(messages, model, stream, params))
+        while True:
+            with self._lock:
+                shared = self._inflight.get(key)
+                leader = shared is None
+                if leader:
+                    shared = self._inflight[key] = loop.create_future()
+            if leader:
+                break
+            self._count('coalesced')
+            annotate(groq_coalesced=True)
+            try:
+                result = await asyncio.shield(shared)
+            except _LeaderCancelled:
+                # Quem fazia a chamada foi cancelado: um dos aguardantes a
+                # refaz e os demais passam a aguardá-lo.
+                continue
+            return result.consume() if stream else result
+        try:
+            response = await self._acall(
+                client, messages, model, stream, params
+            )
+        except BaseException as e:
+            self._forget(key)
+            if isinstance(e, asyncio.CancelledError):
+                shared.set_exception(_LeaderCancelled())
+            else:
+                shared.set_exception(e)
+            shared.exception()
+            raise
+        if not stream:
+            self._forget(key)
+            shared.set_result(response)
+            return response
+        fanout = StreamFanout(response)
+        fanout.task.add_done_callback(lambda _: self._forget(key))
+        shared.set_result(fanout)
+        return fanout.consume()
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+
+gateway = GroqGateway()
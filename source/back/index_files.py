@@ -0,0 +1,139 @@
+"""
+Persistência versionada dos índices locais.
+Cada gravação escreve os arquivos de dados com o número da versão no nome e,
+por último, publica um manifesto com os nomes desses arquivos. Quem lê parte
+sempre do manifesto, de modo que nunca combina arquivos de versões
+diferentes, mesmo quando outro processo grava o índice ao mesmo tempo.
+"""
+
+import json
+import os
+import re
+import uuid
+
+# Tentativas de leitura quando a versão lida é substituída e removida antes
+# de os arquivos serem abertos.
+READ_ATTEMPTS = 3
+
+
+def new_version():
+    """
+    Gera um identificador único para uma nova versão do índice.
+    """
+    return uuid.uuid4().hex
+
+
+def data_path(directory, base, version, extension):
+    """
+    Caminho de um arquivo de dados de uma versão do índice.
+
+    Args:
+        directory (str): Diretório de persistência.
+        base (str): Prefixo dos arquivos do índice.
+        version (str): Versão dos dados.
+        extension (str): Extensão do arquivo, sem o ponto.
+    """
+    return os.path.join(directory, f'{base}.v{version}.{extension}')
+
+
+def manifest_path(directory, base):
+    """
+    Caminho do manifesto que aponta para a versão publicada do índice.
+    """
+    return os.path.join(directory, f'{base}.manifest.json')
+
+
+def write_atomic(path, write, binary=True):
+    """
+    Grava um arquivo em um temporário e o move para o destino.
+
+    Args:
+        path (str): Caminho final.
+        write (callable): Função que recebe o arquivo aberto e o preenche.
+        binary (bool): Abre o arquivo em modo binário.
+    """
+    tmp_path = f'{path}.tmp'
+    if binary:
+        file = open(tmp_path, 'wb')
+    else:
+        file = open(tmp_path, 'w', encoding='utf-8')
+    with file:
+        write(file)
+    os.replace(tmp_path, path)
+
+
+def publish(directory, base, version, **fields):
+    """
+    Publica uma versão cujos arquivos de dados já foram gravados e remove os
+    arquivos das versões anteriores.
+
+    Args:
+        directory (str): Diretório de persistência.
+        base (str): Prefixo dos arquivos do índice.
+        version (str): Versão publicada.
+        **fields: Campos adicionais do manifesto (por exemplo, a contagem de
+            documentos, conferida na leitura).
+
+    Returns:
+        os.stat_result: Estado do manifesto publicado.
+    """
+    path = manifest_path(directory, base)
+    write_atomic(
+        path,
+        lambda file: json.dump({'version': version, **fields}, file),
+        binary=False,
+    )
+    stale = re.compile(rf'{re.escape(base)}\.v(?!{version}\.)[0-9a-f]+\.')
+    for name in os.listdir(directory):
+        if stale.match(name):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return os.stat(path)
+
+
+def manifest_state(directory, base):
+    """
+    Identifica a publicação atual sem ler o manifesto: cada publicação cria
+    um novo arquivo, com outro inode e outro mtime.
+
+    Returns:
+        tuple: (inode, mtime em ns) do manifesto, ou None se não existir.
+    """
+    try:
+        stat = os.stat(manifest_path(directory, base))
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_published(directory, base, load):
+    """
+    Lê a versão publicada do índice.
+
+    Args:
+        directory (str): Diretório de persistência.
+        base (str): Prefixo dos arquivos do índice.
+        load (callable): Função que recebe o manifesto e carrega os arquivos
+            de dados da versão. Deve levantar ValueError se os dados não
+            corresponderem ao manifesto.
+
+    Returns:
+        tuple: (estado do manifesto, resultado de load), ou None quando não
+        há versão publicada ou ela não pôde ser lida.
+    """
+    for _ in range(READ_ATTEMPTS):
+        state = manifest_state(directory, base)
+        if state is None:
+            return None
+        try:
+            with open(
+                manifest_path(directory, base), encoding='utf-8'
+            ) as file:
+                manifest = json.load(file)
+            return state, load(manifest)
+        except (OSError, ValueError):
+            # A versão foi substituída durante a leitura; tenta a nova.
+            continue
+    return None
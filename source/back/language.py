@@ -0,0 +1,253 @@
+"""
+Detecção do idioma do usuário.
+Mensagens curtas são resolvidas por uma heurística de palavras frequentes e
+n-gramas de caracteres do português e do inglês; as demais usam os perfis
+do langdetect, carregados uma única vez e com semente fixa para que o
+resultado seja determinístico. O idioma de cada sessão fica em cache, e o
+resultado traz uma confiança para que a tradução seja evitada quando o
+idioma é incerto.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from .config import (
+    LANGUAGE_DETECTION_SEED,
+    LANGUAGE_HEURISTIC_CONFIDENCE,
+    LANGUAGE_MIN_CONFIDENCE,
+    SESSION_MAX_SESSIONS,
+)
+from .tracing import annotate
+
+SUPPORTED_LANGUAGES = ('pt', 'en')
+
+# Abaixo desta quantidade de palavras o langdetect não é confiável
+# ('oi' é detectado como finlandês).
+SHORT_TEXT_WORDS = 3
+
+# Pontos da heurística: cada palavra frequente vale STOPWORD_WEIGHT e cada
+# n-grama 1; com menos de MIN_EVIDENCE pontos a confiança é reduzida.
+STOPWORD_WEIGHT = 3
+MIN_EVIDENCE = 3
+
+STOPWORDS = {
+    'pt': frozenset(
+        'o a os as um uma de do da dos das que e é não em no na nos nas '
+        'para pra com por se mais como mas eu você vocês meu minha isso '
+        'esse essa isto qual quais quanto quando onde sim oi olá obrigado '
+        'obrigada tudo bem bom dia tarde noite ele ela são está estou tem '
+        'fale me conte sobre ao aos pelo pela'.split()
+    ),
+    'en': frozenset(
+        'the an of to in on and or is are was were be you your i my '
+        'it this that what which who how when where why do does did can '
+        'could would should will yes no hi hello hey thanks thank please '
+        'tell about with for from have has good morning evening'.split()
+    ),
+}
+
+NGRAMS = {
+    'pt': ('ção', 'ões', 'ão', 'nh', 'lh', 'ç', 'ã', 'õ', 'ê', 'á', 'ú'),
+    'en': ('th', 'wh', 'ing', 'ght', "'s", "n't", 'ck', 'ee', 'oo', 'ly '),
+}
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Pedidos explícitos de troca de idioma.
+_LANGUAGE_SWITCH = re.compile(
+    r'\b(?:em|in) (?P<language>ingl[eê]s|english|portugu[eê]s|portuguese)\b',
+    re.IGNORECASE,
+)
+
+
+class LanguageDetector:
+    """
+    Detector de idioma em dois níveis: heurística para textos curtos ou com
+    sinais claros e langdetect para os demais.
+    """
+
+    def __init__(
+        self,
+        seed=LANGUAGE_DETECTION_SEED,
+        heuristic_confidence=LANGUAGE_HEURISTIC_CONFIDENCE,
+    ):
+        """
+        Inicializa o detector. Os perfis do langdetect são carregados em
+        load().
+
+        Args:
+            seed (int): Semente do langdetect.
+            heuristic_confidence (float): Confiança a partir da qual o
+                resultado da heurística dispensa o langdetect.
+        """
+        self.seed = seed
+        self.heuristic_confidence = heuristic_confidence
+        self._factory = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Carrega os perfis do langdetect, se ainda não foram carregados.
+        """
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    from langdetect.detector_factory import (
+                        PROFILES_DIRECTORY,
+                        DetectorFactory,
+                    )
+
+                    factory = DetectorFactory()
+                    factory.load_profile(PROFILES_DIRECTORY)
+                    factory.set_seed(self.seed)
+                    self._factory = factory
+        return self._factory
+
+    @staticmethod
+    def heuristic(text):
+        """
+        Pontua o texto pelas palavras frequentes e pelos n-gramas de
+        caracteres de cada idioma.
+
+        Returns:
+            tuple[str, float]: Idioma e confiança (pontos do idioma sobre o
+            total, reduzida quando há pouca evidência), ou None se não
+            houver sinal.
+        """
+        text = f'{text.casefold()} '
+        words = _WORD.findall(text)
+        scores = {}
+        for language in SUPPORTED_LANGUAGES:
+            stopwords = STOPWORDS[language]
+            score = STOPWORD_WEIGHT * sum(word in stopwords for word in words)
+            score += sum(text.count(ngram) for ngram in NGRAMS[language])
+            scores[language] = score
+        total = sum(scores.values())
+        if not total:
+            return None
+        language = max(scores, key=scores.get)
+        confidence = scores[language] / total * min(1.0, total / MIN_EVIDENCE)
+        return language, confidence
+
+    def detect(self, text):
+        """
+        Detecta o idioma do texto.
+
+        Args:
+            text (str): Texto a ser analisado.
+
+        Returns:
+            tuple[str, float]: Código do idioma e confiança entre 0 e 1. O
+            idioma é None quando não há sinal suficiente.
+        """
+        heuristic = self.heuristic(text)
+        if heuristic and heuristic[1] >= self.heuristic_confidence:
+            annotate(language_tier='heuristic')
+            return heuristic
+        if len(_WORD.findall(text)) < SHORT_TEXT_WORDS:
+            annotate(language_tier='heuristic')
+            return heuristic or (None, 0.0)
+
+        from langdetect import LangDetectException
+
+        detector = self.load().create()
+        detector.append(text)
+        try:
+            probabilities = detector.get_probabilities()
+        except LangDetectException:
+            probabilities = []
+        annotate(language_tier='langdetect')
+        if not probabilities:
+            return heuristic or (None, 0.0)
+        return probabilities[0].lang, probabilities[0].prob
+
+
+class SessionLanguages:
+    """
+    Idioma de resposta de cada sessão, detectado na primeira mensagem com
+    confiança suficiente e alterado por pedidos explícitos ('em inglês').
+    """
+
+    def __init__(
+        self,
+        detector,
+        min_confidence=LANGUAGE_MIN_CONFIDENCE,
+        max_sessions=SESSION_MAX_SESSIONS,
+    ):
+        """
+        Args:
+            detector (LanguageDetector): Detector de idioma.
+            min_confidence (float): Confiança mínima para adotar o idioma
+                detectado.
+            max_sessions (int): Sessões mantidas em cache (LRU).
+        """
+        self.detector = detector
+        self.min_confidence = min_confidence
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, session_id, result):
+        with self._lock:
+            self._sessions[session_id] = result
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def resolve(self, prompt, session_id):
+        """
+        Determina o idioma de resposta da sessão.
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            session_id (str): Identificador da sessão.
+
+        Returns:
+            tuple[str, float]: Idioma ('pt' ou 'en') e confiança. O idioma é
+            None quando a confiança é baixa; nesse caso a resposta não deve
+            ser traduzida.
+        """
+        switch = _LANGUAGE_SWITCH.search(prompt)
+        if switch:
+            name = switch.group('language').casefold()
+            result = (
+                'en' if name in ('inglês', 'ingles', 'english') else 'pt',
+                1.0,
+            )
+            self._store(session_id, result)
+            return result
+
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None:
+                self._sessions.move_to_end(session_id)
+                return cached
+
+        language, confidence = self.detector.detect(prompt)
+        if language is None or confidence < self.min_confidence:
+            return None, confidence
+        if language not in SUPPORTED_LANGUAGES:
+            language = 'en'
+        result = (language, confidence)
+        self._store(session_id, result)
+        return result
+
+
+def prewarm_language_detector():
+    """
+    Carrega os perfis do langdetect em segundo plano, para que a primeira
+    mensagem não pague esse custo.
+
+    Returns:
+        threading.Thread: Thread do carregamento.
+    """
+    thread = threading.Thread(
+        target=language_detector.load, name='language-prewarm', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+language_detector = LanguageDetector()
+session_languages = SessionLanguages(language_detector)
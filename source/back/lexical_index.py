@@ -0,0 +1,377 @@
+"""
+Índice lexical local com pontuação BM25.
+Complementa a busca vetorial com correspondência exata de termos (nomes de
+produtos, siglas, palavras-chave). As listas de postings ficam em arrays
+NumPy contíguos no formato CSR, e os documentos novos são acumulados até a
+próxima consulta ou persistência, quando os arrays são compactados.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from . import index_files
+from .config import BM25_B, BM25_K1, LEXICAL_INDEX_DIRECTORY, RRF_K
+
+_TOKEN = re.compile(r'\w+')
+
+_lexical_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def tokenize(text):
+    """
+    Divide o texto em termos: minúsculas, sem acentos e apenas palavras.
+
+    Args:
+        text (str): Texto de entrada.
+
+    Returns:
+        list[str]: Termos do texto.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+class LexicalIndex:
+    """
+    Índice invertido com pontuação BM25 e a mesma forma de resultado da
+    consulta do Pinecone ({'matches': [...]}).
+    """
+
+    def __init__(self, index_name, directory=None, k1=BM25_K1, b=BM25_B):
+        """
+        Inicializa o índice, carregando os dados persistidos, se existirem.
+
+        Args:
+            index_name (str): Nome do índice (usado no nome dos arquivos).
+            directory (str): Diretório de persistência. Se None, não persiste.
+            k1 (float): Saturação da frequência do termo.
+            b (float): Peso da normalização pelo tamanho do documento.
+        """
+        self.index_name = index_name
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._ids = []
+        self._metadata = []
+        self._positions = {}
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._terms = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._freqs = np.zeros(0, dtype=np.uint16)
+        self._pending = []
+        self._dirty = False
+        self._loaded_state = None
+        if directory:
+            self.reload_if_changed()
+
+    @property
+    def _base(self):
+        return f'{self.index_name}.bm25'
+
+    def add(self, documents):
+        """
+        Insere ou substitui documentos no índice.
+
+        Args:
+            documents (list[tuple[str, str, dict]]): Tuplas (id, texto,
+                metadados).
+        """
+        if not documents:
+            return
+        with self._lock:
+            lengths = []
+            for doc_id, text, metadata in documents:
+                previous = self._positions.get(doc_id)
+                if previous is not None:
+                    self._alive[previous] = False
+                position = len(self._ids)
+                self._positions[doc_id] = position
+                self._ids.append(doc_id)
+                self._metadata.append(metadata)
+                counts = Counter(tokenize(text))
+                lengths.append(sum(counts.values()))
+                self._pending.append((position, counts))
+            self._dirty = True
+            self._lengths = np.concatenate(
+                [self._lengths, np.asarray(lengths, dtype=np.int32)]
+            )
+            self._alive = np.concatenate(
+                [self._alive, np.ones(len(lengths), dtype=bool)]
+            )
+
+    def delete(self, ids):
+        """
+        Remove documentos do índice. Ids inexistentes são ignorados.
+
+        Args:
+            ids (list[str]): Ids dos documentos a remover.
+        """
+        with self._lock:
+            for doc_id in ids:
+                position = self._positions.pop(doc_id, None)
+                if position is not None:
+                    self._alive[position] = False
+                    self._dirty = True
+
+    def _compact(self):
+        """
+        Incorpora os documentos pendentes às listas de postings, descartando
+        as versões substituídas. Deve ser chamada com o lock adquirido.
+        """
+        if not self._dirty:
+            return
+        term_ids = np.repeat(
+            np.arange(len(self._terms), dtype=np.int64),
+            np.diff(self._offsets),
+        )
+        new_terms, new_docs, new_freqs = [], [], []
+        for position, counts in self._pending:
+            for term, freq in counts.items():
+                term_id = self._terms.setdefault(term, len(self._terms))
+                new_terms.append(term_id)
+                new_docs.append(position)
+                new_freqs.append(min(freq, np.iinfo(np.uint16).max))
+        term_ids = np.concatenate(
+            [term_ids, np.asarray(new_terms, dtype=np.int64)]
+        )
+        docs = np.concatenate(
+            [self._docs, np.asarray(new_docs, dtype=np.int32)]
+        )
+        freqs = np.concatenate(
+            [self._freqs, np.asarray(new_freqs, dtype=np.uint16)]
+        )
+        keep = self._alive[docs]
+        term_ids, docs, freqs = term_ids[keep], docs[keep], freqs[keep]
+        order = np.lexsort((docs, term_ids))
+        self._docs = docs[order]
+        self._freqs = freqs[order]
+        self._offsets = np.zeros(len(self._terms) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(term_ids, minlength=len(self._terms)),
+            out=self._offsets[1:],
+        )
+        self._pending = []
+        self._dirty = False
+
+    def query(self, text, top_k=3, include_metadata=True):
+        """
+        Retorna os top_k documentos de maior pontuação BM25.
+
+        Args:
+            text (str): Texto da consulta.
+            top_k (int): Número de resultados.
+            include_metadata (bool): Inclui os metadados nos resultados.
+
+        Returns:
+            dict: Resultados no formato {'matches': [...]} do Pinecone.
+        """
+        if self.directory:
+            self.reload_if_changed()
+        terms = set(tokenize(text))
+        with self._lock:
+            self._compact()
+            alive = int(self._alive.sum())
+            if not alive or not terms:
+                return {'matches': []}
+            average_length = max(float(self._lengths[self._alive].mean()), 1.0)
+            norms = self.k1 * (
+                1 - self.b + self.b * self._lengths / average_length
+            )
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in terms:
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                start, end = self._offsets[term_id : term_id + 2]
+                docs = self._docs[start:end]
+                freqs = self._freqs[start:end].astype(np.float32)
+                idf = math.log(
+                    1 + (alive - len(docs) + 0.5) / (len(docs) + 0.5)
+                )
+                scores[docs] += (
+                    idf * freqs * (self.k1 + 1) / (freqs + norms[docs])
+                )
+
+            candidates = np.flatnonzero(scores)
+            if not len(candidates):
+                return {'matches': []}
+            k = min(top_k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            matches = []
+            for position in top:
+                match = {
+                    'id': self._ids[position],
+                    'score': float(scores[position]),
+                }
+                if include_metadata:
+                    match['metadata'] = self._metadata[position]
+                matches.append(match)
+        return {'matches': matches}
+
+    def describe_index_stats(self):
+        """
+        Retorna estatísticas básicas do índice.
+        """
+        with self._lock:
+            self._compact()
+            return {
+                'total_document_count': int(self._alive.sum()),
+                'term_count': len(self._terms),
+                'posting_count': len(self._docs),
+            }
+
+    def save(self):
+        """
+        Persiste as listas de postings e os metadados no diretório
+        configurado, como uma nova versão publicada pelo manifesto, e
+        descarta os documentos substituídos.
+        """
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._compact()
+            alive = np.flatnonzero(self._alive)
+            remap = np.full(len(self._ids), -1, dtype=np.int32)
+            remap[alive] = np.arange(len(alive), dtype=np.int32)
+
+            version = index_files.new_version()
+            index_files.write_atomic(
+                index_files.data_path(
+                    self.directory, self._base, version, 'npz'
+                ),
+                lambda file: np.savez(
+                    file,
+                    offsets=self._offsets,
+                    docs=remap[self._docs],
+                    freqs=self._freqs,
+                    lengths=self._lengths[alive],
+                ),
+            )
+            index_files.write_atomic(
+                index_files.data_path(
+                    self.directory, self._base, version, 'json'
+                ),
+                lambda file: json.dump(
+                    {
+                        'terms': list(self._terms),
+                        'ids': [self._ids[i] for i in alive],
+                        'metadata': [self._metadata[i] for i in alive],
+                    },
+                    file,
+                    ensure_ascii=False,
+                ),
+                binary=False,
+            )
+            stat = index_files.publish(
+                self.directory, self._base, version, count=len(alive)
+            )
+            self._loaded_state = (stat.st_ino, stat.st_mtime_ns)
+
+    def _load_version(self, manifest):
+        """
+        Carrega os arquivos da versão indicada pelo manifesto.
+        """
+        version = manifest['version']
+        with open(
+            index_files.data_path(self.directory, self._base, version, 'json'),
+            encoding='utf-8',
+        ) as file:
+            data = json.load(file)
+        with np.load(
+            index_files.data_path(self.directory, self._base, version, 'npz')
+        ) as postings:
+            arrays = {name: postings[name] for name in postings.files}
+        if not len(arrays['lengths']) == len(data['ids']) == manifest['count']:
+            raise ValueError(f'Versão {version} incompleta.')
+        return data, arrays
+
+    def reload_if_changed(self):
+        """
+        Recarrega o índice do disco quando outro processo (por exemplo, o
+        job de ingestão) publicou uma nova versão.
+        """
+        state = index_files.manifest_state(self.directory, self._base)
+        if state is None or state == self._loaded_state:
+            return
+        published = index_files.read_published(
+            self.directory, self._base, self._load_version
+        )
+        if published is None:
+            return
+        state, (data, arrays) = published
+        with self._lock:
+            self._terms = {term: i for i, term in enumerate(data['terms'])}
+            self._ids = data['ids']
+            self._metadata = data['metadata']
+            self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            self._offsets = arrays['offsets']
+            self._docs = arrays['docs']
+            self._freqs = arrays['freqs']
+            self._lengths = arrays['lengths']
+            self._alive = np.ones(len(self._ids), dtype=bool)
+            self._pending = []
+            self._dirty = False
+            self._loaded_state = state
+
+
+def get_lexical_index(index_name, directory=LEXICAL_INDEX_DIRECTORY):
+    """
+    Obtém o índice lexical do processo para o índice informado.
+
+    Args:
+        index_name (str): Nome do índice.
+        directory (str): Diretório de persistência. Vazio mantém o índice
+            apenas em memória.
+
+    Returns:
+        LexicalIndex: Índice compartilhado pelo processo.
+    """
+    with _registry_lock:
+        index = _lexical_indexes.get(index_name)
+        if index is None:
+            index = LexicalIndex(index_name, directory or None)
+            _lexical_indexes[index_name] = index
+    return index
+
+
+def reciprocal_rank_fusion(results, top_k, k=RRF_K):
+    """
+    Combina listas de resultados pela fusão de ranking recíproco (RRF):
+    cada documento soma 1 / (k + posição) em cada lista em que aparece.
+
+    Args:
+        results (list[dict]): Resultados no formato {'matches': [...]}.
+        top_k (int): Número de resultados combinados.
+        k (int): Constante de suavização das posições.
+
+    Returns:
+        dict: Resultados combinados, com a pontuação RRF em 'score'.
+    """
+    scores = {}
+    matches = {}
+    for result in results:
+        for rank, match in enumerate(result.get('matches', [])):
+            scores[match['id']] = scores.get(match['id'], 0.0) + 1 / (
+                k + rank + 1
+            )
+            matches.setdefault(match['id'], match)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return {
+        'matches': [
+            {**matches[doc_id], 'score': scores[doc_id]} for doc_id in ranked
+        ]
+    }
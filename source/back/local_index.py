@@ -0,0 +1,248 @@
+# source/back/local_index.py
+"""
+Índice vetorial local em memória, baseado em NumPy.
+Expõe a mesma interface usada do índice Pinecone (upsert/query) e persiste
+os vetores em um arquivo mapeado em memória.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from . import index_files
+
+
+class LocalVectorIndex:
+    """
+    Índice vetorial em processo com busca por similaridade de cosseno.
+    Os vetores são normalizados na inserção, de modo que cada consulta é um
+    único produto matriz-vetor seguido de argpartition.
+    """
+
+    def __init__(self, index_name, dimension=1536, directory=None):
+        """
+        Inicializa o índice, carregando os dados persistidos, se existirem.
+
+        Args:
+            index_name (str): Nome do índice (usado no nome dos arquivos).
+            dimension (int): Dimensão dos vetores.
+            directory (str): Diretório de persistência. Se None, não persiste.
+        """
+        self.index_name = index_name
+        self.dimension = dimension
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._metadata = []
+        self._positions = {}
+        self._loaded_state = None
+        if directory:
+            self.reload_if_changed()
+
+    def _reserve(self, extra):
+        """
+        Garante capacidade para mais `extra` linhas, dobrando a matriz.
+        """
+        needed = self._size + extra
+        if needed <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 64)
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        self._matrix = matrix
+
+    @staticmethod
+    def _normalize(values):
+        norms = np.linalg.norm(values, axis=-1, keepdims=True)
+        return np.divide(
+            values, norms, out=np.zeros_like(values), where=norms > 0
+        )
+
+    def upsert(self, vectors):
+        """
+        Insere ou atualiza vetores no índice.
+
+        Args:
+            vectors (list): Vetores como dicts ('id', 'values', 'metadata')
+                ou tuplas (id, values, metadata).
+        """
+        records = [
+            (v['id'], v['values'], v.get('metadata', {}))
+            if isinstance(v, dict)
+            else (v[0], v[1], v[2] if len(v) > 2 else {})
+            for v in vectors
+        ]
+        if not records:
+            return {'upserted_count': 0}
+        values = self._normalize(
+            np.asarray([r[1] for r in records], dtype=np.float32)
+        )
+
+        with self._lock:
+            self._reserve(len(records))
+            for (vector_id, _, metadata), row in zip(records, values):
+                position = self._positions.get(vector_id)
+                if position is None:
+                    position = self._size
+                    self._positions[vector_id] = position
+                    self._ids.append(vector_id)
+                    self._metadata.append(metadata)
+                    self._size += 1
+                else:
+                    self._metadata[position] = metadata
+                self._matrix[position] = row
+        return {'upserted_count': len(records)}
+
+    def delete(self, ids, **kwargs):
+        """
+        Remove vetores do índice. Ids inexistentes são ignorados.
+
+        Args:
+            ids (list[str]): Ids dos vetores a remover.
+        """
+        with self._lock:
+            self._reserve(0)
+            for vector_id in ids:
+                position = self._positions.pop(vector_id, None)
+                if position is None:
+                    continue
+                # Move a última linha para a posição liberada.
+                self._size -= 1
+                last_id = self._ids.pop()
+                last_metadata = self._metadata.pop()
+                if position < self._size:
+                    self._matrix[position] = self._matrix[self._size]
+                    self._ids[position] = last_id
+                    self._metadata[position] = last_metadata
+                    self._positions[last_id] = position
+        return {}
+
+    def query(
+        self, vector, top_k=3, include_metadata=False, include_values=False
+    ):
+        """
+        Retorna os top_k vetores mais similares por cosseno.
+
+        Args:
+            vector (list[float]): Vetor de consulta.
+            top_k (int): Número de resultados.
+            include_metadata (bool): Inclui os metadados nos resultados.
+            include_values (bool): Inclui os valores dos vetores nos resultados.
+
+        Returns:
+            dict: Resultados no formato {'matches': [...]} do Pinecone.
+        """
+        if self.directory:
+            self.reload_if_changed()
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+
+        with self._lock:
+            matrix = self._matrix[: self._size]
+            if not self._size:
+                return {'matches': []}
+            scores = matrix @ query
+            k = min(top_k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for position in top:
+                match = {
+                    'id': self._ids[position],
+                    'score': float(scores[position]),
+                }
+                if include_metadata:
+                    match['metadata'] = self._metadata[position]
+                if include_values:
+                    match['values'] = matrix[position].tolist()
+                matches.append(match)
+        return {'matches': matches}
+
+    def describe_index_stats(self):
+        """
+        Retorna estatísticas básicas do índice.
+        """
+        return {'dimension': self.dimension, 'total_vector_count': self._size}
+
+    def save(self):
+        """
+        Persiste vetores e metadados no diretório configurado, como uma nova
+        versão publicada pelo manifesto.
+        """
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            version = index_files.new_version()
+            index_files.write_atomic(
+                index_files.data_path(
+                    self.directory, self.index_name, version, 'npy'
+                ),
+                lambda file: np.save(file, self._matrix[: self._size]),
+            )
+            index_files.write_atomic(
+                index_files.data_path(
+                    self.directory, self.index_name, version, 'json'
+                ),
+                lambda file: json.dump(
+                    {'ids': self._ids, 'metadata': self._metadata},
+                    file,
+                    ensure_ascii=False,
+                ),
+                binary=False,
+            )
+            stat = index_files.publish(
+                self.directory, self.index_name, version, count=self._size
+            )
+            self._loaded_state = (stat.st_ino, stat.st_mtime_ns)
+
+    def _load_version(self, manifest):
+        """
+        Carrega os arquivos da versão indicada pelo manifesto. Os vetores são
+        abertos como memmap somente leitura.
+        """
+        version = manifest['version']
+        with open(
+            index_files.data_path(
+                self.directory, self.index_name, version, 'json'
+            ),
+            encoding='utf-8',
+        ) as file:
+            data = json.load(file)
+        matrix = np.load(
+            index_files.data_path(
+                self.directory, self.index_name, version, 'npy'
+            ),
+            mmap_mode='r',
+        )
+        if not matrix.shape[0] == len(data['ids']) == manifest['count']:
+            raise ValueError(f'Versão {version} incompleta.')
+        return matrix, data
+
+    def reload_if_changed(self):
+        """
+        Recarrega o índice do disco quando outro processo (por exemplo, o
+        job de ingestão) publicou uma nova versão.
+        """
+        state = index_files.manifest_state(self.directory, self.index_name)
+        if state is None or state == self._loaded_state:
+            return
+        published = index_files.read_published(
+            self.directory, self.index_name, self._load_version
+        )
+        if published is None:
+            return
+        state, (matrix, data) = published
+        with self._lock:
+            self._matrix = matrix
+            self._size = matrix.shape[0]
+            self._ids = data['ids']
+            self._metadata = data['metadata']
+            self._positions = {
+                vector_id: i for i, vector_id in enumerate(self._ids)
+            }
+            self._loaded_state = state
@@ -3,11 +3,72 @@ Módulo principal do backend.
 Gerencia o fluxo de execução do chatbot.
 """
 
+import uuid
+
 import streamlit as st
-from deep_translator import GoogleTranslator
-from langdetect import detect
 
-from .agent.tool_graph import configure_tool_graph
+from .agent.tool_graph import configure_tool_graph, prewarm_tool_graph
+from .config import (
+    LANGUAGE_PREWARM,
+    TOOL_GRAPH_PREWARM,
+    TRANSLATION_MODE,
+    VECTOR_PREWARM,
+)
+from .groq_gateway import RateLimitExceeded
+from .language import prewarm_language_detector, session_languages
+from .tracing import Trace, span, use_trace
+from .translation import translator
+from .vector_store import prewarm_vector_index
+
+if VECTOR_PREWARM:
+    prewarm_vector_index()
+if TOOL_GRAPH_PREWARM:
+    prewarm_tool_graph()
+if LANGUAGE_PREWARM:
+    prewarm_language_detector()
+
+RATE_LIMITED_MESSAGE = (
+    'Muitas mensagens ao mesmo tempo. Aguarde alguns segundos e tente '
+    'novamente.'
+)
+
+
+def resolve_language(prompt):
+    """
+    Determina o idioma de resposta do usuário.
+    O idioma é detectado na primeira mensagem com confiança suficiente,
+    guardado por sessão e alterado por pedidos explícitos de troca.
+
+    Args:
+        prompt (str): Texto da mensagem fornecida pelo usuário.
+
+    Returns:
+        str: Código do idioma de resposta ('pt' ou 'en'), ou None se o
+        idioma for incerto e a resposta não deve ser traduzida.
+    """
+    with span('language_detection') as stage:
+        language, confidence = session_languages.resolve(
+            prompt, get_session_id()
+        )
+        stage.set(language=language, confidence=round(confidence, 3))
+    return language
+
+
+def translate(text, language):
+    """
+    Traduz a resposta para o idioma do usuário, registrando a etapa no trace.
+    """
+    with span('translation', bytes=len(text.encode('utf-8'))):
+        return translator.translate(text, language)
+
+
+def get_session_id():
+    """
+    Retorna o identificador da sessão do Streamlit, criando-o se necessário.
+    """
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    return st.session_state['session_id']
 
 
 def generate_response(prompt):
@@ -21,31 +82,79 @@ def generate_response(prompt):
     Returns:
         str: Resposta traduzida e ajustada de acordo com o idioma preferido do usuário.
     """
+    session_id = get_session_id()
+    trace = Trace(session_id=session_id)
     try:
-        if 'user_language' not in st.session_state:
-            detected = detect(prompt)
-            st.session_state['user_language'] = (
-                detected if detected in ['pt', 'en'] else 'en'
+        with use_trace(trace):
+            detected_language = resolve_language(prompt)
+
+            response = configure_tool_graph(
+                prompt,
+                language=detected_language,
+                session_id=session_id,
+                trace=trace,
             )
 
-        detected_language = st.session_state['user_language']
+            if detected_language not in (None, 'en'):
+                response = translate(response, detected_language)
 
-        if 'em inglês' in prompt.lower():
-            detected_language = 'en'
-            st.session_state['user_language'] = 'en'
-        elif 'em português' in prompt.lower():
-            detected_language = 'pt'
-            st.session_state['user_language'] = 'pt'
+        return response
 
-        response = configure_tool_graph(prompt)
+    except RateLimitExceeded as e:
+        trace.set(error=type(e).__name__)
+        return RATE_LIMITED_MESSAGE
+    except Exception as e:
+        trace.set(error=type(e).__name__)
+        st.error(f'Ocorreu um erro ao gerar a resposta: {e}')
+        return 'Desculpe, algo deu errado ao processar sua mensagem.'
+    finally:
+        trace.finish()
 
-        if detected_language != 'en':
-            response = GoogleTranslator(
-                source='auto', target=detected_language
-            ).translate(response)
 
-        return response
+def generate_response_stream(prompt):
+    """
+    Gera a resposta como um stream de trechos de texto.
+    No modo de tradução 'prompt', o Groq já responde no idioma do usuário e
+    os trechos são repassados diretamente; caso contrário, o texto completo
+    é traduzido e emitido de uma vez.
+
+    Args:
+        prompt (str): Texto da mensagem fornecida pelo usuário.
+
+    Yields:
+        str: Trechos da resposta no idioma preferido do usuário.
+    """
+    session_id = get_session_id()
+    trace = Trace(session_id=session_id)
+    try:
+        with use_trace(trace):
+            detected_language = resolve_language(prompt)
 
+            deltas = configure_tool_graph(
+                prompt,
+                stream=True,
+                language=detected_language,
+                session_id=session_id,
+                trace=trace,
+            )
+
+        if (
+            detected_language not in (None, 'en')
+            and TRANSLATION_MODE != 'prompt'
+        ):
+            text = ''.join(deltas)
+            with use_trace(trace):
+                text = translate(text, detected_language)
+            yield text
+        else:
+            yield from deltas
+
+    except RateLimitExceeded as e:
+        trace.set(error=type(e).__name__)
+        yield RATE_LIMITED_MESSAGE
     except Exception as e:
+        trace.set(error=type(e).__name__)
         st.error(f'Ocorreu um erro ao gerar a resposta: {e}')
-        return 'Desculpe, algo deu errado ao processar sua mensagem.'
+        yield 'Desculpe, algo deu errado ao processar sua mensagem.'
+    finally:
+        trace.finish()
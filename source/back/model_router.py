@@ -0,0 +1,241 @@
+"""
+Roteamento de modelos do Groq por ponto de chamada.
+Cada rota (classificação de intenção, conversa geral e resposta do RAG) tem
+seu modelo, limites de resposta e, opcionalmente, um limiar de tamanho do
+prompt a partir do qual a chamada é escalada para o modelo grande. O
+roteador também acumula latência e tokens por rota.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+from . import config
+from .config import (
+    FAST_MODEL_ID,
+    LARGE_MODEL_ID,
+    ROUTE_GENERAL_ESCALATION_TOKENS,
+    ROUTE_GENERAL_MAX_TOKENS,
+    ROUTE_GENERAL_MODEL,
+    ROUTE_GENERAL_TEMPERATURE,
+    ROUTE_INTENT_MAX_TOKENS,
+    ROUTE_INTENT_MODEL,
+    ROUTE_INTENT_TEMPERATURE,
+    ROUTE_RAG_ESCALATION_TOKENS,
+    ROUTE_RAG_MAX_TOKENS,
+    ROUTE_RAG_MODEL,
+    ROUTE_RAG_TEMPERATURE,
+)
+from .tokens import context_window, estimate_tokens
+
+# Amostras de latência mantidas por rota para os percentis.
+METRIC_SAMPLES = 1000
+
+
+def resolve_model(name):
+    """
+    Converte os apelidos 'fast' e 'large' no identificador do modelo.
+    Apelidos sem modelo configurado usam MODEL_ID.
+    """
+    if name == 'fast':
+        return FAST_MODEL_ID or config.MODEL_ID
+    if name == 'large':
+        return LARGE_MODEL_ID or config.MODEL_ID
+    return name or config.MODEL_ID
+
+
+class Route:
+    """
+    Configuração de uma rota de chamadas ao Groq.
+    """
+
+    def __init__(
+        self,
+        name,
+        model='fast',
+        max_tokens=None,
+        temperature=None,
+        escalation_tokens=0,
+        escalation_model='large',
+    ):
+        """
+        Args:
+            name (str): Nome da rota.
+            model (str): Modelo da rota ('fast', 'large' ou um identificador).
+            max_tokens (int): Tokens máximos da resposta.
+            temperature (float): Temperatura da amostragem.
+            escalation_tokens (int): Tokens do prompt a partir dos quais a
+                chamada usa escalation_model. 0 desativa a escalada.
+            escalation_model (str): Modelo usado na escalada.
+        """
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.escalation_tokens = escalation_tokens
+        self.escalation_model = escalation_model
+
+    def params(self):
+        """
+        Retorna os parâmetros de create definidos pela rota.
+        """
+        params = {}
+        if self.max_tokens:
+            params['max_tokens'] = self.max_tokens
+        if self.temperature is not None:
+            params['temperature'] = self.temperature
+        return params
+
+    def models(self):
+        """
+        Retorna os modelos que a rota pode usar.
+        """
+        models = [resolve_model(self.model)]
+        if self.escalation_tokens:
+            models.append(resolve_model(self.escalation_model))
+        return models
+
+
+class RouteMetrics:
+    """
+    Latência e tokens acumulados de uma rota.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.escalated = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.models = {}
+        self.latency_ms = deque(maxlen=METRIC_SAMPLES)
+        self.first_token_ms = deque(maxlen=METRIC_SAMPLES)
+
+    def to_dict(self):
+        summary = {
+            'calls': self.calls,
+            'escalated': self.escalated,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'models': dict(self.models),
+        }
+        for name in ('latency_ms', 'first_token_ms'):
+            samples = getattr(self, name)
+            if samples:
+                p50, p95 = np.percentile(
+                    np.asarray(samples, dtype=np.float64), [50, 95]
+                )
+                summary[name] = {'p50': float(p50), 'p95': float(p95)}
+        return summary
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo e os parâmetros de cada chamada ao Groq.
+    """
+
+    def __init__(self, routes):
+        """
+        Args:
+            routes (list[Route]): Rotas disponíveis.
+        """
+        self.routes = {route.name: route for route in routes}
+        self._metrics = {route.name: RouteMetrics() for route in routes}
+        self._lock = threading.Lock()
+
+    def select(self, route_name, prompt):
+        """
+        Seleciona o modelo e os parâmetros para um prompt.
+
+        Args:
+            route_name (str): Nome da rota ('intent', 'general' ou 'rag').
+            prompt (str): Prompt enviado ao modelo.
+
+        Returns:
+            tuple[str, dict, bool]: Modelo, parâmetros de create e se a
+            chamada foi escalada.
+        """
+        route = self.routes[route_name]
+        escalated = bool(
+            route.escalation_tokens
+            and estimate_tokens(prompt) >= route.escalation_tokens
+        )
+        model = resolve_model(
+            route.escalation_model if escalated else route.model
+        )
+        return model, route.params(), escalated
+
+    def context_window(self, route_name):
+        """
+        Retorna a menor janela de contexto entre os modelos da rota.
+        """
+        return min(
+            context_window(model) for model in self.routes[route_name].models()
+        )
+
+    def record(
+        self,
+        route_name,
+        model,
+        escalated,
+        latency_ms,
+        prompt_tokens=0,
+        completion_tokens=0,
+        first_token_ms=None,
+    ):
+        """
+        Registra uma chamada concluída da rota.
+        """
+        with self._lock:
+            metrics = self._metrics[route_name]
+            metrics.calls += 1
+            metrics.escalated += int(escalated)
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            metrics.models[model] = metrics.models.get(model, 0) + 1
+            metrics.latency_ms.append(latency_ms)
+            if first_token_ms is not None:
+                metrics.first_token_ms.append(first_token_ms)
+
+    def metrics(self):
+        """
+        Retorna as métricas de cada rota.
+        """
+        with self._lock:
+            return {
+                name: metrics.to_dict()
+                for name, metrics in self._metrics.items()
+            }
+
+    def reset_metrics(self):
+        """
+        Descarta as métricas acumuladas.
+        """
+        with self._lock:
+            self._metrics = {name: RouteMetrics() for name in self.routes}
+
+
+router = ModelRouter(
+    [
+        Route(
+            'intent',
+            model=ROUTE_INTENT_MODEL,
+            max_tokens=ROUTE_INTENT_MAX_TOKENS,
+            temperature=ROUTE_INTENT_TEMPERATURE,
+        ),
+        Route(
+            'general',
+            model=ROUTE_GENERAL_MODEL,
+            max_tokens=ROUTE_GENERAL_MAX_TOKENS,
+            temperature=ROUTE_GENERAL_TEMPERATURE,
+            escalation_tokens=ROUTE_GENERAL_ESCALATION_TOKENS,
+        ),
+        Route(
+            'rag',
+            model=ROUTE_RAG_MODEL,
+            max_tokens=ROUTE_RAG_MAX_TOKENS,
+            temperature=ROUTE_RAG_TEMPERATURE,
+            escalation_tokens=ROUTE_RAG_ESCALATION_TOKENS,
+        ),
+    ]
+)
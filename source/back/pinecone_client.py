@@ -2,25 +2,187 @@
 """
 Cliente Pinecone para operações de indexação e busca vetorial.
 Configura o cliente e os índices necessários.
+
+Os índices são resolvidos uma única vez por processo pelo IndexRegistry, que
+reutiliza o pool de conexões de cada índice e verifica sua saúde em segundo
+plano, fora do caminho das consultas.
 """
 
-from pinecone import Pinecone, ServerlessSpec
+import logging
+import threading
+import time
+
+from . import config
+from .async_utils import AsyncIndex
+
+logger = logging.getLogger(__name__)
+
+_pc = None
+_index_factory = None
+
+
+def get_pinecone():
+    """
+    Retorna o cliente do Pinecone, criando-o (e importando o pacote) no
+    primeiro uso.
+    """
+    global _pc
+    if _pc is None:
+        from pinecone import Pinecone
+
+        _pc = Pinecone(
+            api_key=config.PINECONE_API_KEY,
+            pool_threads=config.PINECONE_POOL_THREADS,
+        )
+        _pc.openapi_config.connection_pool_maxsize = config.PINECONE_POOL_SIZE
+    return _pc
+
+
+def set_index_factory(factory=None):
+    """
+    Substitui a criação de índices, por exemplo por dublês no benchmark.
+    Chamar sem argumentos restaura o Pinecone.
+
+    Args:
+        factory (callable): Função factory(index_name, dimension) que
+            retorna um índice com os métodos upsert e query.
+    """
+    global _index_factory
+    _index_factory = factory
+
+
+class IndexRegistry:
+    """
+    Registro dos índices do Pinecone usados pelo processo.
+    Cada índice é resolvido (e criado, se necessário) na primeira utilização;
+    as chamadas seguintes reutilizam o mesmo handle e seu pool de conexões.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        pool_threads=config.PINECONE_POOL_THREADS,
+        health_interval=config.PINECONE_HEALTH_INTERVAL,
+    ):
+        """
+        Inicializa o registro.
+
+        Args:
+            client (Pinecone): Cliente do plano de controle. Se None, usa
+                get_pinecone() na primeira resolução.
+            pool_threads (int): Threads de cada índice para requisições
+                assíncronas.
+            health_interval (int): Segundos entre verificações de saúde.
+                0 desativa a verificação.
+        """
+        self.client = client
+        self.pool_threads = pool_threads
+        self.health_interval = health_interval
+        self._indexes = {}
+        self._health = {}
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    def _resolve(self, index_name, dimension):
+        from pinecone import ServerlessSpec
+
+        client = self.client or get_pinecone()
+        if index_name not in client.list_indexes().names():
+            client.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric='cosine',
+                spec=ServerlessSpec(
+                    cloud='aws', region=config.PINECONE_ENVIRONMENT
+                ),
+            )
+        return client.Index(index_name, pool_threads=self.pool_threads)
+
+    def get(self, index_name, dimension=1536):
+        """
+        Obtém o índice, resolvendo-o apenas na primeira chamada.
+
+        Args:
+            index_name (str): Nome do índice.
+            dimension (int): Dimensão usada se o índice precisar ser criado.
+
+        Returns:
+            Index: Handle do índice.
+        """
+        index = self._indexes.get(index_name)
+        if index is not None:
+            return index
+        with self._lock:
+            index = self._indexes.get(index_name)
+            if index is None:
+                index = self._resolve(index_name, dimension)
+                self._indexes[index_name] = index
+            self._start_health_checks()
+        return index
+
+    def _start_health_checks(self):
+        if self.health_interval <= 0 or self._health_thread is not None:
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name='pinecone-health', daemon=True
+        )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            self.check_health()
 
-from .config import PINECONE_API_KEY, PINECONE_ENVIRONMENT
+    def check_health(self):
+        """
+        Consulta as estatísticas de cada índice registrado. Índices com falha
+        são descartados e resolvidos novamente no próximo uso.
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
+        Returns:
+            dict: Estado de cada índice.
+        """
+        with self._lock:
+            indexes = list(self._indexes.items())
+        for index_name, index in indexes:
+            started = time.perf_counter()
+            try:
+                index.describe_index_stats()
+                status = {'healthy': True}
+            except Exception as e:
+                logger.warning('Índice %s indisponível: %s', index_name, e)
+                status = {'healthy': False, 'error': str(e)}
+                with self._lock:
+                    if self._indexes.get(index_name) is index:
+                        del self._indexes[index_name]
+            status['latency_ms'] = (time.perf_counter() - started) * 1000
+            status['checked_at'] = time.time()
+            self._health[index_name] = status
+        return self.health()
+
+    def health(self):
+        """
+        Retorna o resultado da última verificação de cada índice.
+        """
+        return dict(self._health)
+
+
+registry = IndexRegistry()
 
 
 def get_index(index_name, dimension=1536):
     """
     Obtém ou cria um índice no Pinecone.
-    Verifica se o índice existe; caso contrário, cria com as especificações fornecidas.
-    """
-    if index_name not in pc.list_indexes().names():
-        pc.create_index(
-            name=index_name,
-            dimension=dimension,
-            metric='cosine',
-            spec=ServerlessSpec(cloud='aws', region=PINECONE_ENVIRONMENT),
-        )
-    return pc.Index(index_name)
+    O índice é resolvido uma vez por processo e reutilizado pelo registro.
+    """
+    if _index_factory is not None:
+        return _index_factory(index_name, dimension)
+    return registry.get(index_name, dimension)
+
+
+def get_async_index(index_name, dimension=1536):
+    """
+    Obtém o índice com uma interface assíncrona.
+    O cliente Pinecone não possui API asyncio nesta versão, portanto as
+    operações de dados são executadas em threads.
+    """
+    return AsyncIndex(get_index(index_name, dimension))
@@ -0,0 +1,161 @@
+"""
+Perfil do tempo de inicialização do backend.
+Importa o módulo informado em processos novos com `python -X importtime` e
+resume o tempo de importação por módulo, para acompanhar o custo de cold
+start entre commits.
+
+Uso:
+    python -m back.startup_profile --module back.main --top 20
+    python -m back.startup_profile --budget 800 --json startup.json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_import_times(stderr):
+    """
+    Interpreta a saída de `python -X importtime`.
+
+    Args:
+        stderr (str): Saída de erro do processo.
+
+    Returns:
+        dict: Para cada módulo, o tempo próprio e o acumulado em
+        milissegundos.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = {
+                'self_ms': int(match.group(1)) / 1000,
+                'cumulative_ms': int(match.group(2)) / 1000,
+            }
+    return modules
+
+
+def profile_once(module):
+    """
+    Importa o módulo em um processo novo.
+
+    Returns:
+        tuple[float, dict]: Tempo total do processo em milissegundos e os
+        tempos de importação por módulo.
+    """
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    return wall_ms, parse_import_times(process.stderr)
+
+
+def profile_startup(module='back.main', runs=5):
+    """
+    Mede o tempo de importação do módulo em várias execuções.
+
+    Args:
+        module (str): Módulo importado na inicialização.
+        runs (int): Quantidade de processos medidos.
+
+    Returns:
+        dict: Mediana do tempo de processo e do tempo de importação do
+        módulo, e os tempos por módulo da execução mediana.
+    """
+    baseline = statistics.median(profile_once('sys')[0] for _ in range(runs))
+    samples = sorted(
+        (profile_once(module) for _ in range(runs)),
+        key=lambda sample: sample[1][module]['cumulative_ms'],
+    )
+    wall_ms, modules = samples[len(samples) // 2]
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms': modules[module]['cumulative_ms'],
+        'process_ms': wall_ms,
+        'interpreter_ms': baseline,
+        'packages': by_package(modules),
+        'modules': modules,
+    }
+
+
+def by_package(modules):
+    """
+    Soma o tempo próprio de importação por pacote de nível superior.
+    """
+    packages = {}
+    for name, times in modules.items():
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + times['self_ms']
+    return dict(
+        sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    )
+
+
+def top_modules(modules, top=20):
+    """
+    Retorna os módulos de maior tempo próprio de importação.
+    """
+    return sorted(
+        modules.items(), key=lambda item: item[1]['self_ms'], reverse=True
+    )[:top]
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    """
+    parser = argparse.ArgumentParser(
+        description='Mede o tempo de importação do backend.'
+    )
+    parser.add_argument('--module', default='back.main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', help='Arquivo para salvar o relatório.')
+    parser.add_argument(
+        '--budget',
+        type=float,
+        help='Tempo máximo de importação, em ms; excedê-lo encerra com erro.',
+    )
+    args = parser.parse_args(argv)
+
+    report = profile_startup(args.module, args.runs)
+    print(
+        f'{args.module}: importação {report["import_ms"]:.1f} ms, '
+        f'processo {report["process_ms"]:.1f} ms '
+        f'(interpretador {report["interpreter_ms"]:.1f} ms, '
+        f'mediana de {args.runs})'
+    )
+    print(f'{"total (ms)":>13}  pacote')
+    for package, self_ms in list(report['packages'].items())[: args.top]:
+        print(f'{self_ms:13.1f}  {package}')
+    print(f'{"próprio (ms)":>13} {"acumulado (ms)":>15}  módulo')
+    for name, times in top_modules(report['modules'], args.top):
+        print(
+            f'{times["self_ms"]:13.1f} {times["cumulative_ms"]:15.1f}  {name}'
+        )
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.budget is not None and report['import_ms'] > args.budget:
+        print(
+            f'Orçamento excedido: {report["import_ms"]:.1f} ms > '
+            f'{args.budget:.1f} ms'
+        )
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
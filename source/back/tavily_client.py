@@ -4,10 +4,20 @@ Cliente Tavily para geração de embeddings e busca de contexto.
 Configura o cliente utilizando a chave de API.
 """
 
-from back.config import TAVILY_API_KEY
-from tavily import TavilyClient
+from back import config
 
 _tavily_client = None
+_async_tavily_client = None
+
+
+def set_tavily_client(client=None, async_client=None):
+    """
+    Substitui os clientes do Tavily, por exemplo por dublês no benchmark.
+    Chamar sem argumentos restaura os clientes padrão no próximo uso.
+    """
+    global _tavily_client, _async_tavily_client
+    _tavily_client = client
+    _async_tavily_client = async_client
 
 
 def get_tavily_client():
@@ -17,5 +27,19 @@ def get_tavily_client():
     """
     global _tavily_client
     if _tavily_client is None:
-        _tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
+        from tavily import TavilyClient
+
+        _tavily_client = TavilyClient(api_key=config.TAVILY_API_KEY)
     return _tavily_client
+
+
+def get_async_tavily_client():
+    """
+    Obtém uma instância única do cliente assíncrono do Tavily.
+    """
+    global _async_tavily_client
+    if _async_tavily_client is None:
+        from tavily import AsyncTavilyClient
+
+        _async_tavily_client = AsyncTavilyClient(api_key=config.TAVILY_API_KEY)
+    return _async_tavily_client
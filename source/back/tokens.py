@@ -0,0 +1,59 @@
+# source/back/tokens.py
+"""
+Estimativa de tokens.
+O tokenizador dos modelos do Groq não está disponível localmente; usamos uma
+aproximação baseada em caracteres e palavras. Ela não é um limite superior:
+textos em português geram mais tokens por caractere e podem passar da
+estimativa, então quem a usa para encaixar texto na janela do modelo deve
+deixar uma folga (ver RAG_TOKEN_ESTIMATE_MARGIN).
+"""
+
+import math
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """
+    Estima a quantidade de tokens de um texto.
+
+    Args:
+        text (str): Texto de entrada.
+
+    Returns:
+        int: Quantidade aproximada de tokens; o valor real pode ser maior.
+    """
+    if not text:
+        return 0
+    return max(len(text.split()), math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+# Janela de contexto, em tokens, dos modelos do Groq. Tabela mantida à mão:
+# modelos novos caem em DEFAULT_CONTEXT_WINDOW até serem incluídos.
+MODEL_CONTEXT_WINDOWS = {
+    'llama3-groq-8b-8192-tool-use-preview': 8192,
+    'llama3-groq-70b-8192-tool-use-preview': 8192,
+    'llama3-8b-8192': 8192,
+    'llama3-70b-8192': 8192,
+    'llama-3.1-8b-instant': 131072,
+    'llama-3.1-70b-versatile': 131072,
+    'llama-3.2-1b-preview': 8192,
+    'llama-3.2-3b-preview': 8192,
+    'mixtral-8x7b-32768': 32768,
+    'gemma2-9b-it': 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def context_window(model_id):
+    """
+    Retorna a janela de contexto do modelo, em tokens.
+
+    Args:
+        model_id (str): Identificador do modelo no Groq.
+
+    Returns:
+        int: Tamanho da janela; DEFAULT_CONTEXT_WINDOW se o modelo não for
+        conhecido.
+    """
+    return MODEL_CONTEXT_WINDOWS.get(model_id, DEFAULT_CONTEXT_WINDOW)
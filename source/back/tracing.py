@@ -0,0 +1,305 @@
+# source/back/tracing.py
+"""
+Rastreamento estruturado por requisição.
+Cada turno do chatbot gera um Trace com spans por etapa (duração, bytes e
+tokens). Os traces são exportados em JSON lines e agregados em métricas no
+formato texto do Prometheus.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .config import TRACE_LOG_PATH, TRACE_METRICS_PATH
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Span:
+    """
+    Etapa cronometrada de um trace.
+    """
+
+    __slots__ = ('name', 'started', 'duration_ms', 'attributes')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        """
+        Adiciona atributos ao span (por exemplo, bytes e tokens).
+        """
+        self.attributes.update(attributes)
+
+    def elapsed_ms(self):
+        """
+        Retorna o tempo decorrido desde o início do span.
+        """
+        return (time.perf_counter() - self.started) * 1000
+
+    def end(self):
+        """
+        Finaliza o span, registrando sua duração.
+        """
+        if self.duration_ms is None:
+            self.duration_ms = self.elapsed_ms()
+
+    def to_dict(self, trace_started):
+        return {
+            'name': self.name,
+            'offset_ms': (self.started - trace_started) * 1000,
+            'duration_ms': self.duration_ms,
+            **self.attributes,
+        }
+
+
+class Trace:
+    """
+    Conjunto de spans de um turno do chatbot.
+    """
+
+    def __init__(self, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = attributes
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name, **attributes):
+        """
+        Cria e registra um novo span no trace.
+        """
+        span = Span(name, **attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def set(self, **attributes):
+        """
+        Adiciona atributos ao trace.
+        """
+        self.attributes.update(attributes)
+
+    def finish(self):
+        """
+        Finaliza o trace e o exporta. Chamadas repetidas são ignoradas.
+        """
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        exporter.export(self)
+
+    def stage_timings(self):
+        """
+        Retorna a duração total, em milissegundos, de cada etapa.
+        """
+        timings = {}
+        for span in self.spans:
+            if span.duration_ms is not None:
+                timings[span.name] = (
+                    timings.get(span.name, 0.0) + span.duration_ms
+                )
+        return timings
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'timestamp': self.timestamp,
+            'duration_ms': self.duration_ms,
+            **self.attributes,
+            'spans': [span.to_dict(self.started) for span in self.spans],
+        }
+
+
+class _NullSpan:
+    """
+    Span usado quando não há trace ativo.
+    """
+
+    def set(self, **attributes):
+        pass
+
+    def elapsed_ms(self):
+        return 0.0
+
+    def end(self):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def current_trace():
+    """
+    Retorna o trace ativo no contexto atual ou None.
+    """
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace):
+    """
+    Define o trace ativo dentro do bloco.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def annotate(**attributes):
+    """
+    Adiciona atributos ao trace ativo, se houver.
+    """
+    trace = current_trace()
+    if trace is not None:
+        trace.set(**attributes)
+
+
+def start_span(name, **attributes):
+    """
+    Inicia um span no trace ativo. Deve ser finalizado com span.end().
+    """
+    trace = current_trace()
+    if trace is None:
+        return NULL_SPAN
+    return trace.start_span(name, **attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Cronometra o bloco como um span do trace ativo.
+
+    Args:
+        name (str): Nome da etapa.
+        **attributes: Atributos iniciais do span.
+
+    Yields:
+        Span: Span criado, para adicionar atributos como bytes e tokens.
+    """
+    current = start_span(name, **attributes)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.end()
+
+
+class TraceExporter:
+    """
+    Exporta traces em JSON lines e agrega métricas por etapa.
+    """
+
+    def __init__(
+        self, log_path=TRACE_LOG_PATH, metrics_path=TRACE_METRICS_PATH
+    ):
+        """
+        Args:
+            log_path (str): Arquivo JSONL dos traces. Vazio desativa.
+            metrics_path (str): Arquivo com o snapshot do Prometheus,
+                reescrito a cada trace. Vazio desativa.
+        """
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def _observe(self, stage, duration_ms, attributes):
+        metrics = self._stages.setdefault(
+            stage,
+            {
+                'count': 0,
+                'sum': 0.0,
+                'buckets': [0] * len(DURATION_BUCKETS),
+                'bytes': 0,
+                'tokens': 0,
+            },
+        )
+        seconds = duration_ms / 1000
+        metrics['count'] += 1
+        metrics['sum'] += seconds
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                metrics['buckets'][i] += 1
+        metrics['bytes'] += attributes.get('bytes', 0)
+        metrics['tokens'] += attributes.get('tokens', 0)
+
+    def export(self, trace):
+        """
+        Registra o trace nas métricas e nos arquivos configurados.
+        """
+        with self._lock:
+            self._observe('turn', trace.duration_ms, {})
+            for span in trace.spans:
+                if span.duration_ms is not None:
+                    self._observe(span.name, span.duration_ms, span.attributes)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as file:
+                    file.write(
+                        json.dumps(trace.to_dict(), ensure_ascii=False) + '\n'
+                    )
+        if self.metrics_path:
+            tmp_path = f'{self.metrics_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(self.prometheus_snapshot())
+            os.replace(tmp_path, self.metrics_path)
+
+    def prometheus_snapshot(self):
+        """
+        Retorna as métricas agregadas no formato texto do Prometheus.
+        """
+        lines = [
+            '# HELP chatbot_stage_duration_seconds Duração de cada etapa.',
+            '# TYPE chatbot_stage_duration_seconds histogram',
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for stage, metrics in stages:
+                for bound, count in zip(DURATION_BUCKETS, metrics['buckets']):
+                    lines.append(
+                        'chatbot_stage_duration_seconds_bucket'
+                        f'{{stage="{stage}",le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    'chatbot_stage_duration_seconds_bucket'
+                    f'{{stage="{stage}",le="+Inf"}} {metrics["count"]}'
+                )
+                lines.append(
+                    'chatbot_stage_duration_seconds_sum'
+                    f'{{stage="{stage}"}} {metrics["sum"]}'
+                )
+                lines.append(
+                    'chatbot_stage_duration_seconds_count'
+                    f'{{stage="{stage}"}} {metrics["count"]}'
+                )
+            lines.append('# TYPE chatbot_stage_bytes_total counter')
+            for stage, metrics in stages:
+                lines.append(
+                    f'chatbot_stage_bytes_total{{stage="{stage}"}} '
+                    f'{metrics["bytes"]}'
+                )
+            lines.append('# TYPE chatbot_stage_tokens_total counter')
+            for stage, metrics in stages:
+                lines.append(
+                    f'chatbot_stage_tokens_total{{stage="{stage}"}} '
+                    f'{metrics["tokens"]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+exporter = TraceExporter()
@@ -0,0 +1,170 @@
+# source/back/translation.py
+"""
+Tradução das respostas do chatbot.
+No modo 'prompt', o idioma de resposta é pedido diretamente ao Groq e
+nenhuma tradução é necessária; o tradutor reutilizável com cache fica como
+fallback para respostas que não passam pelo LLM.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (
+    TRANSLATION_CACHE_SIZE,
+    TRANSLATION_CHUNK_SIZE,
+    TRANSLATION_MAX_WORKERS,
+    TRANSLATION_MODE,
+)
+
+LANGUAGE_INSTRUCTIONS = {
+    'pt': 'Responda em português do Brasil.',
+    'en': 'Answer in English.',
+}
+
+
+def language_instruction(language):
+    """
+    Retorna a instrução de idioma a ser anexada ao prompt do Groq.
+
+    Args:
+        language (str): Código do idioma de resposta.
+
+    Returns:
+        str: Instrução de idioma ou string vazia se o modo não for 'prompt'.
+    """
+    if TRANSLATION_MODE != 'prompt' or language not in LANGUAGE_INSTRUCTIONS:
+        return ''
+    return f'\n\n{LANGUAGE_INSTRUCTIONS[language]}'
+
+
+def split_text(text, max_length=TRANSLATION_CHUNK_SIZE):
+    """
+    Divide um texto em trechos de até max_length caracteres, preferindo
+    quebras de parágrafo e de frase.
+
+    Args:
+        text (str): Texto a ser dividido.
+        max_length (int): Tamanho máximo de cada trecho.
+
+    Returns:
+        list[str]: Trechos do texto.
+    """
+    if len(text) <= max_length:
+        return [text]
+    pieces = re.split(r'(?<=\n)|(?<=[.!?])\s+', text)
+    chunks, current = [], ''
+    for piece in pieces:
+        while len(piece) > max_length:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(piece[:max_length])
+            piece = piece[max_length:]
+        separator = '' if not current or current.endswith('\n') else ' '
+        if len(current) + len(separator) + len(piece) > max_length:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f'{current}{separator}{piece}'
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ResponseTranslator:
+    """
+    Tradutor reutilizável com cache LRU por hash do texto, divisão de
+    respostas longas e tradução paralela dos trechos.
+    """
+
+    def __init__(
+        self,
+        cache_size=TRANSLATION_CACHE_SIZE,
+        max_workers=TRANSLATION_MAX_WORKERS,
+    ):
+        """
+        Inicializa o tradutor.
+
+        Args:
+            cache_size (int): Quantidade máxima de traduções em cache.
+            max_workers (int): Trechos traduzidos em paralelo.
+        """
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='translator'
+        )
+
+    def _get_translator(self, target):
+        """
+        Reutiliza um GoogleTranslator por thread e idioma; a instância altera
+        seus parâmetros a cada chamada e não pode ser compartilhada.
+        """
+        translators = getattr(self._local, 'translators', None)
+        if translators is None:
+            translators = self._local.translators = {}
+        if target not in translators:
+            from deep_translator import GoogleTranslator
+
+            translators[target] = GoogleTranslator(
+                source='auto', target=target
+            )
+        return translators[target]
+
+    def _translate_chunk(self, chunk, target):
+        return self._get_translator(target).translate(chunk)
+
+    @staticmethod
+    def is_in_language(text, language):
+        """
+        Verifica se o texto já está no idioma informado.
+        """
+        from .language import language_detector
+
+        return language_detector.detect(text)[0] == language
+
+    def translate(self, text, target):
+        """
+        Traduz o texto para o idioma de destino.
+
+        Args:
+            text (str): Texto a ser traduzido.
+            target (str): Código do idioma de destino.
+
+        Returns:
+            str: Texto traduzido ou o original, se já estiver no idioma.
+        """
+        if not text or not text.strip():
+            return text
+        key = (target, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if self.is_in_language(text, target):
+            translated = text
+        else:
+            chunks = split_text(text)
+            if len(chunks) == 1:
+                translated = self._translate_chunk(text, target)
+            else:
+                translated = ' '.join(
+                    self._executor.map(
+                        self._translate_chunk, chunks, [target] * len(chunks)
+                    )
+                )
+
+        with self._lock:
+            self._cache[key] = translated
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return translated
+
+
+translator = ResponseTranslator()
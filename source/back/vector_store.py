@@ -0,0 +1,84 @@
+# source/back/vector_store.py
+"""
+Seleção do backend de índice vetorial.
+Permite alternar entre o Pinecone e o índice local via VECTOR_BACKEND.
+"""
+
+import logging
+import threading
+
+from . import config
+from .async_utils import AsyncIndex
+from .config import (
+    EMBEDDING_DIMENSION,
+    LOCAL_INDEX_DIRECTORY,
+    VECTOR_BACKEND,
+)
+from .local_index import LocalVectorIndex
+
+logger = logging.getLogger(__name__)
+
+_local_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def get_vector_index(index_name, dimension=EMBEDDING_DIMENSION):
+    """
+    Obtém o índice vetorial do backend configurado.
+
+    Args:
+        index_name (str): Nome do índice.
+        dimension (int): Dimensão dos vetores.
+
+    Returns:
+        Índice com os métodos upsert e query.
+    """
+    if VECTOR_BACKEND == 'local':
+        with _registry_lock:
+            index = _local_indexes.get(index_name)
+            if index is None:
+                index = LocalVectorIndex(
+                    index_name, dimension, directory=LOCAL_INDEX_DIRECTORY
+                )
+                _local_indexes[index_name] = index
+        return index
+    if VECTOR_BACKEND == 'pinecone':
+        from .pinecone_client import get_index
+
+        return get_index(index_name, dimension)
+    raise ValueError(f'Backend vetorial desconhecido: {VECTOR_BACKEND}')
+
+
+def get_async_vector_index(index_name, dimension=EMBEDDING_DIMENSION):
+    """
+    Obtém o índice vetorial do backend configurado com interface assíncrona.
+    """
+    return AsyncIndex(get_vector_index(index_name, dimension))
+
+
+def prewarm_vector_index(index_name=None, dimension=EMBEDDING_DIMENSION):
+    """
+    Resolve o índice e abre sua conexão em segundo plano, para que a primeira
+    pergunta não pague esse custo. O nome do índice é lido dentro da thread,
+    então a importação do backend não exige INDEX_NAME.
+
+    Args:
+        index_name (str): Nome do índice. Se None, usa INDEX_NAME.
+        dimension (int): Dimensão dos vetores.
+
+    Returns:
+        threading.Thread: Thread do pré-aquecimento.
+    """
+
+    def prewarm():
+        try:
+            name = index_name or config.INDEX_NAME
+            get_vector_index(name, dimension).describe_index_stats()
+        except Exception as e:
+            logger.warning('Falha ao pré-aquecer o índice vetorial: %s', e)
+
+    thread = threading.Thread(
+        target=prewarm, name='vector-prewarm', daemon=True
+    )
+    thread.start()
+    return thread
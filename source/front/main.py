@@ -4,7 +4,7 @@ Gerencia a interface e interações com o usuário.
 """
 
 import streamlit as st
-from back.main import generate_response
+from back.main import generate_response_stream
 
 st.title('Chat Bot')
 cont = st.container()
@@ -27,18 +27,8 @@ if prompt:
     st.session_state['messages'].append({'role': 'user', 'content': prompt})
     st.chat_message('user').write(prompt)
 
-    bot_message_placeholder = st.chat_message('assistant')
-    with bot_message_placeholder:
-
-        response_slot = st.empty()
-        spinner_slot = bot_message_placeholder.container()
-
-        with spinner_slot:
-            with st.spinner('Gerando resposta...'):
-                response = generate_response(prompt)
-
-        spinner_slot.empty()
-        response_slot.write(response)
+    with st.chat_message('assistant'):
+        response = st.write_stream(generate_response_stream(prompt))
 
     st.session_state['messages'].append(
         {'role': 'assistant', 'content': response}
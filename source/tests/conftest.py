@@ -0,0 +1,35 @@
+"""
+Configuração comum dos testes.
+As variáveis obrigatórias recebem valores fictícios e os diretórios de dados
+apontam para um diretório temporário, para que importar o backend não exija
+chaves de API nem grave em source/data.
+"""
+
+import os
+import sys
+import tempfile
+
+_data = tempfile.mkdtemp(prefix='chatbot-tests-')
+
+for name in (
+    'GROQ_API_KEY',
+    'PINECONE_API_KEY',
+    'PINECONE_ENVIRONMENT',
+    'PINECONE_HOST',
+    'TAVILY_API_KEY',
+):
+    os.environ.setdefault(name, 'test')
+os.environ.setdefault('INDEX_NAME', 'test')
+os.environ.setdefault('MODEL_ID', 'test-model')
+os.environ.setdefault('VECTOR_BACKEND', 'local')
+os.environ.setdefault('LOCAL_INDEX_DIRECTORY', os.path.join(_data, 'vectors'))
+os.environ.setdefault(
+    'EXTRACTION_CACHE_DIRECTORY', os.path.join(_data, 'extractions')
+)
+os.environ.setdefault(
+    'INGESTION_STATE_PATH', os.path.join(_data, 'ingestion_state.json')
+)
+for name in ('VECTOR_PREWARM', 'LANGUAGE_PREWARM', 'TOOL_GRAPH_PREWARM'):
+    os.environ.setdefault(name, 'false')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
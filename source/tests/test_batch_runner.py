@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from back import batch_runner
+from back.batch_runner import arun_batch, completed_ids, load_prompts
+from back.groq_gateway import BATCH, _priority
+
+
+def _write_lines(path, lines):
+    path.write_text(''.join(f'{line}\n' for line in lines), encoding='utf-8')
+
+
+def _results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _fake_run_prompt(calls, failing=()):
+    async def run_prompt(row):
+        calls.append((row['id'], _priority.get()))
+        error = 'RuntimeError: falha' if row['id'] in failing else None
+        return {
+            'id': row['id'],
+            'session_id': row['session_id'],
+            'answer': None if error else f'resposta {row["id"]}',
+            'error': error,
+            'intent': 'general_flow',
+        }
+
+    return run_prompt
+
+
+def test_load_prompts(tmp_path):
+    path = tmp_path / 'prompts.jsonl'
+    _write_lines(
+        path,
+        [
+            json.dumps('Quem foi Santos-Dumont?'),
+            '',
+            json.dumps({'id': 'x', 'prompt': 'oi', 'session_id': 's'}),
+        ],
+    )
+
+    assert load_prompts(str(path)) == [
+        {
+            'id': '1',
+            'prompt': 'Quem foi Santos-Dumont?',
+            'session_id': 'batch-1',
+            'language': None,
+        },
+        {'id': 'x', 'prompt': 'oi', 'session_id': 's', 'language': None},
+    ]
+
+
+def test_completed_ids_skip_errors_and_terminate_partial_lines(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text(
+        json.dumps({'id': '1', 'error': None})
+        + '\n'
+        + json.dumps({'id': '2', 'error': 'RuntimeError: falha'})
+        + '\n{"id": "3", "err',
+        encoding='utf-8',
+    )
+
+    assert completed_ids(str(path)) == {'1'}
+    assert path.read_text().endswith('"err\n')
+
+
+def test_completed_ids_without_output(tmp_path):
+    assert completed_ids(str(tmp_path / 'results.jsonl')) == set()
+
+
+def test_resume_runs_only_pending_and_failed_prompts(tmp_path, monkeypatch):
+    rows = [
+        {
+            'id': str(i),
+            'prompt': f'p{i}',
+            'session_id': f's{i}',
+            'language': 'en',
+        }
+        for i in range(1, 5)
+    ]
+    output = tmp_path / 'results.jsonl'
+    calls = []
+    monkeypatch.setattr(
+        batch_runner, 'run_prompt', _fake_run_prompt(calls, failing={'2'})
+    )
+
+    first = asyncio.run(arun_batch(rows, str(output), concurrency=2))
+
+    assert first['processed'] == 4
+    assert first['errors'] == 1
+    assert all(priority == BATCH for _, priority in calls)
+
+    calls.clear()
+    monkeypatch.setattr(batch_runner, 'run_prompt', _fake_run_prompt(calls))
+    second = asyncio.run(arun_batch(rows, str(output), concurrency=2))
+
+    assert [row_id for row_id, _ in calls] == ['2']
+    assert second['skipped'] == 3
+    assert second['processed'] == 1
+    assert completed_ids(str(output)) == {'1', '2', '3', '4'}
+
+
+def test_prompts_of_a_session_run_in_order(tmp_path, monkeypatch):
+    rows = [
+        {'id': str(i), 'prompt': f'p{i}', 'session_id': 's', 'language': 'en'}
+        for i in range(1, 4)
+    ]
+    output = tmp_path / 'results.jsonl'
+    calls = []
+    monkeypatch.setattr(batch_runner, 'run_prompt', _fake_run_prompt(calls))
+
+    asyncio.run(arun_batch(rows, str(output), concurrency=4))
+
+    assert [result['id'] for result in _results(output)] == ['1', '2', '3']
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+from back.agent import bulk_upsert
+from back.agent.bulk_upsert import (
+    BulkUpserter,
+    estimate_vector_size,
+    make_batches,
+)
+
+
+def _vector(i, dimension=4, content=''):
+    return {
+        'id': f'v{i}',
+        'values': [0.0] * dimension,
+        'metadata': {'content': content},
+    }
+
+
+class FakeIndex:
+    """
+    Índice que registra os lotes recebidos e falha nas primeiras chamadas
+    de cada lote listado em failures.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        first = vectors[0]['id']
+        with self._lock:
+            if self.failures.get(first, 0) > 0:
+                self.failures[first] -= 1
+                raise ConnectionError(first)
+            self.batches.append([vector['id'] for vector in vectors])
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bulk_upsert.time, 'sleep', lambda seconds: None)
+
+
+def test_batches_are_limited_by_count():
+    batches = make_batches(
+        [_vector(i) for i in range(5)], batch_size=2, max_batch_bytes=10**6
+    )
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_batches_are_limited_by_size():
+    vectors = [_vector(i, content='x' * 100) for i in range(4)]
+    size = estimate_vector_size(vectors[0])
+
+    batches = make_batches(vectors, batch_size=100, max_batch_bytes=2 * size)
+
+    assert [len(batch) for batch in batches] == [2, 2]
+
+
+def test_oversized_vectors_get_their_own_batch():
+    vectors = [_vector(0, content='x' * 1000), _vector(1)]
+
+    batches = make_batches(vectors, batch_size=100, max_batch_bytes=10)
+
+    assert [[vector['id'] for vector in batch] for batch in batches] == [
+        ['v0'],
+        ['v1'],
+    ]
+
+
+def test_upsert_sends_every_vector():
+    index = FakeIndex()
+
+    stats = BulkUpserter(index, batch_size=3, max_workers=2).upsert(
+        [_vector(i) for i in range(7)]
+    )
+
+    assert sorted(sum(index.batches, [])) == sorted(f'v{i}' for i in range(7))
+    assert stats['vectors'] == 7
+    assert stats['batches'] == 3
+    assert stats['failed_batches'] == 0
+
+
+def test_failed_batches_are_retried():
+    index = FakeIndex(failures={'v0': 2})
+
+    stats = BulkUpserter(index, batch_size=2, max_retries=2).upsert(
+        [_vector(i) for i in range(4)]
+    )
+
+    assert stats['vectors'] == 4
+    assert stats['failed_batches'] == 0
+
+
+def test_batches_failing_after_retries_are_counted():
+    index = FakeIndex(failures={'v2': 5})
+
+    stats = BulkUpserter(index, batch_size=2, max_retries=1).upsert(
+        [_vector(i) for i in range(6)]
+    )
+
+    assert stats['vectors'] == 4
+    assert stats['batches'] == 3
+    assert stats['failed_batches'] == 1
+    assert index.failures == {'v2': 3}
+
+
+def test_upsert_without_vectors():
+    stats = BulkUpserter(FakeIndex()).upsert([])
+
+    assert stats['vectors'] == 0
+    assert stats['batches'] == 0
@@ -0,0 +1,98 @@
+from back.agent.chunking import (
+    Chunker,
+    SimHashIndex,
+    iter_paragraphs,
+    pack_units,
+    simhash,
+)
+from back.tokens import estimate_tokens
+
+SENTENCE = 'Frase numero {} com varias palavras aqui dentro para encher.'
+
+
+def _units(*texts):
+    return [(text, estimate_tokens(text), False) for text in texts]
+
+
+def test_iter_paragraphs_normalizes_whitespace():
+    text = 'Primeiro   parágrafo\ncontinua.\n\n \n\nSegundo.'
+
+    assert list(iter_paragraphs(text)) == [
+        'Primeiro parágrafo continua.',
+        'Segundo.',
+    ]
+
+
+def test_pack_units_respects_budget_and_overlaps_whole_units():
+    units = _units('a b', 'c d', 'e f', 'g h')
+
+    chunks = list(pack_units(units, max_tokens=4, overlap_tokens=2))
+
+    assert chunks == ['a b c d', 'c d e f', 'e f g h']
+
+
+def test_pack_units_overlaps_the_tail_of_a_long_sentence():
+    text = ' '.join(SENTENCE.format(i) for i in range(4))
+
+    chunks = list(Chunker(20, 5, dedup_distance=-1).split(text))
+
+    assert len(chunks) == 4
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert estimate_tokens(chunk) <= 20
+        assert chunk.startswith('dentro para encher.')
+        assert previous.endswith('dentro para encher.')
+
+
+def test_pack_units_without_overlap():
+    units = _units('a b', 'c d', 'e f')
+
+    assert list(pack_units(units, max_tokens=4, overlap_tokens=0)) == [
+        'a b c d',
+        'e f',
+    ]
+
+
+def test_long_words_are_split_within_budget():
+    text = 'a' * 100
+
+    chunks = list(Chunker(10, 0, dedup_distance=-1).split(text))
+
+    assert ''.join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
+
+
+def test_simhash_is_deterministic_and_close_for_near_duplicates():
+    text = ' '.join(f'palavra{i}' for i in range(200))
+    edited = text.replace('palavra30', 'outra')
+    different = ' '.join(f'termo{i}' for i in range(200))
+
+    assert simhash(text) == simhash(text.upper())
+    assert bin(simhash(text) ^ simhash(edited)).count('1') <= 6
+    assert bin(simhash(text) ^ simhash(different)).count('1') > 6
+
+
+def test_simhash_index_rejects_near_duplicates():
+    index = SimHashIndex(distance=3)
+
+    assert index.add(0b1111 << 20)
+    assert not index.add((0b1111 << 20) ^ 0b101)
+    assert index.add(~(0b1111 << 20) & (2**64 - 1))
+
+
+def test_chunker_drops_repeated_paragraphs_across_pages():
+    chunker = Chunker(64, 0)
+    footer = 'Todos os direitos reservados à empresa exemplo.'
+
+    first = list(chunker.split(f'Conteúdo da primeira página.\n\n{footer}'))
+    second = list(chunker.split(f'Conteúdo da segunda página.\n\n{footer}'))
+
+    assert any(footer in chunk for chunk in first)
+    assert not any(footer in chunk for chunk in second)
+
+
+def test_chunker_drops_near_duplicate_chunks():
+    chunker = Chunker(1024, 0, dedup_distance=6)
+    text = ' '.join(f'palavra{i}' for i in range(200))
+
+    assert list(chunker.split(text))
+    assert not list(chunker.split(text.replace('palavra30', 'outra')))
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from back.agent import context_assembly
+from back.agent.context_assembly import (
+    ContextAssembler,
+    match_contents,
+    mmr,
+    pack,
+    retrieval_relevance,
+)
+
+
+def _match(content, score=None):
+    return {'metadata': {'content': content}, 'score': score}
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_match_contents_drops_empty_and_repeated_contents():
+    contents, scores = match_contents(
+        [
+            _match('Planos e preços', 0.9),
+            _match('  planos E  preços ', 0.8),
+            _match('', 0.7),
+            {'score': 0.6},
+            _match('Suporte', 0.5),
+        ]
+    )
+
+    assert contents == ['Planos e preços', 'Suporte']
+    assert scores == [0.9, 0.5]
+
+
+def test_retrieval_relevance_normalizes_scores():
+    assert retrieval_relevance([0.2, 0.6, 0.4]) == pytest.approx(
+        [0.0, 1.0, 0.5]
+    )
+    assert retrieval_relevance([0.3, 0.3]) == pytest.approx([1.0, 1.0])
+
+
+def test_retrieval_relevance_uses_rank_without_scores():
+    assert retrieval_relevance([None, 0.5, None, 0.1]) == pytest.approx(
+        [1.0, 0.75, 0.5, 0.25]
+    )
+
+
+def test_mmr_prefers_diverse_candidates():
+    vectors = np.stack([_unit(1, 0), _unit(1, 0.1), _unit(0, 1)])
+    relevance = np.asarray([1.0, 0.95, 0.6], dtype=np.float32)
+
+    assert mmr(relevance, vectors, 0.5, 1.1) == [0, 2, 1]
+    assert mmr(relevance, vectors, 1.0, 1.1) == [0, 1, 2]
+
+
+def test_mmr_drops_near_duplicates():
+    vectors = np.stack([_unit(1, 0), _unit(1, 0.01), _unit(0, 1)])
+    relevance = np.asarray([1.0, 0.9, 0.5], dtype=np.float32)
+
+    assert mmr(relevance, vectors, 0.7, 0.99) == [0, 2]
+
+
+def test_pack_skips_contents_that_do_not_fit():
+    selected, used = pack(['a b c', 'um texto longo demais', 'd e'], 6)
+
+    assert selected == ['a b c', 'd e']
+    assert used == 5
+
+
+def test_budget_leaves_a_margin_for_the_token_estimate(monkeypatch):
+    monkeypatch.setattr(
+        context_assembly.router, 'context_window', lambda route: 2024
+    )
+    assembler = ContextAssembler(
+        token_budget=10_000, response_tokens=1024, estimate_margin=0.25
+    )
+
+    assert assembler.budget('a b c d', template_tokens=100) == 800 - 4 - 100
+    assert ContextAssembler(token_budget=50).budget('pergunta') == 50
+
+
+def test_budget_is_never_negative(monkeypatch):
+    monkeypatch.setattr(
+        context_assembly.router, 'context_window', lambda route: 1000
+    )
+
+    assert ContextAssembler(response_tokens=1024).budget('pergunta') == 0
+
+
+def test_assemble_orders_by_relevance_and_respects_the_budget():
+    matches = [
+        _match('Planos e preços da hospedagem na nuvem.', 0.9),
+        _match('Planos e preços da hospedagem na nuvem.', 0.85),
+        _match('Atendimento de suporte por telefone e email.', 0.5),
+        _match(' '.join(['histórico'] * 500), 0.4),
+    ]
+
+    selected, stats = ContextAssembler(token_budget=200).assemble(
+        'Quais são os planos?', matches
+    )
+
+    assert selected == [
+        'Planos e preços da hospedagem na nuvem.',
+        'Atendimento de suporte por telefone e email.',
+    ]
+    assert stats['candidates'] == 4
+    assert stats['distinct'] == 3
+    assert stats['selected'] == 2
+    assert stats['context_tokens'] <= stats['budget'] == 200
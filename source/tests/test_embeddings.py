@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from back.agent import embeddings
+from back.agent.embeddings import Embedder, HashingEmbedder, get_embedder
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dimension=256)
+
+
+def test_embeddings_are_normalized_float32_rows(embedder):
+    matrix = embedder.embed_batch(['Planos e preços', 'Suporte técnico'])
+
+    assert matrix.shape == (2, 256)
+    assert matrix.dtype == np.float32
+    assert matrix.flags['C_CONTIGUOUS']
+    assert np.linalg.norm(matrix, axis=1) == pytest.approx([1.0, 1.0])
+
+
+def test_embeddings_are_deterministic(embedder):
+    assert np.array_equal(
+        embedder.embed('Quem fundou a WaProject?'),
+        HashingEmbedder(dimension=256).embed('Quem fundou a WaProject?'),
+    )
+
+
+def test_embed_matches_embed_batch(embedder):
+    texts = ['um', 'dois', 'três']
+
+    matrix = embedder.embed_batch(texts)
+
+    for row, text in zip(matrix, texts):
+        assert np.array_equal(row, embedder.embed(text))
+
+
+def test_case_accents_and_spacing_are_ignored(embedder):
+    assert np.allclose(
+        embedder.embed('Preços  do   PLANO'), embedder.embed('precos do plano')
+    )
+
+
+def test_similar_texts_are_closer_than_unrelated_ones(embedder):
+    query = embedder.embed('preço do plano básico')
+
+    similar = query @ embedder.embed('preços dos planos básicos')
+    unrelated = query @ embedder.embed('horário de atendimento')
+
+    assert similar > unrelated
+
+
+def test_texts_without_ngrams_give_zero_vectors(embedder):
+    matrix = embedder.embed_batch(['', '   '])
+
+    assert not matrix.any()
+    assert embedder.embed_batch([]).shape == (0, 256)
+
+
+def test_registered_embedders_are_selected_by_name(monkeypatch):
+    class ConstantEmbedder(Embedder):
+        def embed_batch(self, texts):
+            return np.ones((len(texts), self.dimension), dtype=np.float32)
+
+    monkeypatch.setattr(embeddings, 'EMBEDDERS', dict(embeddings.EMBEDDERS))
+    monkeypatch.setattr(embeddings, '_embedder', None)
+    monkeypatch.setattr(embeddings, 'EMBEDDER', 'constante')
+    embeddings.register_embedder('constante', ConstantEmbedder)
+
+    assert isinstance(get_embedder(), ConstantEmbedder)
+    assert get_embedder() is get_embedder()
+
+
+def test_unknown_embedder_is_rejected(monkeypatch):
+    monkeypatch.setattr(embeddings, '_embedder', None)
+    monkeypatch.setattr(embeddings, 'EMBEDDER', 'inexistente')
+
+    with pytest.raises(ValueError):
+        get_embedder()
@@ -0,0 +1,83 @@
+import pytest
+from back.extraction import ExtractionCache, Extractor
+
+URL = 'https://exemplo.com/'
+
+
+class FakeTavily:
+    def __init__(self):
+        self.pages = {}
+        self.error = None
+        self.calls = 0
+
+    def extract(self, urls):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {
+            'results': [
+                {'url': url, 'raw_content': self.pages[url]}
+                for url in urls
+                if url in self.pages
+            ],
+            'failed_results': [
+                {'url': url, 'error': 'not found'}
+                for url in urls
+                if url not in self.pages
+            ],
+        }
+
+
+@pytest.fixture
+def client():
+    client = FakeTavily()
+    client.pages[URL] = 'conteúdo'
+    return client
+
+
+def _extract(client, cache, force=False):
+    return Extractor(client, cache).extract([URL], force)
+
+
+def test_fresh_entries_are_served_from_the_cache(tmp_path, client):
+    cache = ExtractionCache(str(tmp_path), ttl=3600)
+    _extract(client, cache)
+
+    result = _extract(client, cache)['results'][0]
+
+    assert client.calls == 1
+    assert result['cached'] and not result['changed']
+
+
+def test_changed_content_is_detected(tmp_path, client):
+    cache = ExtractionCache(str(tmp_path), ttl=0)
+    first = _extract(client, cache)['results'][0]
+    unchanged = _extract(client, cache)['results'][0]
+    client.pages[URL] = 'conteúdo novo'
+    changed = _extract(client, cache)['results'][0]
+
+    assert first['changed']
+    assert not unchanged['changed'] and not unchanged['cached']
+    assert changed['changed']
+    assert changed['content_hash'] != first['content_hash']
+
+
+def test_failures_fall_back_to_the_previous_extraction(tmp_path, client):
+    cache = ExtractionCache(str(tmp_path), ttl=0)
+    _extract(client, cache)
+    client.error = ConnectionError('timeout')
+
+    response = _extract(client, cache)
+
+    assert response['results'][0]['raw_content'] == 'conteúdo'
+    assert response['results'][0]['stale']
+    assert [item['url'] for item in response['failed_results']] == [URL]
+
+
+def test_failures_without_previous_extraction(tmp_path, client):
+    del client.pages[URL]
+
+    response = _extract(client, ExtractionCache(str(tmp_path), ttl=0))
+
+    assert response['results'] == []
+    assert response['failed_results'] == [{'url': URL, 'error': 'not found'}]
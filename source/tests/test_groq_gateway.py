@@ -0,0 +1,271 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from back.benchmark.fakes import FakeAsyncGroq
+from back.groq_gateway import (
+    BATCH,
+    INTERACTIVE,
+    GroqGateway,
+    PriorityGate,
+    RateLimitExceeded,
+    TokenBucket,
+)
+
+MESSAGES = [{'role': 'user', 'content': 'Quem foi Santos-Dumont?'}]
+
+
+def _gateway(**options):
+    options.setdefault('requests_per_minute', 0)
+    options.setdefault('tokens_per_minute', 0)
+    return GroqGateway(**options)
+
+
+class BlockingCompletions:
+    """
+    Completions que só respondem depois de release.set(), para manter a
+    primeira chamada em andamento enquanto as demais chegam.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def create(self, messages, model, stream=False, **params):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return SimpleNamespace(choices=[], usage=None)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after_ms):
+        super().__init__('429')
+        self.response = SimpleNamespace(
+            headers={'retry-after-ms': str(retry_after_ms)}
+        )
+
+
+class RateLimitedCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, messages, model, stream=False, **params):
+        self.calls += 1
+        raise RateLimitError(1)
+
+
+def test_token_bucket_is_free_within_capacity():
+    bucket = TokenBucket(60)
+
+    assert bucket.reserve(60) == 0.0
+
+
+def test_token_bucket_waits_for_the_deficit():
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+
+    assert bucket.reserve(30) == pytest.approx(30, abs=0.1)
+
+
+def test_token_bucket_adjust_returns_unused_tokens():
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    bucket.adjust(-30)
+
+    assert bucket.reserve(30) == pytest.approx(0, abs=0.1)
+
+
+def test_token_bucket_disabled():
+    bucket = TokenBucket(0)
+
+    assert bucket.reserve(10**6) == 0.0
+
+
+def test_priority_gate_serves_interactive_before_batch():
+    async def scenario():
+        gate = PriorityGate(1)
+        await gate.aacquire()
+        order = []
+
+        async def waiter(name, priority):
+            await gate.aacquire(priority)
+            order.append(name)
+            gate.release()
+
+        tasks = [
+            asyncio.create_task(waiter('batch', BATCH)),
+            asyncio.create_task(waiter('interactive', INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order, gate.available
+
+    order, available = asyncio.run(scenario())
+
+    assert order == ['interactive', 'batch']
+    assert available == 1
+
+
+def test_priority_gate_skips_cancelled_waiters():
+    async def scenario():
+        gate = PriorityGate(1)
+        await gate.aacquire()
+        cancelled = asyncio.create_task(gate.aacquire(INTERACTIVE))
+        waiting = asyncio.create_task(gate.aacquire(BATCH))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.wait_for(waiting, 1)
+        gate.release()
+        return gate.available
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_create_coalesces_identical_calls():
+    gateway = _gateway()
+    completions = BlockingCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    results = []
+
+    def call():
+        results.append(gateway.create(client, MESSAGES, 'model'))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert completions.started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while gateway.stats['coalesced'] < 3:
+        threading.Event().wait(0.01)
+    completions.release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert completions.calls == 1
+    assert len(results) == 4
+    assert all(result is results[0] for result in results)
+    assert not gateway._inflight
+
+
+def test_acreate_coalesces_identical_calls():
+    gateway = _gateway()
+    client = FakeAsyncGroq(latency_ms=20, token_latency_ms=0)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(gateway.acreate(client, MESSAGES, 'model') for _ in range(3))
+        )
+
+    responses = asyncio.run(scenario())
+
+    assert gateway.stats == {
+        'calls': 1,
+        'coalesced': 2,
+        'retries': 0,
+        'rate_limited': 0,
+    }
+    assert (
+        len({response.choices[0].message.content for response in responses})
+        == 1
+    )
+
+
+def test_acreate_shares_streams():
+    gateway = _gateway()
+    client = FakeAsyncGroq(
+        latency_ms=10, token_latency_ms=1, response_tokens=5
+    )
+
+    async def collect(stream):
+        return [chunk.choices[0].delta.content async for chunk in stream]
+
+    async def scenario():
+        streams = await asyncio.gather(
+            *(
+                gateway.acreate(client, MESSAGES, 'model', stream=True)
+                for _ in range(2)
+            )
+        )
+        return await asyncio.gather(*(collect(stream) for stream in streams))
+
+    first, second = asyncio.run(scenario())
+
+    assert gateway.stats['calls'] == 1
+    assert len(first) == 5
+    assert first == second
+
+
+def test_create_raises_rate_limit_after_retries():
+    gateway = _gateway(max_retries=1)
+    completions = RateLimitedCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with pytest.raises(RateLimitExceeded) as error:
+        gateway.create(client, MESSAGES, 'model')
+
+    assert error.value.retry_after == pytest.approx(0.001)
+    assert completions.calls == 2
+    assert gateway.stats['rate_limited'] == 2
+    assert gateway.stats['retries'] == 1
+
+
+def test_failed_attempts_refund_reserved_tokens():
+    gateway = _gateway(max_retries=2, tokens_per_minute=10_000)
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=RateLimitedCompletions())
+    )
+
+    with pytest.raises(RateLimitExceeded):
+        gateway.create(client, MESSAGES, 'model', max_tokens=1000)
+
+    assert gateway.tokens.level == pytest.approx(10_000)
+
+
+def test_cancelled_attempts_refund_reserved_tokens():
+    gateway = _gateway(tokens_per_minute=10_000)
+    client = FakeAsyncGroq(latency_ms=1000, token_latency_ms=0)
+
+    async def scenario():
+        task = asyncio.ensure_future(
+            gateway.acreate(client, MESSAGES, 'model', max_tokens=1000)
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert gateway.tokens.level == pytest.approx(10_000)
+
+
+def test_followers_retry_when_the_leader_is_cancelled():
+    gateway = _gateway()
+    client = FakeAsyncGroq(latency_ms=50, token_latency_ms=0)
+
+    async def scenario():
+        leader = asyncio.ensure_future(gateway.acreate(client, MESSAGES, 'm'))
+        await asyncio.sleep(0.01)
+        followers = [
+            asyncio.ensure_future(gateway.acreate(client, MESSAGES, 'm'))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    responses = asyncio.run(scenario())
+
+    assert len(responses) == 2
+    assert responses[0] is responses[1]
+    assert gateway.stats['calls'] == 2
+    assert not gateway._inflight
@@ -0,0 +1,196 @@
+import pytest
+from back.agent import ingestion
+from back.agent.ingestion import IngestionJob, IngestionState
+from back.agent.rag_flow import PineconeIndexer
+
+URL = 'https://exemplo.com/'
+
+
+class FakeExtractor:
+    pages = {}
+    stale = False
+
+    def __init__(self, client):
+        pass
+
+    def extract(self, urls, force=False):
+        results = [
+            {
+                'url': url,
+                'raw_content': content,
+                'content_hash': digest,
+                'stale': self.stale,
+            }
+            for url, (content, digest) in self.pages.items()
+            if url in urls
+        ]
+        failed = [{'url': result['url']} for result in results if self.stale]
+        return {'results': results, 'failed_results': failed}
+
+
+class FakeIndexer:
+    segments = 3
+    failed_batches = 0
+    indexed = []
+    deleted = []
+
+    def __init__(self, index_name):
+        pass
+
+    def index_segments(self, raw_content, url, chunker):
+        self.indexed.append(url)
+        return {
+            'segments': self.segments,
+            'vectors': self.segments - self.failed_batches,
+            'failed_batches': self.failed_batches,
+        }
+
+    def delete_segments(self, url, start, stop):
+        if start < stop:
+            self.deleted.append((url, start, stop))
+
+    def persist(self):
+        pass
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    FakeExtractor.pages = {URL: ('conteúdo', 'hash-1')}
+    FakeExtractor.stale = False
+    FakeIndexer.segments = 3
+    FakeIndexer.failed_batches = 0
+    FakeIndexer.indexed = []
+    FakeIndexer.deleted = []
+    monkeypatch.setattr(ingestion, 'Extractor', FakeExtractor)
+    monkeypatch.setattr(ingestion, 'PineconeIndexer', FakeIndexer)
+    monkeypatch.setattr(ingestion, 'get_tavily_client', lambda: None)
+    state = IngestionState(str(tmp_path / 'state.json'))
+    return IngestionJob(urls=[URL], index_name='test', interval=0, state=state)
+
+
+def test_new_pages_are_indexed_and_recorded(job):
+    assert job.run_once() == {URL: 3}
+
+    reloaded = IngestionState(job.state.path)
+    assert reloaded.content_hash(URL) == 'hash-1'
+    assert reloaded.last_indexed(URL) is not None
+
+
+def test_unchanged_pages_are_not_reindexed(job):
+    job.run_once()
+
+    assert job.run_once() == {}
+    assert FakeIndexer.indexed == [URL]
+    assert job.state.content_hash(URL) == 'hash-1'
+
+
+def test_failed_extractions_do_not_count_as_refreshes(job):
+    job.run_once()
+    indexed_at = job.state.last_indexed(URL)
+    FakeExtractor.stale = True
+
+    assert job.run_once() == {}
+    assert job.state.last_indexed(URL) == indexed_at
+
+
+def test_changed_pages_are_reindexed(job):
+    job.run_once()
+    FakeExtractor.pages = {URL: ('novo conteúdo', 'hash-2')}
+
+    assert job.run_once() == {URL: 3}
+    assert job.state.content_hash(URL) == 'hash-2'
+
+
+def test_force_reindexes_unchanged_pages(job):
+    job.run_once()
+
+    assert job.run_once(force=True) == {URL: 3}
+    assert FakeIndexer.indexed == [URL, URL]
+
+
+def test_pages_without_hash_are_treated_as_changed(job):
+    FakeExtractor.pages = {URL: ('conteúdo', None)}
+    job.run_once()
+
+    assert job.run_once() == {URL: 3}
+
+
+def test_partial_failures_are_retried(job):
+    FakeIndexer.failed_batches = 1
+    job.run_once()
+
+    assert job.state.content_hash(URL) is None
+    assert job.state.is_stale(URL, 3600)
+
+    FakeIndexer.failed_batches = 0
+    assert job.run_once() == {URL: 3}
+    assert job.state.content_hash(URL) == 'hash-1'
+
+
+def test_segments_left_by_a_longer_version_are_deleted(job):
+    FakeIndexer.segments = 5
+    job.run_once()
+    FakeExtractor.pages = {URL: ('conteúdo menor', 'hash-2')}
+    FakeIndexer.segments = 2
+
+    job.run_once()
+
+    assert FakeIndexer.deleted == [(URL, 2, 5)]
+    assert job.state.segments(URL) == 2
+
+
+def test_segments_of_a_failed_run_are_deleted_later(job):
+    FakeIndexer.segments = 2
+    job.run_once()
+    FakeExtractor.pages = {URL: ('conteúdo maior', 'hash-2')}
+    FakeIndexer.segments = 6
+    FakeIndexer.failed_batches = 1
+    job.run_once()
+    FakeExtractor.pages = {URL: ('conteúdo final', 'hash-3')}
+    FakeIndexer.segments = 3
+    FakeIndexer.failed_batches = 0
+
+    job.run_once()
+
+    assert FakeIndexer.deleted == [(URL, 3, 6)]
+
+
+def test_reindexing_removes_stale_segments_from_the_indexes(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(ingestion, 'Extractor', FakeExtractor)
+    monkeypatch.setattr(ingestion, 'get_tavily_client', lambda: None)
+    long_page = '\n\n'.join(
+        ' '.join(f'secao{n}termo{i}' for i in range(200)) for n in range(4)
+    )
+    FakeExtractor.pages = {URL: (long_page, 'hash-1')}
+    state = IngestionState(str(tmp_path / 'state.json'))
+    job = IngestionJob(
+        urls=[URL], index_name='orphans', interval=0, state=state
+    )
+    job.run_once()
+    indexer = PineconeIndexer('orphans')
+    assert indexer.index.describe_index_stats()['total_vector_count'] > 4
+    assert indexer.lexical.query('secao3termo1')['matches']
+
+    FakeExtractor.pages = {URL: ('Página curta.', 'hash-2')}
+    job.run_once()
+
+    assert indexer.index.describe_index_stats()['total_vector_count'] == 1
+    assert indexer.lexical.query('secao3termo1')['matches'] == []
+
+
+def test_pending_urls_respect_the_interval(job):
+    job.interval = 3600
+    job.run_once()
+
+    assert job.pending_urls() == []
+    assert job.pending_urls(force=True) == [URL]
+
+
+def test_mark_unchanged_without_previous_state(tmp_path):
+    state = IngestionState(str(tmp_path / 'state.json'))
+    state.mark_unchanged(URL)
+
+    assert state.content_hash(URL) is None
+    assert not state.is_stale(URL, 3600)
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from back import config
+from back.agent.intent_classifier import (
+    EVALUATION_EXAMPLES,
+    LABELED_EXAMPLES,
+    CentroidIntentClassifier,
+    evaluate,
+)
+from back.agent.prompt_engineering import PromptEngineeringLayer
+from back.agent.session_memory import SessionMemoryManager
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return CentroidIntentClassifier()
+
+
+def test_evaluation_examples_are_held_out():
+    training = {
+        message.casefold()
+        for messages in LABELED_EXAMPLES.values()
+        for message in messages
+    }
+
+    for messages in EVALUATION_EXAMPLES.values():
+        assert not training & {message.casefold() for message in messages}
+
+
+def test_configured_threshold_routes_locally_without_errors(classifier):
+    result = evaluate(classifier, config.INTENT_CONFIDENCE_THRESHOLD)
+
+    assert result['errors'] == []
+    assert result['coverage'] >= 0.3
+
+
+def test_lower_thresholds_trade_accuracy_for_coverage(classifier):
+    strict = evaluate(classifier, 0.2)
+    loose = evaluate(classifier, 0.05)
+
+    assert loose['coverage'] > strict['coverage']
+    assert loose['accuracy'] < strict['accuracy']
+
+
+def test_summary_requests_do_not_route_to_history(classifier):
+    assert classifier.predict('resuma a conversa')[1] < (
+        config.INTENT_CONFIDENCE_THRESHOLD
+    )
+
+
+def test_intent_cache_is_bounded_under_concurrency():
+    layer = PromptEngineeringLayer(SessionMemoryManager(path=''))
+    layer.intent_cache_size = 50
+
+    def remember(worker):
+        for i in range(200):
+            layer.remember_intent(f'{worker}-{i}', 'general_flow')
+
+    threads = [threading.Thread(target=remember, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(layer.intent_cache) == 50
@@ -0,0 +1,108 @@
+import pytest
+from back.language import LanguageDetector, SessionLanguages
+
+
+class FixedDetector:
+    """
+    Detector que devolve sempre o mesmo resultado e conta as chamadas.
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def detect(self, text):
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return LanguageDetector()
+
+
+@pytest.mark.parametrize(
+    'text, language',
+    [
+        ('oi', 'pt'),
+        ('olá, tudo bem?', 'pt'),
+        ('obrigado', 'pt'),
+        ('hi', 'en'),
+        ('hello there', 'en'),
+        ('thanks', 'en'),
+    ],
+)
+def test_short_messages_use_the_heuristic(detector, text, language):
+    assert detector.detect(text)[0] == language
+
+
+@pytest.mark.parametrize(
+    'text, language',
+    [
+        ('Quais serviços de desenvolvimento a empresa oferece?', 'pt'),
+        ('Which development services does the company offer?', 'en'),
+        ('Explique como funciona a indexação vetorial.', 'pt'),
+    ],
+)
+def test_longer_messages_are_detected(detector, text, language):
+    detected, confidence = detector.detect(text)
+
+    assert detected == language
+    assert confidence >= 0.6
+
+
+def test_detection_is_deterministic(detector):
+    text = 'Gostaria de saber mais sobre os planos de hospedagem'
+
+    assert detector.detect(text) == LanguageDetector().detect(text)
+
+
+def test_messages_without_signal_have_no_language(detector):
+    assert detector.detect('123 456') == (None, 0.0)
+
+
+def test_session_language_is_cached_after_the_first_message():
+    detector = FixedDetector(('pt', 0.9))
+    languages = SessionLanguages(detector)
+
+    assert languages.resolve('Olá', 's') == ('pt', 0.9)
+    assert languages.resolve('ok', 's') == ('pt', 0.9)
+    assert detector.calls == 1
+
+
+def test_low_confidence_is_not_cached():
+    detector = FixedDetector(('en', 0.3))
+    languages = SessionLanguages(detector, min_confidence=0.6)
+
+    assert languages.resolve('ok', 's') == (None, 0.3)
+    languages.resolve('ok', 's')
+    assert detector.calls == 2
+
+
+def test_explicit_requests_switch_the_session_language():
+    languages = SessionLanguages(FixedDetector(('pt', 0.9)))
+    languages.resolve('Olá', 's')
+
+    assert languages.resolve('Responda em inglês, por favor', 's') == (
+        'en',
+        1.0,
+    )
+    assert languages.resolve('e agora?', 's') == ('en', 1.0)
+    assert languages.resolve('now answer in Portuguese', 's') == ('pt', 1.0)
+
+
+def test_unsupported_languages_fall_back_to_english():
+    languages = SessionLanguages(FixedDetector(('es', 0.99)))
+
+    assert languages.resolve('¿Dónde está la empresa?', 's') == ('en', 0.99)
+
+
+def test_sessions_are_evicted_in_lru_order():
+    detector = FixedDetector(('pt', 0.9))
+    languages = SessionLanguages(detector, max_sessions=2)
+    for session_id in ('a', 'b', 'a', 'c'):
+        languages.resolve('Olá', session_id)
+
+    languages.resolve('Olá', 'b')
+
+    assert detector.calls == 4
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+from back.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+DOCUMENTS = [
+    ('a', 'A WA Project desenvolve software sob medida.', {'content': 'a'}),
+    ('b', 'Preços e planos de hospedagem na nuvem.', {'content': 'b'}),
+    ('c', 'Software, software e mais software.', {'content': 'c'}),
+]
+
+
+def _ids(result):
+    return [match['id'] for match in result['matches']]
+
+
+def _result(*ids):
+    return {'matches': [{'id': doc_id, 'score': 1.0} for doc_id in ids]}
+
+
+def test_tokenize_removes_case_and_accents():
+    assert tokenize('Preços, SERVIÇOS e ação!') == [
+        'precos',
+        'servicos',
+        'e',
+        'acao',
+    ]
+
+
+def test_query_ranks_by_bm25():
+    index = LexicalIndex('test')
+    index.add(DOCUMENTS)
+
+    result = index.query('software', top_k=3)
+
+    assert _ids(result) == ['c', 'a']
+    assert result['matches'][0]['score'] > result['matches'][1]['score']
+    assert result['matches'][0]['metadata'] == {'content': 'c'}
+
+
+def test_query_matches_without_accents():
+    index = LexicalIndex('test')
+    index.add(DOCUMENTS)
+
+    assert _ids(index.query('precos', top_k=1)) == ['b']
+
+
+def test_query_without_matches():
+    index = LexicalIndex('test')
+    assert index.query('software') == {'matches': []}
+
+    index.add(DOCUMENTS)
+    assert index.query('inexistente') == {'matches': []}
+
+
+def test_add_replaces_documents_with_the_same_id():
+    index = LexicalIndex('test')
+    index.add(DOCUMENTS)
+    index.query('software')
+    index.add([('c', 'Hospedagem gerenciada.', {'content': 'c2'})])
+
+    assert _ids(index.query('software', top_k=3)) == ['a']
+    assert index.query('hospedagem', top_k=3)['matches'][0]['id'] == 'c'
+    assert index.describe_index_stats()['total_document_count'] == 3
+
+
+def test_delete_removes_documents():
+    index = LexicalIndex('test')
+    index.add(DOCUMENTS)
+    index.query('software')
+    index.delete(['c', 'inexistente'])
+
+    assert _ids(index.query('software', top_k=3)) == ['a']
+    assert index.describe_index_stats()['total_document_count'] == 2
+
+
+def test_save_and_reload(tmp_path):
+    index = LexicalIndex('test', str(tmp_path))
+    index.add(DOCUMENTS)
+    index.add([('b', 'Planos atualizados.', {'content': 'b2'})])
+    index.save()
+
+    reloaded = LexicalIndex('test', str(tmp_path))
+
+    assert reloaded.describe_index_stats()['total_document_count'] == 3
+    assert _ids(reloaded.query('planos')) == ['b']
+    assert (
+        reloaded.query('software')['matches']
+        == index.query('software')['matches']
+    )
+
+
+def test_rrf_favors_documents_in_both_lists():
+    fused = reciprocal_rank_fusion(
+        [_result('a', 'b', 'c'), _result('d', 'b', 'a')], top_k=4, k=60
+    )
+
+    assert _ids(fused) == ['a', 'b', 'd', 'c']
+    assert fused['matches'][0]['score'] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused['matches'][1]['score'] == pytest.approx(2 / 62)
+
+
+def test_rrf_limits_results_and_ignores_empty_lists():
+    fused = reciprocal_rank_fusion(
+        [_result('a', 'b', 'c'), {'matches': []}], top_k=2
+    )
+
+    assert _ids(fused) == ['a', 'b']
+
+
+def test_readers_pick_up_new_versions(tmp_path):
+    writer = LexicalIndex('test', str(tmp_path))
+    writer.add(DOCUMENTS)
+    writer.save()
+    reader = LexicalIndex('test', str(tmp_path))
+    assert _ids(reader.query('hospedagem')) == ['b']
+
+    writer.delete(['b'])
+    writer.add([('d', 'Hospedagem gerenciada.', {'content': 'd'})])
+    writer.save()
+
+    assert _ids(reader.query('hospedagem')) == ['d']
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [
+            'test.bm25.manifest.json',
+            f'test.bm25.v{_version(tmp_path)}.json',
+            f'test.bm25.v{_version(tmp_path)}.npz',
+        ]
+    )
+
+
+def test_unpublished_versions_are_ignored(tmp_path):
+    writer = LexicalIndex('test', str(tmp_path))
+    writer.add(DOCUMENTS)
+    writer.save()
+    (tmp_path / 'test.bm25.vffff.json').write_text('{"ids": []}')
+
+    reader = LexicalIndex('test', str(tmp_path))
+
+    assert reader.describe_index_stats()['total_document_count'] == 3
+
+
+def _version(directory):
+    return json.loads((directory / 'test.bm25.manifest.json').read_text())[
+        'version'
+    ]
@@ -0,0 +1,160 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+from back import index_files, vector_store
+from back.local_index import LocalVectorIndex
+
+
+def _vectors(*ids, dimension=4):
+    return [
+        {
+            'id': vector_id,
+            'values': np.eye(dimension)[i % dimension].tolist(),
+            'metadata': {'content': vector_id},
+        }
+        for i, vector_id in enumerate(ids)
+    ]
+
+
+def test_save_and_reload(tmp_path):
+    index = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+    index.upsert(_vectors('a', 'b', 'c'))
+    index.save()
+
+    reloaded = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+    match = reloaded.query([0, 1, 0, 0], top_k=1, include_metadata=True)
+
+    assert reloaded.describe_index_stats()['total_vector_count'] == 3
+    assert match['matches'][0]['id'] == 'b'
+    assert match['matches'][0]['metadata'] == {'content': 'b'}
+
+
+def test_readers_pick_up_new_versions(tmp_path):
+    writer = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+    writer.upsert(_vectors('a', 'b'))
+    writer.save()
+    reader = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+
+    writer.delete(['a'])
+    writer.upsert(_vectors('c', 'd'))
+    writer.save()
+
+    assert sorted(
+        match['id'] for match in reader.query([1, 1, 1, 1], top_k=5)['matches']
+    ) == ['b', 'c', 'd']
+    version = json.loads((tmp_path / 'test.manifest.json').read_text())[
+        'version'
+    ]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'test.manifest.json',
+        f'test.v{version}.json',
+        f'test.v{version}.npy',
+    ]
+
+
+def test_versions_that_do_not_match_the_manifest_are_not_loaded(tmp_path):
+    writer = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+    writer.upsert(_vectors('a', 'b'))
+    writer.save()
+    manifest = tmp_path / 'test.manifest.json'
+    manifest.write_text(
+        json.dumps({**json.loads(manifest.read_text()), 'count': 5})
+    )
+
+    reader = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+
+    assert reader.describe_index_stats()['total_vector_count'] == 0
+
+
+def test_read_published_retries_when_a_version_disappears(tmp_path):
+    index_files.publish(str(tmp_path), 'test', 'aa', count=0)
+    attempts = []
+
+    def load(manifest):
+        attempts.append(manifest['version'])
+        if len(attempts) == 1:
+            raise FileNotFoundError(manifest['version'])
+        return manifest['version']
+
+    _, loaded = index_files.read_published(str(tmp_path), 'test', load)
+
+    assert loaded == 'aa'
+    assert attempts == ['aa', 'aa']
+
+
+def test_query_ranks_by_cosine_similarity():
+    index = LocalVectorIndex('test', dimension=3)
+    index.upsert(
+        [
+            ('a', [1, 0, 0], {'content': 'a'}),
+            ('b', [1, 1, 0], {'content': 'b'}),
+            ('c', [0, 0, 5], {'content': 'c'}),
+        ]
+    )
+
+    result = index.query([2, 0, 0], top_k=2, include_values=True)
+
+    assert [match['id'] for match in result['matches']] == ['a', 'b']
+    assert result['matches'][0]['score'] == pytest.approx(1.0)
+    assert result['matches'][1]['score'] == pytest.approx(2**-0.5)
+    assert result['matches'][0]['values'] == pytest.approx([1, 0, 0])
+
+
+def test_upsert_replaces_vectors_with_the_same_id():
+    index = LocalVectorIndex('test', dimension=3)
+    index.upsert([('a', [1, 0, 0], {'v': 1}), ('b', [0, 1, 0], {})])
+    index.upsert([('a', [0, 0, 1], {'v': 2})])
+
+    match = index.query([0, 0, 1], top_k=1, include_metadata=True)
+
+    assert index.describe_index_stats()['total_vector_count'] == 2
+    assert match['matches'][0]['id'] == 'a'
+    assert match['matches'][0]['metadata'] == {'v': 2}
+
+
+def test_delete_moves_the_last_vector_into_the_free_slot():
+    index = LocalVectorIndex('test', dimension=4)
+    index.upsert(_vectors('a', 'b', 'c'))
+
+    index.delete(['a', 'inexistente'])
+
+    assert index.describe_index_stats()['total_vector_count'] == 2
+    assert index.query([0, 0, 1, 0], top_k=1)['matches'][0]['id'] == 'c'
+    assert index.query([1, 0, 0, 0], top_k=1)['matches'][0]['score'] == 0
+
+
+def test_query_on_an_empty_index():
+    assert LocalVectorIndex('test', dimension=4).query([1, 0, 0, 0]) == {
+        'matches': []
+    }
+
+
+def test_upserts_after_reload_copy_the_read_only_memmap(tmp_path):
+    writer = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+    writer.upsert(_vectors('a'))
+    writer.save()
+    index = LocalVectorIndex('test', dimension=4, directory=str(tmp_path))
+
+    index.upsert(_vectors('b', 'c'))
+
+    assert index.describe_index_stats()['total_vector_count'] == 3
+
+
+def test_vector_store_shares_one_index_per_name(monkeypatch):
+    monkeypatch.setattr(vector_store, '_local_indexes', {})
+    results = []
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        results.append(vector_store.get_vector_index('compartilhado', 4))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(index is results[0] for index in results)
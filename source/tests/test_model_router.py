@@ -0,0 +1,88 @@
+import pytest
+from back import model_router
+from back.model_router import ModelRouter, Route, resolve_model
+
+
+@pytest.fixture(autouse=True)
+def models(monkeypatch):
+    monkeypatch.setattr(model_router, 'FAST_MODEL_ID', 'llama-3.1-8b-instant')
+    monkeypatch.setattr(
+        model_router, 'LARGE_MODEL_ID', 'llama-3.1-70b-versatile'
+    )
+
+
+def _router():
+    return ModelRouter(
+        [
+            Route('intent', max_tokens=8, temperature=0),
+            Route('rag', model='fast', escalation_tokens=10),
+            Route('custom', model='gemma2-9b-it'),
+        ]
+    )
+
+
+def test_resolve_model_aliases(monkeypatch):
+    assert resolve_model('fast') == 'llama-3.1-8b-instant'
+    assert resolve_model('large') == 'llama-3.1-70b-versatile'
+    assert resolve_model('gemma2-9b-it') == 'gemma2-9b-it'
+    assert resolve_model('') == 'test-model'
+
+    monkeypatch.setattr(model_router, 'LARGE_MODEL_ID', '')
+    assert resolve_model('large') == 'test-model'
+
+
+def test_select_uses_the_route_model_and_params():
+    model, params, escalated = _router().select('intent', 'oi')
+
+    assert model == 'llama-3.1-8b-instant'
+    assert params == {'max_tokens': 8, 'temperature': 0}
+    assert not escalated
+
+
+def test_long_prompts_escalate_to_the_large_model():
+    router = _router()
+
+    assert router.select('rag', 'pergunta curta')[0] == 'llama-3.1-8b-instant'
+    model, params, escalated = router.select('rag', ' '.join(['x'] * 10))
+    assert model == 'llama-3.1-70b-versatile'
+    assert params == {}
+    assert escalated
+
+
+def test_context_window_is_the_smallest_of_the_route_models():
+    router = _router()
+
+    assert router.context_window('intent') == 131072
+    assert router.context_window('custom') == 8192
+
+
+def test_record_accumulates_metrics_per_route():
+    router = _router()
+    router.record('rag', 'a', False, 100, prompt_tokens=10, first_token_ms=5)
+    router.record('rag', 'b', True, 300, completion_tokens=7)
+
+    metrics = router.metrics()
+
+    assert metrics['rag']['calls'] == 2
+    assert metrics['rag']['escalated'] == 1
+    assert metrics['rag']['prompt_tokens'] == 10
+    assert metrics['rag']['completion_tokens'] == 7
+    assert metrics['rag']['models'] == {'a': 1, 'b': 1}
+    assert metrics['rag']['latency_ms']['p50'] == pytest.approx(200)
+    assert metrics['rag']['first_token_ms'] == {'p50': 5.0, 'p95': 5.0}
+    assert metrics['intent'] == {
+        'calls': 0,
+        'escalated': 0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'models': {},
+    }
+
+
+def test_reset_metrics():
+    router = _router()
+    router.record('intent', 'a', False, 10)
+
+    router.reset_metrics()
+
+    assert router.metrics()['intent']['calls'] == 0
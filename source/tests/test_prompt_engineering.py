@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from back.agent import tool_graph
+from back.agent.prompt_engineering import PromptEngineeringLayer
+from back.agent.session_memory import SessionMemoryManager
+
+
+@pytest.fixture
+def layer():
+    return PromptEngineeringLayer(SessionMemoryManager(path=''))
+
+
+def _classify(layer, message):
+    return layer.classify_locally(layer.normalize_message(message))
+
+
+@pytest.mark.parametrize(
+    'message',
+    [
+        'Qual foi minha primeira mensagem?',
+        'qual foi a ultima mensagem',
+        'mostrar histórico página 2',
+        'O que eu perguntei sobre preços?',
+        'o que perguntei a você sobre o plano básico?',
+        'what did i ask about pricing?',
+    ],
+)
+def test_history_phrases_route_locally(layer, message):
+    assert _classify(layer, message) == 'history_flow'
+
+
+@pytest.mark.parametrize(
+    'message',
+    [
+        'O que disse Einstein sobre a relatividade?',
+        'Você sabe o que falei ontem com meu chefe sobre salário?',
+        'O que o presidente disse sobre a economia?',
+        'what did einstein say about relativity?',
+    ],
+)
+def test_third_party_questions_do_not_route_to_history(layer, message):
+    assert _classify(layer, message) != 'history_flow'
+
+
+def test_history_topic_search(layer):
+    layer.memory.add_turn('s', 'user', 'Qual o preço do plano básico?')
+    layer.memory.add_turn('s', 'assistant', 'R$ 10.')
+    layer.memory.add_turn('s', 'user', 'o que eu perguntei sobre preços?')
+
+    answer = layer.handle_history_question(
+        'o que eu perguntei sobre preços?', 's'
+    )
+
+    assert "'Qual o preço do plano básico?'" in answer
+
+
+def test_first_and_last_message(layer):
+    for message in ('oi', 'tudo bem?', 'qual foi minha última mensagem?'):
+        layer.memory.add_turn('s', 'user', message)
+
+    assert layer.handle_history_question('primeira mensagem', 's') == (
+        "Sua primeira mensagem foi: 'oi'"
+    )
+    assert layer.handle_history_question(
+        'qual foi minha ultima mensagem?', 's'
+    ) == ("Sua última mensagem foi: 'tudo bem?'")
+
+
+def test_unrelated_messages_are_not_answered_as_history(layer):
+    layer.memory.add_turn('s', 'user', 'resuma a conversa')
+
+    assert layer.handle_history_question('resuma a conversa', 's') is None
+
+
+def test_history_flow_falls_back_to_general_flow(layer, monkeypatch):
+    async def ageneral_flow(prompt, stream=False, **kwargs):
+        return f'geral: {prompt}'
+
+    monkeypatch.setattr(tool_graph, '_prompt_layer', layer)
+    monkeypatch.setattr(tool_graph, 'ageneral_flow', ageneral_flow)
+    monkeypatch.setattr(tool_graph, 'RESPONSE_CACHE_ENABLED', False)
+    state = {
+        'prompt': 'O que disse Einstein sobre a relatividade?',
+        'stream': False,
+        'language': None,
+        'session_id': 's',
+        'intent': 'history_flow',
+        'messages': [],
+        'response': None,
+    }
+
+    update = asyncio.run(tool_graph.history_flow_state(state, {}))
+
+    assert update['response'] == (
+        'geral: O que disse Einstein sobre a relatividade?'
+    )
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from back.agent import response_cache as cache_module
+from back.agent.response_cache import (
+    ResponseCache,
+    _SemanticIndex,
+    normalize_prompt,
+)
+
+
+class KeywordEmbedder:
+    """
+    Embedder semântico fictício: cada palavra conhecida é uma dimensão.
+    """
+
+    semantic = True
+    vocabulary = ('preço', 'plano', 'empresa', 'contato')
+
+    def embed(self, text):
+        vector = np.array(
+            [word in text for word in self.vocabulary], dtype=np.float32
+        )
+        return vector / max(np.linalg.norm(vector), 1e-12)
+
+    def embed_batch(self, texts):
+        return np.stack([self.embed(text) for text in texts])
+
+
+@pytest.fixture
+def semantic_embedder(monkeypatch):
+    embedder = KeywordEmbedder()
+    monkeypatch.setattr(cache_module, 'get_embedder', lambda: embedder)
+    return embedder
+
+
+def _cache(**options):
+    options.setdefault('semantic_threshold', 0)
+    options.setdefault('path', '')
+    return ResponseCache(**options)
+
+
+def test_normalize_prompt():
+    assert normalize_prompt('  Qual   o PREÇO?? ') == 'qual o preço'
+
+
+def test_exact_hits_ignore_case_and_punctuation():
+    cache = _cache()
+    cache.set('general_flow', 'Qual o preço?', 'R$ 10')
+
+    assert cache.get('general_flow', 'qual o preço') == 'R$ 10'
+    assert cache.get('rag_flow', 'qual o preço') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_blank_responses_are_not_cached():
+    cache = _cache()
+    cache.set('general_flow', 'oi', '   ')
+
+    assert cache.get('general_flow', 'oi') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_expired_entries_are_evicted(monkeypatch):
+    cache = _cache(ttl=10)
+    cache.set('general_flow', 'oi', 'olá')
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now + 11)
+
+    assert cache.get('general_flow', 'oi') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = _cache(max_entries=2)
+    cache.set('f', 'a', 'A')
+    cache.set('f', 'b', 'B')
+    cache.get('f', 'a')
+    cache.set('f', 'c', 'C')
+
+    assert cache.get('f', 'b') is None
+    assert cache.get('f', 'a') == 'A'
+
+    cache = _cache(max_bytes=10)
+    cache.set('f', 'a', 'x' * 6)
+    cache.set('f', 'b', 'y' * 6)
+    assert cache.get('f', 'a') is None
+    assert cache.stats()['bytes'] == 6
+
+
+def test_semantic_tier_is_disabled_for_lexical_embedders():
+    cache = _cache(semantic_threshold=0.9)
+
+    assert not cache.semantic_enabled
+    assert cache.embed('qual o preço') is None
+
+
+def test_semantic_hits_within_the_same_flow(semantic_embedder):
+    cache = _cache(semantic_threshold=0.9)
+    cache.set('rag_flow', 'qual o preço do plano', 'R$ 10')
+
+    assert cache.get('rag_flow', 'me diga o preço do plano') == 'R$ 10'
+    assert cache.get('general_flow', 'me diga o preço do plano') is None
+    assert cache.get('rag_flow', 'qual o contato da empresa') is None
+    assert cache.stats()['semantic_hits'] == 1
+
+
+def test_semantic_index_follows_evictions(semantic_embedder):
+    cache = _cache(semantic_threshold=0.9, max_entries=1)
+    cache.set('rag_flow', 'qual o preço do plano', 'R$ 10')
+    cache.set('rag_flow', 'contato da empresa', 'contato@exemplo.com')
+
+    assert cache.get('rag_flow', 'preço do plano?') is None
+    assert cache._semantic['rag_flow'].keys == [
+        ('rag_flow', 'contato da empresa')
+    ]
+
+
+def test_semantic_index_swap_remove():
+    index = _SemanticIndex(2, capacity=1)
+    for key, vector in (('a', [1, 0]), ('b', [0, 1]), ('c', [1, 1])):
+        index.add(key, np.array(vector, dtype=np.float32))
+    index.remove('a')
+
+    assert index.keys == ['c', 'b']
+    assert index.positions == {'c': 0, 'b': 1}
+    assert index.scores(np.array([1, 0], dtype=np.float32)).tolist() == [
+        1.0,
+        0.0,
+    ]
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    _cache(path=path).set('general_flow', 'oi', 'olá')
+
+    assert _cache(path=path).get('general_flow', 'oi') == 'olá'
@@ -0,0 +1,177 @@
+import sqlite3
+import time
+
+from back.agent.session_memory import (
+    SessionHistory,
+    SessionMemoryManager,
+    Turn,
+    index_terms,
+)
+
+
+def _history(*messages, max_turns=50, max_tokens=8000):
+    history = SessionHistory(max_turns, max_tokens)
+    for message in messages:
+        history.add(Turn('user', message))
+        history.add(Turn('assistant', f'resposta: {message}'))
+    return history
+
+
+def _contents(turns):
+    return [turn.content for turn in turns]
+
+
+def test_index_terms_drop_stopwords_accents_and_plural():
+    assert index_terms('Quero saber os preços dos planos!') == {
+        'quero',
+        'saber',
+        'preco',
+        'plano',
+    }
+
+
+def test_search_finds_user_messages_about_a_topic():
+    history = _history(
+        'Qual o preço do plano básico?',
+        'Vocês atendem em São Paulo?',
+        'E os preços do plano avançado?',
+    )
+
+    assert _contents(history.search('preços')) == [
+        'Qual o preço do plano básico?',
+        'E os preços do plano avançado?',
+    ]
+    assert history.search('hospedagem') == []
+
+
+def test_search_prefers_messages_with_more_terms():
+    history = _history('Qual o preço?', 'Qual o preço do plano avançado?')
+
+    assert _contents(history.search('preço do plano avançado')) == [
+        'Qual o preço do plano avançado?'
+    ]
+
+
+def test_search_before_ignores_later_turns():
+    history = _history('Qual o preço?', 'E o preço agora?')
+    last = history.last_user_turn
+
+    assert _contents(history.search('preço', before=last.seq)) == [
+        'Qual o preço?'
+    ]
+
+
+def test_dropped_turns_leave_the_index():
+    history = _history(
+        'preço antigo', 'outro assunto', 'preço novo', max_turns=4
+    )
+
+    assert _contents(history.search('preço')) == ['preço novo']
+    assert 'antigo' not in history.index
+    assert history.first_user_turn.content == 'preço antigo'
+
+
+def test_page_returns_the_most_recent_turns_first():
+    history = _history('um', 'dois', 'tres')
+
+    turns, pages = history.page(1, size=4)
+    assert pages == 2
+    assert _contents(turns) == [
+        'dois',
+        'resposta: dois',
+        'tres',
+        'resposta: tres',
+    ]
+
+    turns, _ = history.page(5, size=4)
+    assert _contents(turns) == ['um', 'resposta: um']
+
+
+def test_manager_evicts_least_recently_used_sessions():
+    memory = SessionMemoryManager(max_sessions=2, path='')
+    memory.add_turn('a', 'user', 'oi')
+    memory.add_turn('b', 'user', 'oi')
+    memory.get('a')
+    memory.add_turn('c', 'user', 'oi')
+
+    assert memory.session_count() == 2
+    assert len(memory.get('a').turns) == 1
+    assert len(memory.get('b').turns) == 0
+
+
+def test_manager_reloads_sessions_from_sqlite(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    memory = SessionMemoryManager(max_turns=2, path=path)
+    for message in ('primeira', 'segunda sobre preços', 'terceira'):
+        memory.add_turn('s', 'user', message)
+
+    history = SessionMemoryManager(max_turns=2, path=path).get('s')
+
+    assert history.first_user_turn.content == 'primeira'
+    assert _contents(history.turns) == ['segunda sobre preços', 'terceira']
+    assert _contents(history.search('preço')) == ['segunda sobre preços']
+
+
+def _stored(path, session_id):
+    with sqlite3.connect(path) as db:
+        return [
+            content
+            for (content,) in db.execute(
+                'SELECT content FROM session_turns WHERE session_id = ? '
+                'ORDER BY seq',
+                (session_id,),
+            )
+        ]
+
+
+def test_sqlite_keeps_the_first_message_and_the_last_turns(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    memory = SessionMemoryManager(max_turns=3, path=path)
+    for i in range(10):
+        memory.add_turn('s', 'user', f'pergunta {i}')
+        memory.add_turn('s', 'assistant', f'resposta {i}')
+    memory.add_turn('outra', 'user', 'oi')
+
+    assert _stored(path, 's') == [
+        'pergunta 0',
+        'resposta 8',
+        'pergunta 9',
+        'resposta 9',
+    ]
+    assert _stored(path, 'outra') == ['oi']
+    assert (
+        SessionMemoryManager(max_turns=3, path=path)
+        .get('s')
+        .first_user_turn.content
+        == 'pergunta 0'
+    )
+
+
+def test_sqlite_sessions_expire_after_the_retention(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    memory = SessionMemoryManager(path=path, retention=60)
+    memory.add_turn('antiga', 'user', 'oi')
+    memory.add_turn('recente', 'user', 'oi')
+    now = time.time()
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "UPDATE session_turns SET created_at = ? WHERE session_id = 'antiga'",
+            (now - 120,),
+        )
+
+    SessionMemoryManager(path=path, retention=60)
+
+    assert _stored(path, 'antiga') == []
+    assert _stored(path, 'recente') == ['oi']
+
+
+def test_sqlite_retention_zero_keeps_sessions(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    memory = SessionMemoryManager(path=path, retention=0)
+    memory.add_turn('s', 'user', 'oi')
+    with sqlite3.connect(path) as db:
+        db.execute('UPDATE session_turns SET created_at = 0')
+
+    SessionMemoryManager(path=path, retention=0)
+
+    assert _stored(path, 's') == ['oi']
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from back.agent import speculation
+from back.agent.speculation import SpeculationStats, SpeculativeRetrieval
+
+
+class FakeIndexer:
+    delay = 0.02
+    queries = []
+    cancelled = []
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+
+    async def aquery_index(self, prompt):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(prompt)
+            raise
+        self.queries.append((self.index_name, prompt))
+        return {'matches': [{'id': prompt}]}
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    FakeIndexer.delay = 0.02
+    FakeIndexer.queries = []
+    FakeIndexer.cancelled = []
+    stats = SpeculationStats()
+    monkeypatch.setattr(speculation, 'PineconeIndexer', FakeIndexer)
+    monkeypatch.setattr(speculation, 'speculation_stats', stats)
+    return stats
+
+
+def test_consumed_retrievals_record_the_time_saved(stats):
+    async def scenario():
+        retrieval = SpeculativeRetrieval('preços', index_name='idx')
+        await asyncio.sleep(0.005)
+        retrieval.intent_resolved()
+        return retrieval, await retrieval.consume()
+
+    retrieval, result = asyncio.run(scenario())
+
+    assert result == {'matches': [{'id': 'preços'}]}
+    assert FakeIndexer.queries == [('idx', 'preços')]
+    assert retrieval.metrics['used']
+    assert retrieval.metrics['wasted_ms'] == 0.0
+    assert (
+        0 < retrieval.metrics['saved_ms'] == pytest.approx(retrieval.intent_ms)
+    )
+    assert stats.snapshot()['used'] == 1
+
+
+def test_saved_time_is_bounded_by_the_retrieval(stats):
+    FakeIndexer.delay = 0
+
+    async def scenario():
+        retrieval = SpeculativeRetrieval('preços', index_name='idx')
+        await asyncio.sleep(0.02)
+        retrieval.intent_resolved()
+        await retrieval.consume()
+        return retrieval
+
+    retrieval = asyncio.run(scenario())
+
+    assert retrieval.metrics['saved_ms'] < retrieval.metrics['intent_ms']
+
+
+def test_discarded_retrievals_are_cancelled_and_counted_once(stats):
+    async def scenario():
+        retrieval = SpeculativeRetrieval('oi', index_name='idx')
+        await asyncio.sleep(0.005)
+        retrieval.discard()
+        retrieval.discard()
+        await asyncio.sleep(0)
+        return retrieval
+
+    retrieval = asyncio.run(scenario())
+
+    assert retrieval.task.cancelled()
+    assert FakeIndexer.cancelled == ['oi']
+    assert FakeIndexer.queries == []
+    assert not retrieval.metrics['used']
+    assert retrieval.metrics['wasted_ms'] > 0
+    assert stats.snapshot() == {
+        'turns': 1,
+        'used': 0,
+        'discarded': 1,
+        'saved_ms': 0.0,
+        'wasted_ms': retrieval.metrics['wasted_ms'],
+    }
+
+
+def test_discard_after_consume_is_ignored(stats):
+    async def scenario():
+        retrieval = SpeculativeRetrieval('preços', index_name='idx')
+        retrieval.intent_resolved()
+        await retrieval.consume()
+        retrieval.discard()
+
+    asyncio.run(scenario())
+
+    assert stats.snapshot()['turns'] == 1
+    assert stats.snapshot()['discarded'] == 0
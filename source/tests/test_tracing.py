@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+from back import tracing
+from back.tracing import (
+    NULL_SPAN,
+    Trace,
+    TraceExporter,
+    annotate,
+    current_trace,
+    span,
+    start_span,
+    use_trace,
+)
+
+
+@pytest.fixture
+def exporter(tmp_path, monkeypatch):
+    exporter = TraceExporter(
+        log_path=str(tmp_path / 'traces.jsonl'),
+        metrics_path=str(tmp_path / 'metrics.prom'),
+    )
+    monkeypatch.setattr(tracing, 'exporter', exporter)
+    return exporter
+
+
+def test_spans_without_an_active_trace_are_ignored():
+    assert current_trace() is None
+    assert start_span('etapa') is NULL_SPAN
+    with span('etapa') as current:
+        current.set(bytes=10)
+    annotate(intent='rag_flow')
+
+
+def test_spans_and_annotations_are_recorded_in_the_active_trace():
+    trace = Trace(session_id='s')
+    with use_trace(trace):
+        annotate(intent='rag_flow')
+        with span('embedding', texts=1) as current:
+            current.set(tokens=5)
+        with span('index_query'):
+            pass
+    assert current_trace() is None
+
+    assert trace.attributes == {'session_id': 's', 'intent': 'rag_flow'}
+    assert [item.name for item in trace.spans] == ['embedding', 'index_query']
+    assert trace.spans[0].attributes == {'texts': 1, 'tokens': 5}
+    assert set(trace.stage_timings()) == {'embedding', 'index_query'}
+
+
+def test_span_records_the_error_type():
+    trace = Trace()
+    with use_trace(trace), pytest.raises(KeyError):
+        with span('groq_call'):
+            raise KeyError('x')
+
+    assert trace.spans[0].attributes == {'error': 'KeyError'}
+    assert trace.spans[0].duration_ms is not None
+
+
+def test_stage_timings_sum_repeated_stages():
+    trace = Trace()
+    for duration in (10.0, 5.0):
+        trace.start_span('translation').duration_ms = duration
+    trace.start_span('aberto')
+
+    assert trace.stage_timings() == {'translation': 15.0}
+
+
+def test_traces_follow_asyncio_tasks():
+    async def stage():
+        with span('tarefa'):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        trace = Trace()
+        with use_trace(trace):
+            await asyncio.gather(stage(), stage())
+        return trace
+
+    assert [item.name for item in asyncio.run(scenario()).spans] == [
+        'tarefa',
+        'tarefa',
+    ]
+
+
+def test_finish_exports_the_trace_once(exporter, tmp_path):
+    trace = Trace(intent='general_flow')
+    with use_trace(trace):
+        with span('groq_call', bytes=120, tokens=30):
+            pass
+
+    trace.finish()
+    trace.finish()
+
+    lines = (tmp_path / 'traces.jsonl').read_text().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record['trace_id'] == trace.trace_id
+    assert record['intent'] == 'general_flow'
+    assert record['spans'][0]['name'] == 'groq_call'
+    assert record['spans'][0]['tokens'] == 30
+
+
+def test_prometheus_snapshot_aggregates_stages(exporter, tmp_path):
+    for _ in range(2):
+        trace = Trace()
+        trace.start_span('groq_call', bytes=100, tokens=20).duration_ms = 30
+        trace.finish()
+
+    snapshot = (tmp_path / 'metrics.prom').read_text()
+
+    assert snapshot == exporter.prometheus_snapshot()
+    assert (
+        'chatbot_stage_duration_seconds_bucket{stage="groq_call",le="0.025"} 0'
+        in snapshot
+    )
+    assert (
+        'chatbot_stage_duration_seconds_bucket{stage="groq_call",le="0.05"} 2'
+        in snapshot
+    )
+    assert 'chatbot_stage_duration_seconds_count{stage="turn"} 2' in snapshot
+    assert 'chatbot_stage_bytes_total{stage="groq_call"} 200' in snapshot
+    assert 'chatbot_stage_tokens_total{stage="groq_call"} 40' in snapshot
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+from back import translation
+from back.translation import (
+    ResponseTranslator,
+    language_instruction,
+    split_text,
+)
+
+
+class FakeTranslator(ResponseTranslator):
+    """
+    Tradutor que marca os trechos em vez de chamar o Google Translate.
+    """
+
+    def __init__(self, in_language=False, **options):
+        super().__init__(**options)
+        self.in_language = in_language
+        self.chunks = []
+        self._chunks_lock = threading.Lock()
+
+    def _translate_chunk(self, chunk, target):
+        with self._chunks_lock:
+            self.chunks.append(chunk)
+        return f'[{target}] {chunk}'
+
+    def is_in_language(self, text, language):
+        return self.in_language
+
+
+def test_language_instruction_in_prompt_mode(monkeypatch):
+    monkeypatch.setattr(translation, 'TRANSLATION_MODE', 'prompt')
+
+    assert language_instruction('en') == '\n\nAnswer in English.'
+    assert language_instruction('fr') == ''
+
+    monkeypatch.setattr(translation, 'TRANSLATION_MODE', 'translate')
+    assert language_instruction('en') == ''
+
+
+def test_split_text_keeps_short_texts_whole():
+    assert split_text('Uma frase.', max_length=50) == ['Uma frase.']
+
+
+def test_split_text_prefers_sentence_boundaries():
+    text = 'Primeira frase. Segunda frase! Terceira frase?'
+
+    chunks = split_text(text, max_length=32)
+
+    assert chunks == ['Primeira frase. Segunda frase!', 'Terceira frase?']
+
+
+def test_split_text_cuts_pieces_longer_than_the_limit():
+    chunks = split_text('a' * 25, max_length=10)
+
+    assert chunks == ['a' * 10, 'a' * 10, 'a' * 5]
+
+
+def test_translations_are_cached():
+    translator = FakeTranslator()
+
+    assert translator.translate('Olá', 'en') == '[en] Olá'
+    assert translator.translate('Olá', 'en') == '[en] Olá'
+    assert translator.translate('Olá', 'es') == '[es] Olá'
+    assert translator.chunks == ['Olá', 'Olá']
+
+
+def test_cache_is_bounded():
+    translator = FakeTranslator(cache_size=2)
+    for text in ('um', 'dois', 'três'):
+        translator.translate(text, 'en')
+
+    translator.translate('um', 'en')
+
+    assert translator.chunks == ['um', 'dois', 'três', 'um']
+
+
+def test_texts_already_in_the_target_language_are_kept():
+    translator = FakeTranslator(in_language=True)
+
+    assert translator.translate('Hello', 'en') == 'Hello'
+    assert translator.chunks == []
+
+
+@pytest.mark.parametrize('text', ['', '   '])
+def test_empty_texts_are_not_translated(text):
+    translator = FakeTranslator()
+
+    assert translator.translate(text, 'en') == text
+    assert translator.chunks == []
+
+
+def test_long_texts_are_translated_in_chunks(monkeypatch):
+    monkeypatch.setattr(
+        translation,
+        'split_text',
+        lambda text: split_text(text, max_length=20),
+    )
+    translator = FakeTranslator(max_workers=2)
+
+    result = translator.translate('Primeira frase. Segunda frase.', 'en')
+
+    assert result == '[en] Primeira frase. [en] Segunda frase.'
+    assert sorted(translator.chunks) == ['Primeira frase.', 'Segunda frase.']